@@ -10,13 +10,16 @@ import importlib.resources as pkg_resources
 import redditquotebot.data
 from redditquotebot import BotBuilder
 from redditquotebot.quotes import QuoteLoader
-from redditquotebot.nlp import QuoteCommentNLPMatcher, QuoteNLPDetector
+from redditquotebot.nlp import QuoteCommentNLPMatcher, QuoteNLPDetector, QuoteParallelNLPDetector
 from redditquotebot.utilities import CredentialGenerator, ConfigurationGenerator, setup_logger
 
 conifguration_file_name = "configuration.json"
 credentials_file_name = "credentials.json"
 scrape_state_file_name = "scrape_state.json"
 records_file_name = "records.json"
+sqlite_records_file_name = "records.sqlite"
+quote_cache_directory_name = "quote_cache"
+comment_memo_file_name = "comment_memo.json"
 
 
 def generate_configuration(path: str):
@@ -37,58 +40,87 @@ def generate_credentials(path: str):
         CredentialGenerator.to_json(handler)
 
 
-parser = argparse.ArgumentParser()
-
-parser.add_argument(
-    '-v', '--version',
-    action='version', version="version"
-)
-parser.add_argument(
-    '-g', '--generate-config',
-    action='store_true',
-    help="Generate the required credential and configuration files needed.",
-    default=False
-)
-
-args = parser.parse_args()
-if args.generate_config:
-    generate_configuration(conifguration_file_name)
-    generate_credentials(credentials_file_name)
-    sys.exit()
-
-timestamp = datetime.datetime.now().strftime("%Y_%m_%d_%H:%M:%S")
-builder = BotBuilder()
-
-try:
-    builder.configuration(os.path.join(os.getcwd(), conifguration_file_name))
-    builder.credentials(os.path.join(os.getcwd(), credentials_file_name))
-except FileNotFoundError:
-    generate_configuration(conifguration_file_name)
-    generate_credentials(credentials_file_name)
-    print("Modify and populate credential files in order to configure bot.")
-    sys.exit()
-
-builder.recored_keeper(os.path.join(os.getcwd(), records_file_name))
-builder.scrape_state(os.path.join(os.getcwd(), scrape_state_file_name))
-quote_handler = pkg_resources.open_text(redditquotebot.data, "quotes.csv")
-quotes = QuoteLoader.from_csv(quote_handler)
-
-config = builder.loaded_configuration()
-builder.quotes(quotes)
-builder.quote_matcher(
-    QuoteCommentNLPMatcher(
-        quote_comment_delta=config.nlp.quote_comment_length_delta,
-        minimum_sentence_word_length=config.nlp.minimum_comment_sentence_word_length,
-        bonus_coeff=config.nlp.quote_length_bonus_coefficient,
-        bonus_start=config.nlp.quote_length_bonus_start,
-        bonus_end=config.nlp.quote_length_bonus_end,
-        match_sentence_coeff=config.nlp.matched_sentence_coefficient
-    ),
-    config.nlp.match_store_threshold
-)
-builder.quote_detector(QuoteNLPDetector)
-
-setup_logger(logging.INFO, f"run_log_{timestamp}.log")
-bot = builder.bot()
-bot.connect()
-bot.start()
+def main():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        '-v', '--version',
+        action='version', version="version"
+    )
+    parser.add_argument(
+        '-g', '--generate-config',
+        action='store_true',
+        help="Generate the required credential and configuration files needed.",
+        default=False
+    )
+
+    args = parser.parse_args()
+    if args.generate_config:
+        generate_configuration(conifguration_file_name)
+        generate_credentials(credentials_file_name)
+        sys.exit()
+
+    timestamp = datetime.datetime.now().strftime("%Y_%m_%d_%H:%M:%S")
+    builder = BotBuilder()
+
+    try:
+        builder.configuration(os.path.join(os.getcwd(), conifguration_file_name))
+        builder.credentials(os.path.join(os.getcwd(), credentials_file_name))
+    except FileNotFoundError:
+        generate_configuration(conifguration_file_name)
+        generate_credentials(credentials_file_name)
+        print("Modify and populate credential files in order to configure bot.")
+        sys.exit()
+
+    config = builder.loaded_configuration()
+    if config.records.storage == "sqlite":
+        builder.recored_keeper(os.path.join(os.getcwd(), sqlite_records_file_name))
+    else:
+        builder.recored_keeper(os.path.join(os.getcwd(), records_file_name))
+    builder.scrape_state(os.path.join(os.getcwd(), scrape_state_file_name))
+    quote_handler = pkg_resources.open_text(redditquotebot.data, "quotes.csv")
+    quotes = QuoteLoader.from_csv(quote_handler)
+
+    builder.quotes(quotes)
+    builder.quote_matcher(
+        QuoteCommentNLPMatcher(
+            quote_comment_delta=config.nlp.quote_comment_length_delta,
+            minimum_sentence_word_length=config.nlp.minimum_comment_sentence_word_length,
+            bonus_coeff=config.nlp.quote_length_bonus_coefficient,
+            bonus_start=config.nlp.quote_length_bonus_start,
+            bonus_end=config.nlp.quote_length_bonus_end,
+            match_sentence_coeff=config.nlp.matched_sentence_coefficient
+        ),
+        config.nlp.match_store_threshold
+    )
+    detector_arguments = {}
+    detector = QuoteNLPDetector
+    if config.nlp.detector_workers > 1:
+        detector = QuoteParallelNLPDetector
+        detector_arguments["workers"] = config.nlp.detector_workers
+    builder.quote_detector(
+        detector,
+        batch_size=config.nlp.pipe_batch_size,
+        n_process=config.nlp.pipe_processes,
+        reparse_sentences=config.nlp.reparse_cleaned_sentences,
+        cache_directory=os.path.join(os.getcwd(), quote_cache_directory_name),
+        index_lists=config.nlp.index_lists,
+        index_probes=config.nlp.index_probes,
+        index_candidates=config.nlp.index_candidates,
+        matches_per_comment=config.bot.matched_quotes_to_log,
+        prune_below_threshold=config.nlp.prune_below_threshold,
+        memo_size=config.nlp.comment_memo_size,
+        memo_ttl=config.nlp.comment_memo_ttl,
+        memo_path=os.path.join(os.getcwd(), comment_memo_file_name),
+        **detector_arguments
+    )
+
+    setup_logger(logging.INFO, f"run_log_{timestamp}.log")
+    bot = builder.bot()
+    bot.connect()
+    bot.start()
+
+
+# Guarded, as spawned detector worker processes import this module.
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
 
-from redditquotebot.utilities import RecordLoader, RecordKeeper, RecordStorer
-from redditquotebot.backtesting import combine_records
-from typing import List
+from redditquotebot.utilities import RecordReader, RecordStorer, TimeDelta
+from redditquotebot.backtesting import RecordMerger
+from typing import Any, Iterator, List, Tuple
 import argparse
 import sys
 import os
@@ -19,30 +19,75 @@ Example 2: Get comments from matches is multiple record files, combine into a si
 
 Example 3: Get comments from matches is multiple record files, combine into a single comment record, append to existing comment record.
     rqb_record_combine.py -m match_records.json -c existing_records.json master_record.json -o master_record.json
+
+Records are read and written one at a time, so records larger than memory can be combined. JSON Lines (.jsonl) files are also supported.
+    rqb_record_combine.py -c comment_record_1.json comment_record_2.jsonl -o all_comments_output.jsonl
+
+Combined comments are sorted by time, spilling sorted runs to temporary files beyond a memory budget, in megabytes.
+    rqb_record_combine.py -c day_*.jsonl -o month.jsonl -b 512 -t /scratch
     """
 
 
-def combine_comments(infiles: List[str], outfile: str):
-    """Combine comments from a list of files into a single record.
+def read_with_progress(infiles: List[str], section: str) -> Iterator[Tuple[str, Any]]:
+    """Read a section of records from a list of files, one record at a time, reporting the progress of each file.
 
     Args:
-        infiles (List[str]): List of input files to source comments
-        outfile (str): The name of the output file.
+        infiles (List[str]): List of input files, JSON or JSON Lines.
+        section (str): The section to read.
+
+    Yields:
+        Tuple[str, Any]: The section and entry of each record.
     """
-    records_to_combine = []
     for input_file in infiles:
-        with open(input_file, "r", encoding="utf-8") as handler:
-            records_to_combine.append(RecordLoader.from_json(handler))
-            print(f"Load {len(records_to_combine[-1].logged_comments())} comments from {input_file}.")
+        timer = TimeDelta()
+        count = 0
+        for pair in RecordReader.read(input_file, [section]):
+            count += 1
+            yield pair
+        elapsed = timer.elapsed()
+        print(f"Read {count} {section} from {input_file}, in {round(elapsed, 2)}s ({round(count / max(elapsed, 1e-9))} {section}/s).")
+
+
+def write_records(outfile: str, pairs: Iterator[Tuple[str, Any]]) -> int:
+    """Write records to a file, streamed as they are read. The file is only replaced once complete, so it can also be an input.
 
-    # Create a new record and just add the comments.
-    combined = RecordKeeper()
-    combined.log_comments(combine_records(records_to_combine).logged_comments())
+    Args:
+        outfile (str): The output file, JSON or JSON Lines.
+        pairs (Iterator[Tuple[str, Any]]): The section and entry of each record.
+
+    Returns:
+        int: The number of records written.
+    """
+    count = 0
+
+    def counted():
+        nonlocal count
+        for pair in pairs:
+            count += 1
+            yield pair
 
-    with open(outfile, "w", encoding="utf-8") as handler:
-        RecordStorer.to_json(handler, combined)
+    base, extension = os.path.splitext(outfile)
+    temporary = f"{base}.tmp{extension}"
+    with open(temporary, "w", encoding="utf-8") as handler:
+        if extension == ".jsonl":
+            RecordStorer.to_jsonl(handler, counted())
+        else:
+            RecordStorer.to_json(handler, counted())
+    os.replace(temporary, outfile)
+    return count
 
-    print(f"Total {len(combined.logged_comments())} comments written to {outfile}.")
+
+def combine_comments(infiles: List[str], outfile: str, merger: RecordMerger):
+    """Combine comments from a list of files into a single record, sorted by time.
+
+    Args:
+        infiles (List[str]): List of input files to source comments
+        outfile (str): The name of the output file.
+        merger (RecordMerger): Sorts and removes duplicate comments.
+    """
+    timer = TimeDelta()
+    count = write_records(outfile, merger.merge(read_with_progress(infiles, "comments")))
+    print(f"Total {count} comments written to {outfile}, in {round(timer.elapsed(), 2)}s, using {merger.runs_spilled} sorted runs.")
 
 
 def combine_matches(infiles: List[str], outfile: str):
@@ -52,23 +97,9 @@ def combine_matches(infiles: List[str], outfile: str):
         infiles (List[str]): List of input files with source matches
         outfile (str): The output file to store the comments as matches.
     """
-    records_to_combine = []
-    for input_file in infiles:
-        with open(input_file, "r", encoding="utf-8") as handler:
-            records_to_combine.append(RecordLoader.from_json(handler))
-            print(f"Load {len(records_to_combine[-1].logged_matches())} matches from {input_file}.")
-
-    comments = []
-    for record in records_to_combine:
-        for match in record.logged_matches():
-            comments.append(match.comment)
-
-    comment_record = RecordKeeper()
-    comment_record.log_comments(comments)
-
-    with open(outfile, "w", encoding="utf-8") as handler:
-        RecordStorer.to_json(handler, comment_record)
-    print(f"Write {len(comments)} comments from matches to {outfile}")
+    comments = (("comments", match["comment"]) for _, match in read_with_progress(infiles, "matches"))
+    count = write_records(outfile, comments)
+    print(f"Write {count} comments from matches to {outfile}")
 
 
 parser = argparse.ArgumentParser(description="Reddit quote bot record combiner.", usage=usage)
@@ -96,6 +127,18 @@ parser.add_argument(
     default=None
 )
 
+parser.add_argument(
+    '-b', '--memory-budget',
+    type=int,
+    help="Specify the megabytes of comments to sort in memory, before spilling to temporary files.",
+    default=256
+)
+parser.add_argument(
+    '-t', '--temporary-directory',
+    help="Specify the directory for temporary files.",
+    default=None
+)
+
 args = parser.parse_args()
 
 if args.output_file is None or len(args.output_file) != 1:
@@ -108,4 +151,5 @@ if args.match_files is not None:
 
 if args.comment_files is not None:
     comment_files = [os.path.join(os.getcwd(), p) for p in args.comment_files]
-    combine_comments(comment_files, args.output_file[0])
+    merger = RecordMerger(args.memory_budget * 1024 * 1024, directory=args.temporary_directory)
+    combine_comments(comment_files, args.output_file[0], merger)
@@ -1,47 +1,392 @@
-from redditquotebot.utilities import RecordKeeper
+from redditquotebot.utilities import RecordKeeper, RecordReader
 from redditquotebot.reddit import Comment
 from redditquotebot.nlp import MatchedQuote, QuoteNLPDetector, QuoteCommentNLPMatcher
 from redditquotebot.quotes import Quote
-from typing import List, Type
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Type
+import heapq
+import itertools
+import json
+import multiprocessing
+import numpy as np
+import os
+import tempfile
 
 
-def combine_records(records: List[RecordKeeper]) -> RecordKeeper:
+class RecordCombiner():
+    """Combines records into a single record one at a time, skipping duplicates.
+
+    Records are deduplicated by comment uid, kept in a set for each section, so combining is linear in the number of records.
+    Records are combined as stored dictionaries, without building comment, match or reply objects.
+    """
+
+    SECTIONS = ("comments", "matches", "replies")
+
+    def __init__(self, sections: Iterable[str] = SECTIONS):
+        """
+        Args:
+            sections (Iterable[str], optional): The sections to combine, of "comments", "matches" and "replies". Defaults to all of them.
+        """
+        self.sections = list(sections)
+        self.records = RecordKeeper()
+        self._uids: Dict[str, Set[str]] = {section: set() for section in self.sections}
+
+    @staticmethod
+    def _uid(section: str, record: dict) -> str:
+        if section == "comments":
+            return record["uid"]
+        return record["comment"]["uid"]
+
+    def add(self, record: RecordKeeper) -> Dict[str, int]:
+        """Combine a record with those already added.
+
+        Args:
+            record (RecordKeeper): The record to add.
+
+        Returns:
+            Dict[str, int]: The number of new entries of each section.
+        """
+        added = {}
+        for section in self.sections:
+            uids = self._uids[section]
+            new = []
+            for entry in record.entries(section):
+                uid = RecordCombiner._uid(section, entry)
+                if uid not in uids:
+                    uids.add(uid)
+                    new.append(entry)
+            self.records.apply_journal({"type": section, "data": new})
+            added[section] = len(new)
+        return added
+
+
+class RecordMerger():
+    """Merges records into a single sequence sorted by comment utc then uid, dropping duplicate uids, in bounded memory.
+
+    Records are buffered until the memory budget is reached, then sorted and spilled to a temporary file as a run.
+    Runs are combined with a k-way merge. A comment's utc is when it was created, so copies of it sort next to each other,
+    and are dropped in the same pass without keeping a set of every uid.
+    If there are more runs than can be opened at once, they are first merged into fewer, longer runs.
+    """
+
+    SECTIONS = ("comments", "matches", "replies", "removed")
+
+    def __init__(self, memory_budget: int = 256 * 1024 * 1024, fan_in: int = 64, directory: Optional[str] = None):
+        """
+        Args:
+            memory_budget (int, optional): The approximate number of bytes of records buffered before a run is spilled. Defaults to 256MB.
+            fan_in (int, optional): The maximum number of runs merged at once. Defaults to 64.
+            directory (Optional[str], optional): Where runs are spilled. Defaults to the system temporary directory.
+        """
+        self.memory_budget = memory_budget
+        self.fan_in = max(fan_in, 2)
+        self.directory = directory
+        self.runs_spilled = 0
+
+    @staticmethod
+    def _item(section: str, entry: dict) -> list:
+        comment = entry if section in ("comments", "removed") else entry["comment"]
+        return [RecordMerger.SECTIONS.index(section), comment.get("utc") or 0, comment.get("uid") or "", section, entry]
+
+    @staticmethod
+    def _key(item: list) -> tuple:
+        return item[0], item[1], item[2]
+
+    def _spill(self, items: Iterable[list], directory: str) -> str:
+        handler, path = tempfile.mkstemp(suffix=".jsonl", dir=directory)
+        with os.fdopen(handler, "w", encoding="utf-8") as run:
+            for item in items:
+                run.write(json.dumps(item) + "\n")
+        self.runs_spilled += 1
+        return path
+
+    @staticmethod
+    def _read_run(path: str) -> Iterator[list]:
+        with open(path, "r", encoding="utf-8") as run:
+            for line in run:
+                yield json.loads(line)
+
+    def _merge_runs(self, runs: List[str]) -> Iterator[list]:
+        return heapq.merge(*[RecordMerger._read_run(run) for run in runs], key=RecordMerger._key)
+
+    def merge(self, entries: Iterable[Tuple[str, Any]]) -> Iterator[Tuple[str, Any]]:
+        """Merge records, as read by RecordReader.
+
+        Args:
+            entries (Iterable[Tuple[str, Any]]): The section and entry of each record, of "comments", "matches", "replies" or "removed".
+
+        Yields:
+            Tuple[str, Any]: The section and entry of each unique record, sections in order, then by utc and uid.
+        """
+        with tempfile.TemporaryDirectory(dir=self.directory) as directory:
+            runs = []
+            buffer = []
+            size = 0
+            for section, entry in entries:
+                item = RecordMerger._item(section, entry)
+                buffer.append(item)
+                # A rough estimate of a record's footprint once parsed.
+                size += 2 * len(entry.get("body", "")) + 500
+                if size >= self.memory_budget:
+                    buffer.sort(key=RecordMerger._key)
+                    runs.append(self._spill(buffer, directory))
+                    buffer = []
+                    size = 0
+
+            buffer.sort(key=RecordMerger._key)
+            if not len(runs):
+                merged = iter(buffer)
+            else:
+                if len(buffer):
+                    runs.append(self._spill(buffer, directory))
+                buffer = []
+                while len(runs) > self.fan_in:
+                    merged_run = self._spill(self._merge_runs(runs[0:self.fan_in]), directory)
+                    for run in runs[0:self.fan_in]:
+                        os.remove(run)
+                    runs = runs[self.fan_in:] + [merged_run]
+                merged = self._merge_runs(runs)
+
+            previous = None
+            for item in merged:
+                key = RecordMerger._key(item)
+                if key != previous:
+                    previous = key
+                    yield item[3], item[4]
+
+
+def combine_records(records: Iterable[RecordKeeper]) -> RecordKeeper:
     """Combine multiple records together into a single record, skipping duplicates.
 
     Args:
-        records (List[RecordKeeper]): A list of records to combine.
+        records (Iterable[RecordKeeper]): The records to combine. May be a generator, so only one record is loaded at a time.
 
     Returns:
         RecordKeeper: The records combined into a single entity.
     """
-    full_records = RecordKeeper()
+    combiner = RecordCombiner()
     for record in records:
-        comments = record.logged_comments()
-        for comment in comments:
-            if comment not in full_records.logged_comments():
-                full_records.log_comments(comment)
-        matches = record.logged_matches()
-        for match in matches:
-            if match.comment not in [m.comment for m in full_records.logged_matches()]:
-                full_records.log_matched_quote(match)
-        replies = record.logged_replies()
-        for reply in replies:
-            if reply.comment not in [r.comment for r in full_records.logged_replies()]:
-                full_records.log_reply(reply)
-    return full_records
+        combiner.add(record)
+    return combiner.records
+
+
+# Sentence pairs evaluated by each sweep worker process, sent once when the process starts.
+_worker_pairs = None
+
+
+def _start_sweep_worker(pairs: "SentencePairs"):
+    global _worker_pairs
+    _worker_pairs = pairs
+
+
+def _evaluate_parameters(parameters: dict) -> dict:
+    return _worker_pairs.evaluate(parameters)
+
+
+class SentencePairs():
+    """The similarities between the sentences of a set of comments and quotes, computed once so many sets of matcher parameters
+    can be evaluated without parsing or embedding the comments again.
+
+    Each candidate comment / quote pair holds the similarity of every comment sentence to every quote sentence, flattened in the
+    order the matcher visits them. scores applies the length filters, length bonus and sentence requirement of QuoteCommentNLPMatcher
+    to every pair at once, giving the same scores as QuoteNLPDetector, bit for bit, as QuoteSentenceMatrix similarities don't depend
+    on which quotes are scored.
+
+    Quotes which none of the parameter sets given when building could match a comment with are dropped, so other parameter sets
+    may miss matches.
+    """
+
+    PARAMETERS = ("quote_comment_delta", "minimum_sentence_word_length", "bonus_coeff", "bonus_start", "bonus_end",
+                  "match_sentence_coeff", "threshold", "store_count")
+
+    # Processes are spawned rather than forked, so workers don't inherit the parent's threads.
+    START_METHOD = "spawn"
+
+    def __init__(self, detector: QuoteNLPDetector, comments: List[Comment], parameter_sets: List[dict], filter_author: bool = False):
+        """
+        Args:
+            detector (QuoteNLPDetector): The detector whose quotes, parser and quote index are used.
+            comments (List[Comment]): The comments to match.
+            parameter_sets (List[dict]): The parameter sets to be evaluated, each setting every key of PARAMETERS.
+            filter_author (bool, optional): If True, comments which contain the quote's author are ignored. Defaults to False.
+
+        Raises:
+            ValueError: A threshold is not above 0, which would match every quote.
+        """
+        if any(parameters["threshold"] <= 0 for parameters in parameter_sets):
+            raise ValueError("Thresholds must be above 0 to sweep parameters.")
+        self.comment_count = len(comments)
+        matrix = detector.quote_matrix
+        bodies = [detector._get_only_ascii(comment.body) for comment in comments]
+        sentences = detector.parse(bodies)
+
+        # Slots past the last row are padding, given no words or length.
+        padding = matrix.slots >= len(matrix.vectors)
+        word_counts = np.append(matrix.word_counts, 0)
+        lengths = np.append(matrix.lengths, 0)
+        # The length bonus is linear in the similarity, so a pair's best score is found at the highest or lowest bonus of the sets.
+        multipliers = np.array([1 + np.minimum(word_counts - p["bonus_start"], p["bonus_end"]) * p["bonus_coeff"] for p in parameter_sets])
+        highest = multipliers.max(axis=0, initial=-np.inf)
+        lowest = multipliers.min(axis=0, initial=np.inf)
+        threshold = min([p["threshold"] for p in parameter_sets], default=np.inf)
+
+        columns = {"similarities": [], "comment_words": [], "comment_lengths": [], "quote_words": [], "quote_lengths": []}
+        comment_indexes = []
+        quote_indexes = []
+        for ic, comment_sentences in enumerate(sentences):
+            if len(comment_sentences) == 0 or matrix.slots.shape[1] == 0 or len(parameter_sets) == 0:
+                continue
+            similarities = np.array([matrix.similarities(sentence) for sentence in comment_sentences])
+            candidates = np.arange(len(matrix))
+            if detector.quote_index is not None:
+                candidates = detector.quote_index.candidate_quotes(comment_sentences, detector.index_probes, detector.index_candidates)
+            bounds = np.minimum(np.maximum(similarities * highest, similarities * lowest), 1.0)
+            candidates = candidates[bounds[:, matrix.slots[candidates]].max(axis=(0, 2)) >= threshold]
+
+            # Laid out as (quote, comment sentence, quote sentence), then flattened without the padding slots.
+            slots = matrix.slots[candidates][:, None, :]
+            shape = (len(candidates), len(comment_sentences), matrix.slots.shape[1])
+            used = np.broadcast_to(~padding[candidates][:, None, :], shape)
+            comment_words = np.array([len(sentence.text.split(" ")) for sentence in comment_sentences])[None, :, None]
+            comment_lengths = np.array([len(sentence.text) for sentence in comment_sentences])[None, :, None]
+            # Similarities are float32 products, so are stored as float32 without loss.
+            columns["similarities"].append(similarities[:, matrix.slots[candidates]].transpose(1, 0, 2)[used].astype(np.float32))
+            columns["comment_words"].append(np.broadcast_to(comment_words, shape)[used])
+            columns["comment_lengths"].append(np.broadcast_to(comment_lengths, shape)[used])
+            columns["quote_words"].append(np.broadcast_to(word_counts[slots], shape)[used])
+            columns["quote_lengths"].append(np.broadcast_to(lengths[slots], shape)[used])
+            comment_indexes.append(np.full(len(candidates), ic, dtype=np.int64))
+            quote_indexes.append(candidates)
+
+        for name, values in columns.items():
+            dtype = np.float32 if name == "similarities" else np.int32
+            setattr(self, name, np.concatenate(values).astype(dtype) if len(values) else np.zeros(0, dtype=dtype))
+        self.comments = np.concatenate(comment_indexes) if len(comment_indexes) else np.zeros(0, dtype=np.int64)
+        self.quotes = np.concatenate(quote_indexes) if len(quote_indexes) else np.zeros(0, dtype=np.int64)
+        self.sentence_counts = matrix.sentence_counts[self.quotes]
+        # The start of each pair's sentence pairs. Every kept pair has some, as quotes without sentences can't reach a threshold.
+        sizes = np.array([len(sentences[ic]) for ic in self.comments], dtype=np.int64) * self.sentence_counts
+        self.starts = np.cumsum(sizes) - sizes
+        self.contains_author = np.zeros(len(self.quotes), dtype=bool)
+        if filter_author:
+            self.contains_author = np.array([detector._contains_author(bodies[ic], detector.quotes[iq].author)
+                                             for ic, iq in zip(self.comments, self.quotes)], dtype=bool)
+
+    def __len__(self):
+        return len(self.quotes)
+
+    def scores(self, parameters: dict) -> np.ndarray:
+        """Score every comment / quote pair with a set of parameters.
+
+        Args:
+            parameters (dict): The matcher parameters.
+
+        Returns:
+            np.ndarray: The score of each pair, ordered as comments and quotes.
+        """
+        if len(self.quotes) == 0:
+            return np.zeros(0)
+        minimum_words = parameters["minimum_sentence_word_length"]
+        ratio = np.minimum(self.quote_lengths, self.comment_lengths) / np.maximum(np.maximum(self.quote_lengths, self.comment_lengths), 1)
+        used = (self.comment_words > minimum_words) & (self.quote_words > minimum_words) & (ratio > parameters["quote_comment_delta"])
+        bonus = 1 + np.minimum(self.quote_words - parameters["bonus_start"], parameters["bonus_end"]) * parameters["bonus_coeff"]
+        pairs = np.maximum(np.where(used, np.minimum(self.similarities * bonus, 1.0), 0.0), 0.0)
+
+        # As QuoteSentenceMatrix.scores, the best score is combined with the best score before it.
+        sizes = np.diff(np.append(self.starts, len(pairs)))
+        best = np.maximum.reduceat(pairs, self.starts)
+        positions = np.arange(len(pairs))
+        first_best = np.minimum.reduceat(np.where(pairs == np.repeat(best, sizes), positions, len(pairs)), self.starts)
+        previous = np.maximum.reduceat(np.where(positions < np.repeat(first_best, sizes), pairs, 0.0), self.starts)
+        required = np.floor(self.sentence_counts * parameters["match_sentence_coeff"]) + 1
+        return (best + (required - 1) * previous) / required
+
+    def _ranked_matches(self, parameters: dict, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.scores(parameters)
+        matched = np.flatnonzero((scores >= parameters["threshold"]) & ~self.contains_author)
+        # Ordered as the match store orders them: by comment, best score first, then by quote.
+        matched = matched[np.lexsort((self.quotes[matched], -scores[matched], self.comments[matched]))]
+        comments = self.comments[matched]
+        rank = np.arange(len(matched)) - np.searchsorted(comments, comments)
+        return scores, matched[rank < count]
+
+    def best_matches(self, parameters: dict) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the best match of each comment with a set of parameters.
+
+        Args:
+            parameters (dict): The matcher parameters and threshold.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The index of each comment's best quote, or -1 if it has no match, and its score.
+        """
+        quotes = np.full(self.comment_count, -1, dtype=np.int64)
+        best_scores = np.zeros(self.comment_count)
+        scores, kept = self._ranked_matches(parameters, 1)
+        quotes[self.comments[kept]] = self.quotes[kept]
+        best_scores[self.comments[kept]] = scores[kept]
+        return quotes, best_scores
+
+    def evaluate(self, parameters: dict) -> dict:
+        """Count the matches found with a set of parameters, keeping the best store_count matches of each comment.
+
+        Args:
+            parameters (dict): The matcher parameters, threshold and store count.
+
+        Returns:
+            dict: The parameters, with the number of comments matched, the number of matches kept, and their mean score.
+        """
+        scores, kept = self._ranked_matches(parameters, parameters["store_count"])
+        return dict(parameters,
+                    comments=len(np.unique(self.comments[kept])),
+                    matches=len(kept),
+                    mean_score=float(scores[kept].mean()) if len(kept) else 0.0)
+
+    def sweep(self, parameter_sets: List[dict], processes: int = 1) -> List[dict]:
+        """Evaluate many sets of parameters.
+
+        Args:
+            parameter_sets (List[dict]): The parameter sets.
+            processes (int, optional): The number of worker processes the sets are spread across. Defaults to 1, evaluating them in this process.
+
+        Returns:
+            List[dict]: The result of evaluate for each parameter set, in order.
+        """
+        if processes <= 1 or len(parameter_sets) <= 1:
+            return [self.evaluate(parameters) for parameters in parameter_sets]
+        context = multiprocessing.get_context(self.START_METHOD)
+        with context.Pool(processes, _start_sweep_worker, (self,)) as pool:
+            return pool.map(_evaluate_parameters, parameter_sets, chunksize=max(len(parameter_sets) // (4 * processes), 1))
 
 
 class Backtester():
     """A utility class used for backtesting quote to comment matches.
+
+    Can be used as a context manager, closing the detector on exit.
     """
 
-    def __init__(self, quotes: List[Quote], detector: Type[QuoteNLPDetector]):
-        self.detector = detector(quotes)
+    def __init__(self, quotes: List[Quote], detector: Type[QuoteNLPDetector], **kwargs):
+        """
+        Args:
+            quotes (List[Quote]): The quotes to match against.
+            detector (Type[QuoteNLPDetector]): The quote detector class to use.
+            kwargs: Additional keyword arguments passed to the detector, i.e a cache_directory.
+        """
+        self.detector = detector(quotes, **kwargs)
         self._matcher = QuoteCommentNLPMatcher(0, 0)
         self._threshold = 0.5
         self._store_count = 1
         self._filter_author = False
 
+    def __enter__(self) -> "Backtester":
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop any worker processes started by the detector, i.e by a QuoteParallelNLPDetector.
+        """
+        self.detector.close()
+
     def _worker(self, comments: List[Comment]):
         self.detector.apply(self._matcher, self._threshold, self._filter_author, comments)
         all_matches = []
@@ -62,6 +407,118 @@ class Backtester():
         """
         return self._worker(comments)
 
+    def iter_matches(self, comments: Iterable[Comment], batch_size: int = 256) -> Iterator[List[List[MatchedQuote]]]:
+        """Get quote matches for comments in batches, so only one batch of comments is held at a time.
+
+        Args:
+            comments (Iterable[Comment]): The comments to process, i.e from get_comments.
+            batch_size (int, optional): The number of comments matched at once. Defaults to 256.
+
+        Yields:
+            List[List[MatchedQuote]]: A nested list of the matches of each batch.
+        """
+        batch = []
+        for comment in comments:
+            batch.append(comment)
+            if len(batch) >= batch_size:
+                yield self._worker(batch)
+                batch = []
+        if len(batch):
+            yield self._worker(batch)
+
+    @staticmethod
+    def get_comments(path: str, section: str = "comments") -> Iterator[Comment]:
+        """Read comments from a records file one at a time, with RecordReader.
+
+        Args:
+            path (str): The records file, JSON or JSON Lines.
+            section (str, optional): The section to take comments from, "comments", "removed", or the comments of "matches" or "replies".
+                Defaults to "comments".
+
+        Yields:
+            Comment: Each comment of the section.
+        """
+        for _, entry in RecordReader.read(path, [section]):
+            yield Comment.from_dict(entry if section in ("comments", "removed") else entry["comment"])
+
+    @staticmethod
+    def parameter_grid(**values: List[Any]) -> List[dict]:
+        """Get every combination of parameter values, for sweep.
+
+        Args:
+            values (List[Any]): The values of each parameter, i.e threshold=[0.8, 0.9].
+
+        Returns:
+            List[dict]: A parameter set for each combination.
+        """
+        return [dict(zip(values.keys(), combination)) for combination in itertools.product(*values.values())]
+
+    def sweep(self, comments: List[Comment], parameter_sets: List[dict], processes: int = 1) -> List[dict]:
+        """Evaluate many sets of parameters against the same comments.
+
+        Comments are parsed, and their sentence similarities computed, once. Every parameter set is then evaluated over
+        the similarities, giving the same matches as set_parameters followed by get_matches, without the cost of matching again.
+        Requires a QuoteNLPDetector and a QuoteCommentNLPMatcher.
+
+        Args:
+            comments (List[Comment]): The comments to match.
+            parameter_sets (List[dict]): Each set may give any of the QuoteCommentNLPMatcher arguments, threshold and store_count,
+                others are taken from set_parameters. See parameter_grid.
+            processes (int, optional): The number of worker processes the sets are spread across. Defaults to 1.
+
+        Raises:
+            TypeError: The detector or matcher doesn't use NLP.
+            ValueError: A threshold is not above 0.
+
+        Returns:
+            List[dict]: A row for each parameter set, in order. Each gives the full parameters, the number of comments
+                matched, the number of matches stored, and their mean score.
+        """
+        parameter_sets = self._sweep_parameters(parameter_sets)
+        pairs = SentencePairs(self.detector, comments, parameter_sets, self._filter_author)
+        return pairs.sweep(parameter_sets, processes)
+
+    def sweep_best_matches(self, comments: List[Comment], parameter_sets: List[dict]) -> List[List[Optional[MatchedQuote]]]:
+        """Get the best match of each comment for many sets of parameters, computing similarities once as sweep does.
+
+        Args:
+            comments (List[Comment]): The comments to match.
+            parameter_sets (List[dict]): The parameter sets, as used by sweep.
+
+        Raises:
+            TypeError: The detector or matcher doesn't use NLP.
+            ValueError: A threshold is not above 0.
+
+        Returns:
+            List[List[Optional[MatchedQuote]]]: For each parameter set, the best match of each comment, or None if it has no match.
+        """
+        parameter_sets = self._sweep_parameters(parameter_sets)
+        pairs = SentencePairs(self.detector, comments, parameter_sets, self._filter_author)
+        results = []
+        for parameters in parameter_sets:
+            quotes, scores = pairs.best_matches(parameters)
+            results.append([MatchedQuote(comment, self.detector.quotes[iq], float(score)) if iq >= 0 else None
+                            for comment, iq, score in zip(comments, quotes, scores)])
+        return results
+
+    def _sweep_parameters(self, parameter_sets: List[dict]) -> List[dict]:
+        if not isinstance(self.detector, QuoteNLPDetector) or not isinstance(self._matcher, QuoteCommentNLPMatcher):
+            raise TypeError("Parameter sweeps require a QuoteNLPDetector and QuoteCommentNLPMatcher.")
+        defaults = {key: getattr(self._matcher, key) for key in SentencePairs.PARAMETERS[0:6]}
+        defaults.update(threshold=self._threshold, store_count=self._store_count)
+        return [dict(defaults, **parameters) for parameters in parameter_sets]
+
+    def parameters(self) -> dict:
+        """Get the parameters set by set_parameters.
+
+        Returns:
+            dict: The matcher's name and public attributes, with the threshold, store count and author filter.
+        """
+        parameters = {"matcher": type(self._matcher).__name__}
+        parameters.update({key: value for key, value in vars(self._matcher).items() if not key.startswith("_")})
+        parameters.update(threshold=self._threshold, store_count=self._store_count, filter_author=self._filter_author)
+        return parameters
+
     def set_parameters(self, matcher: QuoteCommentNLPMatcher, threshold: float, store_count: int, filter_author: bool):
         """Set the parameters used for get_matches
 
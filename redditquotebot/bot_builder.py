@@ -14,6 +14,7 @@ class BotBuilder():
         self._bot = RedditQuoteBot()
         self._quotes = QuoteDB([])
         self._quote_detector_instance = QuoteDetector
+        self._quote_detector_arguments = {}
 
     def credentials(self, credentials: Union[str, CredentialStore]):
         """Provide the credentials used for the bot.
@@ -113,13 +114,15 @@ class BotBuilder():
         self._bot.quote_matcher = matcher
         self._bot.quote_threshold = threshold
 
-    def quote_detector(self, detector: Type[QuoteDetector]):
+    def quote_detector(self, detector: Type[QuoteDetector], **kwargs):
         """Provide the quote detector used for quotes
 
         Args:
             matcher (QuoteDetector): A configured matcher to use.
+            kwargs: Additional keyword arguments passed to the detector when the bot is built.
         """
         self._quote_detector_instance = detector
+        self._quote_detector_arguments = kwargs
 
     def bot(self) -> RedditQuoteBot:
         """Get the bot with built specifications
@@ -128,8 +131,35 @@ class BotBuilder():
             RedditQuoteBot: The configured bot instance
         """
         # Reinstate the reddit class with the actual derived class specified
-        self._bot.reddit = Reddit(self._bot.configuration, self._bot.credentials)
-        self._bot.detector = self._quote_detector_instance(self._quotes)
+        bucket = None
+        requests_per_minute = self._bot.configuration.reddit.requests_per_minute
+        if requests_per_minute is not None:
+            # Allows bursts of up to a minute's worth of requests.
+            bucket = TokenBucket(requests_per_minute / 60, requests_per_minute)
+        self._bot.reddit = Reddit(self._bot.configuration, self._bot.credentials, bucket)
+        self._bot.detector = self._quote_detector_instance(self._quotes, **self._quote_detector_arguments)
+
+        storage = self._bot.configuration.records.storage
+        if storage not in ("json", "journal", "sqlite"):
+            raise ValueError(f"Unknown records storage {storage}, expected json, journal or sqlite.")
+        # The journal only applies to JSON records files, other filetypes keep their own handlers.
+        if not self._bot.ram_based_records and storage == "journal" and \
+                self._bot.record_keeper_loader["filepath"].endswith(FileTypes.JSON.value):
+            journal = RecordJournal(self._bot.configuration.records.compact_after)
+            self._bot.record_keeper_loader["handler"] = journal.read
+            self._bot.record_keeper_storer["handler"] = journal.write
+
+        if self._bot.configuration.bot.resident_state:
+            cache = WriteBehindCache(self._bot.configuration.bot.flush_interval, self._bot.configuration.bot.flush_after_changes)
+            self._bot.write_behind = cache
+            if not self._bot.ram_based_scrape_state:
+                self._bot.scrape_state_loader["handler"] = cache.reader(self._bot.scrape_state_loader["handler"])
+                self._bot.scrape_state_storer["handler"] = cache.writer(self._bot.scrape_state_storer["handler"])
+            # Journaled and SQLite records already avoid reloading, and manage their own files.
+            if not self._bot.ram_based_records and storage == "json" and \
+                    self._bot.record_keeper_loader["filepath"].endswith(FileTypes.JSON.value):
+                self._bot.record_keeper_loader["handler"] = cache.reader(self._bot.record_keeper_loader["handler"])
+                self._bot.record_keeper_storer["handler"] = cache.writer(self._bot.record_keeper_storer["handler"])
 
         # Create the scrape state and record keeper files if needed.
         if not self._bot.ram_based_scrape_state:
@@ -165,7 +195,9 @@ class BotBuilder():
     def _get_record_keeper_loader(self) -> Callable:
         fa = FileAssociator(
             {
-                FileTypes.JSON: RecordLoader.from_json
+                FileTypes.JSON: RecordLoader.from_json,
+                FileTypes.JSONL: RecordLoader.from_jsonl,
+                FileTypes.SQLITE: SQLiteRecordLoader.from_sqlite
             }
         )
         return fa.read
@@ -173,7 +205,9 @@ class BotBuilder():
     def _get_record_keeper_storer(self) -> Callable:
         fa = FileAssociator(
             {
-                FileTypes.JSON: RecordStorer.to_json
+                FileTypes.JSON: RecordStorer.to_json,
+                FileTypes.JSONL: RecordStorer.to_jsonl,
+                FileTypes.SQLITE: SQLiteRecordStorer.to_sqlite
             }
         )
         return fa.write
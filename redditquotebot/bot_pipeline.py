@@ -0,0 +1,255 @@
+from redditquotebot.reddit import *
+from redditquotebot.utilities import *
+from redditquotebot.nlp import *
+from typing import Callable, List
+import logging
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's input.
+_STOP = object()
+# Asks the reply stage to clean the bot's own comments, once every subreddit has been polled.
+_CLEAN = object()
+
+
+class _LockedRecords():
+    # Passes record keeping calls through to a RecordKeeper while holding the pipeline's lock, so each stage can log from its own thread.
+    def __init__(self, records: RecordKeeper, lock: threading.RLock):
+        self._records = records
+        self._lock = lock
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._records, name)
+        if not callable(attribute):
+            return attribute
+
+        def locked(*args, **kwargs):
+            with self._lock:
+                return attribute(*args, **kwargs)
+        return locked
+
+
+class BotPipeline():
+    """Runs the main loop of a RedditQuoteBot as a pipeline of stages, each in its own thread, so network waits and matching overlap.
+
+    Subreddits are fetched by a pool of fetch threads, each with its own Reddit connection. Fetched comments are filtered and
+    matched by a single matching stage, which owns the quote detector. Matches are replied to by a reply stage, which owns the
+    bot's Reddit connection. A writer saves the records and scrape state whenever they change, coalescing saves while it is busy.
+    Stages are connected by bounded queues, so a slow stage holds back the stages feeding it rather than letting work pile up.
+
+    Records and scrape state are loaded once, and shared between stages behind a lock.
+    """
+
+    def __init__(self, bot, fetch_workers: int = 1, queue_size: int = 4):
+        """
+        Args:
+            bot (RedditQuoteBot): The bot whose stages are run.
+            fetch_workers (int, optional): The number of fetch threads. Defaults to 1.
+            queue_size (int, optional): The number of items each queue holds before the stage feeding it waits. Defaults to 4.
+        """
+        self.bot = bot
+        self.fetch_workers = max(fetch_workers, 1)
+        self._lock = threading.RLock()
+        self._to_fetch = queue.Queue(maxsize=queue_size)
+        self._fetched = queue.Queue(maxsize=queue_size)
+        self._matched = queue.Queue(maxsize=queue_size)
+        self._dirty = threading.Event()
+        self._stopped = threading.Event()
+        self._in_flight = set()
+        self._in_flight_changed = threading.Condition(self._lock)
+        self._polled_since_clean = set()
+        self._failure = None
+        self.scrape_state = None
+        self.records = None
+
+    def run(self):
+        """Run the pipeline until a keyboard interrupt.
+
+        On interrupt no new subreddits are fetched, work already in the pipeline is finished and saved, then the process exits.
+        Further interrupts are delayed until then. If a stage, or the main thread, fails, the records and scrape state are saved
+        and its exception is raised.
+        """
+        self.scrape_state = self.bot._load_scrape_state()
+        self.records = _LockedRecords(self.bot._load_records(), self._lock)
+        threads = [self._thread(self._fetch_stage, f"pipeline-fetch-{i}") for i in range(self.fetch_workers)]
+        threads.append(self._thread(self._match_stage, "pipeline-match"))
+        threads.append(self._thread(self._reply_stage, "pipeline-reply"))
+        writer = self._thread(self._write_stage, "pipeline-write")
+
+        logger.info("Start up new bot pipeline.")
+        try:
+            while True:
+                for subreddit in self._next_subreddits():
+                    self._dispatch(subreddit)
+        except KeyboardInterrupt:
+            if self._failure is not None:
+                self._save_after_failure()
+                raise self._failure
+            print()
+            with DelayedKeyboardInterrupt():
+                logger.info("Stopping pipeline, finishing work in progress.")
+                for _ in range(self.fetch_workers):
+                    self._to_fetch.put(_STOP)
+                for thread in threads:
+                    thread.join()
+                self._stopped.set()
+                self._dirty.set()
+                writer.join()
+                self.bot.close()
+            sys.exit()
+        except Exception:
+            self._save_after_failure()
+            raise
+
+    def _save_after_failure(self):
+        # Work in progress is dropped, but everything recorded so far is written, including resident state.
+        with DelayedKeyboardInterrupt():
+            with self._lock:
+                self._save(flush=True)
+            self.bot.close()
+
+    def _thread(self, stage: Callable[[], None], name: str) -> threading.Thread:
+        # Daemon threads, so a stuck stage can't keep the process alive after a failure.
+        thread = threading.Thread(target=self._run_stage, args=(stage,), name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def _run_stage(self, stage: Callable[[], None]):
+        try:
+            stage()
+        except Exception as exp:
+            logger.exception(f"Pipeline stage {threading.current_thread().name} failed")
+            self._failure = exp
+            # Wakes the main thread, wherever it is waiting.
+            os.kill(os.getpid(), signal.SIGINT)
+
+    def _save(self, flush: bool = False):
+        self.bot._save_records(self.records._records)
+        self.bot._save_scrape_state(self.scrape_state)
+        if flush:
+            self.bot._flush_state()
+
+    def _next_subreddits(self) -> List[str]:
+        if not self.bot.configuration.bot.adaptive_schedule:
+            return self.bot.configuration.reddit.subreddits
+        with self._lock:
+            scheduler = self.bot._scheduler(self.scrape_state)
+            due = scheduler.due()
+            next_poll = scheduler.next_poll()
+        if not len(due):
+            # Subreddits being processed aren't queued, so the next poll time can change at any moment.
+            time.sleep(1 if next_poll is None else min(max(next_poll - time.time(), 0), 1))
+        return due
+
+    def _dispatch(self, subreddit: str):
+        with self._lock:
+            banned = subreddit in self.records.banned_subreddits()
+            if banned and self.bot.scheduler is not None:
+                self.bot.scheduler.postpone(self.scrape_state, subreddit, self.bot.configuration.bot.maximum_poll_interval)
+        if banned:
+            time.sleep(10)
+            return
+        with self._lock:
+            # A subreddit is only fetched once its previous fetch has been processed, so it starts from the latest cursors.
+            while subreddit in self._in_flight:
+                self._in_flight_changed.wait()
+            self._in_flight.add(subreddit)
+            cursors = self.scrape_state.fetch_cursors(subreddit)
+        self._to_fetch.put((subreddit, cursors))
+
+    def _fetch_stage(self):
+        reddit = None
+        while True:
+            item = self._to_fetch.get()
+            if item is _STOP:
+                self._fetched.put(_STOP)
+                return
+            subreddit, cursors = item
+            timer = TimeDelta()
+            try:
+                if reddit is None:
+                    reddit = self.bot.reddit.worker()
+                    reddit.connect()
+                comments = self.bot.fetch_comments(subreddit, cursors, reddit)
+            except Exception as exp:
+                logger.error(f"Received exception {exp} from Reddit")
+                time.sleep(30)
+                comments = exp
+            self._fetched.put((subreddit, comments, cursors, round(timer.elapsed(), 2)))
+
+    def _match_stage(self):
+        running_fetchers = self.fetch_workers
+        while running_fetchers:
+            item = self._fetched.get()
+            if item is _STOP:
+                running_fetchers -= 1
+                continue
+            subreddit, comments, cursors, fetch_time = item
+            self._polled_since_clean.add(subreddit)
+            with self._lock:
+                self._in_flight.discard(subreddit)
+                self._in_flight_changed.notify_all()
+                if isinstance(comments, Exception):
+                    if self.bot.scheduler is not None:
+                        self.bot.scheduler.postpone(self.scrape_state, subreddit, self.bot.configuration.bot.minimum_poll_interval)
+                    continue
+                self.scrape_state.update_fetch_cursors(cursors, subreddit)
+                new_comments = self.bot.filter_comments(subreddit, comments, self.scrape_state, self.records)
+
+            timer = TimeDelta()
+            matches = self.bot.get_matching_quotes(new_comments, self.records)
+            match_time = round(timer.elapsed(), 2)
+            with self._lock:
+                if self.bot.scheduler is not None:
+                    self.bot.scheduler.record_poll(self.scrape_state, subreddit, len(new_comments), len(matches))
+                banned = self.records.banned_subreddits()
+            self._matched.put((subreddit, matches, len(new_comments), fetch_time, match_time))
+
+            if self._polled_since_clean.issuperset(set(self.bot.configuration.reddit.subreddits) - set(banned)):
+                self._polled_since_clean = set()
+                if isinstance(self.bot.detector, QuoteNLPDetector):
+                    self.bot.detector.save_memo()
+                self._matched.put(_CLEAN)
+        self._matched.put(_STOP)
+
+    def _reply_stage(self):
+        while True:
+            item = self._matched.get()
+            if item is _STOP:
+                return
+            if item is _CLEAN:
+                self.bot.clean_own_comments(self.records)
+                self._dirty.set()
+                continue
+
+            subreddit, matches, comment_count, fetch_time, match_time = item
+            timer = TimeDelta()
+            threshold = self.bot.configuration.bot.reply_threshold
+            try:
+                replies = self.bot.reply_to_comments(matches, threshold, self.records)
+            except RedditReplyError:
+                logger.warning(
+                    f"Received forbidden exception from Praw, look like the bot has been banned from {subreddit}!")
+                self.records.add_banned_subreddit(subreddit)
+                replies = []
+            reply_time = round(timer.elapsed(), 2)
+            logger.info(
+                f"Subreddit {subreddit}: {comment_count} comments in {fetch_time}s, {len(matches)} matches in {match_time}s, {len(replies)} replies in {reply_time}s")
+            self._dirty.set()
+
+    def _write_stage(self):
+        while True:
+            self._dirty.wait()
+            # Stages have all finished once stopped is set, so the save which follows is the last one needed.
+            stopping = self._stopped.is_set()
+            self._dirty.clear()
+            with self._lock:
+                self._save(flush=stopping)
+            if stopping:
+                return
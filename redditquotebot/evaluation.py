@@ -0,0 +1,273 @@
+from redditquotebot.backtesting import Backtester
+from redditquotebot.reddit import Comment
+from redditquotebot.quotes import Quote
+from redditquotebot.nlp import MatchedQuote
+from redditquotebot.utilities import RecordReader, TimeDelta
+from io import TextIOWrapper
+from typing import Dict, Iterable, List, Optional, Tuple
+import csv
+import json
+import numpy as np
+
+
+class LabelLoader():
+    """Provides static methods for loading comment labels
+    """
+    @staticmethod
+    def from_csv(file_handler: TextIOWrapper) -> Dict[str, Optional[str]]:
+        """Load labels from a CSV file.
+
+        Expects headings comment_uid and quote_id. The quote id is given by Quote.content_id, an empty id labels a comment
+        which shouldn't match any quote. Other columns are ignored.
+
+        Args:
+            file_handler (TextIOWrapper): Open file handler
+
+        Raises:
+            KeyError: The file doesn't have the expected headings.
+
+        Returns:
+            Dict[str, Optional[str]]: The expected quote id of each comment uid.
+        """
+        reader = csv.DictReader(file_handler)
+        if reader.fieldnames is None or not {"comment_uid", "quote_id"} <= set(reader.fieldnames):
+            raise KeyError("Expected headings comment_uid and quote_id in labels file.")
+        return {row["comment_uid"]: row["quote_id"] or None for row in reader}
+
+
+class LabelStorer():
+    """Provides static methods for storing comment labels
+    """
+    @staticmethod
+    def to_csv(file_handler: TextIOWrapper, labels: Dict[str, Optional[str]], descriptions: Optional[Dict[str, str]] = None):
+        """Store labels to a CSV file, as read by LabelLoader.from_csv.
+
+        Args:
+            file_handler (TextIOWrapper): Open file handler
+            labels (Dict[str, Optional[str]]): The expected quote id of each comment uid, or None if it shouldn't match any quote.
+            descriptions (Optional[Dict[str, str]], optional): Text written alongside each label for whoever reviews it. Defaults to None.
+        """
+        descriptions = {} if descriptions is None else descriptions
+        writer = csv.writer(file_handler, lineterminator="\n")
+        writer.writerow(["comment_uid", "quote_id", "description"])
+        for uid, quote_id in labels.items():
+            writer.writerow([uid, quote_id or "", descriptions.get(uid, "")])
+
+
+class LabeledSet():
+    """Comments, each labeled with the id of the quote it should match, or None if it shouldn't match any quote.
+    """
+
+    def __init__(self, comments: List[Comment], expected: List[Optional[str]]):
+        """
+        Args:
+            comments (List[Comment]): The comments.
+            expected (List[Optional[str]]): The expected quote id of each comment, given by Quote.content_id.
+
+        Raises:
+            ValueError: The number of comments and labels differ.
+        """
+        if len(comments) != len(expected):
+            raise ValueError(f"Expected a label for each comment, got {len(expected)} labels for {len(comments)} comments.")
+        self.comments = comments
+        self.expected = expected
+
+    def __len__(self):
+        return len(self.comments)
+
+    def positives(self) -> int:
+        """Get the number of comments which should match a quote.
+
+        Returns:
+            int: The number of comments labeled with a quote.
+        """
+        return sum([quote_id is not None for quote_id in self.expected])
+
+    @staticmethod
+    def from_records(path: str, labels: Dict[str, Optional[str]], section: str = "comments") -> "LabeledSet":
+        """Build a labeled set from the comments of a records file, and their labels. Comments without a label are skipped.
+
+        Args:
+            path (str): The records file, JSON or JSON Lines.
+            labels (Dict[str, Optional[str]]): The expected quote id of each comment uid, i.e from LabelLoader.from_csv.
+            section (str, optional): The section comments are taken from, as used by Backtester.get_comments. Defaults to "comments".
+
+        Raises:
+            KeyError: A labeled comment isn't in the records.
+
+        Returns:
+            LabeledSet: The labeled comments, in the order of the labels.
+        """
+        comments = {}
+        for comment in Backtester.get_comments(path, section):
+            if comment.uid in labels and comment.uid not in comments:
+                comments[comment.uid] = comment
+        missing = [uid for uid in labels if uid not in comments]
+        if len(missing):
+            raise KeyError(f"{len(missing)} labeled comments weren't found in {path}, i.e {missing[0]}.")
+        return LabeledSet([comments[uid] for uid in labels], list(labels.values()))
+
+    @staticmethod
+    def draft_labels(path: str) -> Tuple[Dict[str, Optional[str]], Dict[str, str]]:
+        """Draft labels from the matches of a records file, labeling each comment with its best logged match, to be reviewed
+        before use.
+
+        Args:
+            path (str): The records file, JSON or JSON Lines.
+
+        Returns:
+            Tuple[Dict[str, Optional[str]], Dict[str, str]]: The labels, and a description of each, as used by LabelStorer.to_csv.
+        """
+        labels = {}
+        descriptions = {}
+        for _, match in RecordReader.read(path, ["matches"]):
+            uid = match["comment"]["uid"]
+            # Matches are logged best first, so later matches of the same comment are skipped.
+            if uid not in labels:
+                labels[uid] = Quote.from_dict(match["quote"]).content_id()
+                descriptions[uid] = f"{match['score']:.4f} | {match['comment']['body']} | {match['quote']['body']}"
+        return labels, descriptions
+
+
+class Evaluator():
+    """Measures how well a matcher's predictions agree with a labeled set.
+
+    A comment's prediction is its best match, if the match's score reaches a threshold. Predicting the labeled quote is a true
+    positive, predicting any other quote a false positive, and a labeled quote which isn't predicted a false negative.
+    Precision is 1 when nothing is predicted, recall is 1 when nothing is labeled.
+
+    Matches below the matcher's threshold aren't kept, so threshold curves start at the threshold used to match.
+    """
+
+    def __init__(self, labels: LabeledSet, thresholds: Optional[Iterable[float]] = None):
+        """
+        Args:
+            labels (LabeledSet): The labeled comments.
+            thresholds (Optional[Iterable[float]], optional): The thresholds of the curves in each report. Defaults to steps of 0.01 from 0 to 1.
+        """
+        self.labels = labels
+        self.thresholds = np.linspace(0, 1, 101) if thresholds is None else np.array(sorted(thresholds), dtype=np.float64)
+
+    def metrics(self, predicted: List[Optional[str]], scores: np.ndarray, thresholds: np.ndarray) -> Dict[str, np.ndarray]:
+        """Compute precision, recall and F1 at many thresholds at once.
+
+        Args:
+            predicted (List[Optional[str]]): The quote id of each comment's best match, or None if it has no match.
+            scores (np.ndarray): The score of each comment's best match.
+            thresholds (np.ndarray): The thresholds a match's score must reach to count as a prediction.
+
+        Returns:
+            Dict[str, np.ndarray]: The true_positives, false_positives, false_negatives, precision, recall and f1 at each threshold.
+        """
+        thresholds = np.asarray(thresholds, dtype=np.float64)
+        has_match = np.array([quote_id is not None for quote_id in predicted], dtype=bool)
+        correct = np.array([p is not None and p == e for p, e in zip(predicted, self.labels.expected)], dtype=bool)
+        # Predictions sorted from best to worst score, so the predictions reaching each threshold are a prefix.
+        scores = np.where(has_match, np.asarray(scores, dtype=np.float64), -np.inf)
+        order = np.argsort(-scores, kind="stable")
+        predictions = np.searchsorted(-scores[order], -thresholds, side="right")
+        true_positives = np.concatenate([[0], np.cumsum(correct[order])])[predictions]
+        false_positives = predictions - true_positives
+        positives = self.labels.positives()
+        precision = np.divide(true_positives, predictions, out=np.ones(len(thresholds)), where=predictions > 0)
+        recall = np.divide(true_positives, positives, out=np.ones(len(thresholds)), where=np.full(len(thresholds), positives > 0))
+        total = precision + recall
+        f1 = np.divide(2 * precision * recall, total, out=np.zeros(len(thresholds)), where=total > 0)
+        return {
+            "true_positives": true_positives,
+            "false_positives": false_positives,
+            "false_negatives": positives - true_positives,
+            "precision": precision,
+            "recall": recall,
+            "f1": f1
+        }
+
+    def report(self, name: str, parameters: dict, matches: List[Optional[MatchedQuote]], seconds: Optional[float] = None) -> dict:
+        """Report the agreement of a matcher's best matches with the labels.
+
+        Args:
+            name (str): The name of the configuration.
+            parameters (dict): The parameters used to match, including the threshold.
+            matches (List[Optional[MatchedQuote]]): The best match of each labeled comment, or None if it has no match.
+            seconds (Optional[float], optional): The time taken to match, if measured. Defaults to None.
+
+        Returns:
+            dict: The metrics at the threshold used, the threshold giving the best F1, and rounded threshold curves.
+        """
+        predicted = [None if match is None else match.quote.content_id() for match in matches]
+        scores = np.array([0.0 if match is None else match.score for match in matches])
+        threshold = parameters["threshold"]
+        at_threshold = {key: values[0] for key, values in self.metrics(predicted, scores, np.array([threshold])).items()}
+        thresholds = self.thresholds[self.thresholds >= threshold]
+        curve = self.metrics(predicted, scores, thresholds)
+        best = int(np.argmax(curve["f1"])) if len(thresholds) else None
+
+        report = {
+            "name": name,
+            "parameters": parameters,
+            "comments": len(self.labels),
+            "labeled_matches": self.labels.positives(),
+            "threshold": threshold,
+            "true_positives": int(at_threshold["true_positives"]),
+            "false_positives": int(at_threshold["false_positives"]),
+            "false_negatives": int(at_threshold["false_negatives"]),
+            "precision": round(float(at_threshold["precision"]), 4),
+            "recall": round(float(at_threshold["recall"]), 4),
+            "f1": round(float(at_threshold["f1"]), 4),
+            "best_threshold": None if best is None else round(float(thresholds[best]), 4),
+            "best_f1": None if best is None else round(float(curve["f1"][best]), 4),
+            "curve": {
+                "thresholds": [round(float(t), 4) for t in thresholds],
+                "precision": [round(float(p), 4) for p in curve["precision"]],
+                "recall": [round(float(r), 4) for r in curve["recall"]],
+                "f1": [round(float(f), 4) for f in curve["f1"]]
+            }
+        }
+        if seconds is not None:
+            report["seconds"] = round(seconds, 4)
+            report["comments_per_second"] = round(len(self.labels) / max(seconds, 1e-9), 1)
+        return report
+
+    def evaluate(self, backtester: Backtester, name: str = "") -> dict:
+        """Match the labeled comments with a backtester's current parameters, and report the results, including the time taken.
+
+        Args:
+            backtester (Backtester): The backtester, with its parameters set.
+            name (str, optional): The name of the configuration. Defaults to "".
+
+        Returns:
+            dict: The report, see report.
+        """
+        # Copies are matched, as the detector cleans comment bodies in place.
+        comments = [Comment.from_dict(comment.to_dict()) for comment in self.labels.comments]
+        timer = TimeDelta()
+        best = {matches[0].comment.uid: matches[0] for matches in backtester.get_matches(comments) if len(matches)}
+        seconds = timer.elapsed()
+        return self.report(name, backtester.parameters(), [best.get(comment.uid) for comment in comments], seconds)
+
+    def evaluate_sweep(self, backtester: Backtester, parameter_sets: List[dict], name: str = "") -> List[dict]:
+        """Report the results of many sets of parameters, matching with Backtester.sweep_best_matches.
+
+        Args:
+            backtester (Backtester): The backtester, whose parameters are used for those not given by each set.
+            parameter_sets (List[dict]): The parameter sets, as used by Backtester.sweep.
+            name (str, optional): The name of the configurations, numbered by set. Defaults to "".
+
+        Returns:
+            List[dict]: The report of each parameter set, without timings, as similarities are shared between sets.
+        """
+        defaults = backtester.parameters()
+        results = backtester.sweep_best_matches(self.labels.comments, parameter_sets)
+        return [self.report(f"{name}{index}", dict(defaults, **parameters), matches)
+                for index, (parameters, matches) in enumerate(zip(parameter_sets, results))]
+
+    @staticmethod
+    def to_jsonl(file_handler: TextIOWrapper, reports: Iterable[dict]):
+        """Write reports as JSON Lines, one report per line, so reports of later runs can be appended.
+
+        Args:
+            file_handler (TextIOWrapper): Open file handler
+            reports (Iterable[dict]): The reports.
+        """
+        for report in reports:
+            file_handler.write(json.dumps(report) + "\n")
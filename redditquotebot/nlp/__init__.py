@@ -1,3 +1,9 @@
 from .matched_quote import MatchedQuote
+from .match_store import MatchStore
+from .cleaned_sentence import CleanedSentence
+from .quote_embedding_cache import QuoteEmbeddingCache
+from .comment_memo import CommentMemo, MemoEntry
+from .quote_sentence_matrix import QuoteSentenceMatrix
 from .quote_comment_matcher import QuoteCommentMatcher, QuoteCommentLengthMatcher, QuoteCommentNLPMatcher
-from .quote_detector import QuoteDetector, QuoteNLPDetector
+from .quote_sentence_index import QuoteSentenceIndex
+from .quote_detector import QuoteDetector, QuoteNLPDetector, QuoteParallelNLPDetector
@@ -0,0 +1,65 @@
+from spacy.tokens.token import Token
+from typing import List
+import numpy as np
+
+
+class CleanedSentence():
+    """A cleaned sentence built directly from already parsed tokens.
+
+    Provides the parts of the spacy Doc interface used by the NLP matchers (text, vector, vector_norm and similarity),
+    without running the cleaned text through the spacy pipeline a second time.
+    """
+
+    def __init__(self, tokens: List[Token], width: int):
+        """
+        Args:
+            tokens (List[Token]): The tokens kept after cleaning.
+            width (int): The width of the word vectors, used when no tokens are kept.
+        """
+        self.text = " ".join([token.text for token in tokens])
+        self._length = len(tokens)
+        if len(tokens):
+            self.vector = np.mean([token.vector for token in tokens], axis=0)
+        else:
+            self.vector = np.zeros(width, dtype=np.float32)
+        self.vector_norm = float(np.sqrt((self.vector ** 2).sum()))
+
+    @staticmethod
+    def from_vector(text: str, length: int, vector: np.ndarray):
+        """Create a cleaned sentence from a previously computed vector.
+
+        Args:
+            text (str): The cleaned text.
+            length (int): The number of tokens in the cleaned text.
+            vector (np.ndarray): The sentence vector.
+
+        Returns:
+            CleanedSentence: The constructed sentence.
+        """
+        sentence = CleanedSentence([], len(vector))
+        sentence.text = text
+        sentence._length = length
+        sentence.vector = vector
+        sentence.vector_norm = float(np.sqrt((vector ** 2).sum()))
+        return sentence
+
+    def __len__(self):
+        return self._length
+
+    def __repr__(self):
+        return self.text
+
+    def similarity(self, other) -> float:
+        """Get the cosine similarity to another sentence. Identical sentences always score 1.
+
+        Args:
+            other (CleanedSentence): The sentence to compare with.
+
+        Returns:
+            float: The similarity score.
+        """
+        if self.text == other.text:
+            return 1.0
+        if self.vector_norm == 0 or other.vector_norm == 0:
+            return 0.0
+        return float(np.dot(self.vector, other.vector) / (self.vector_norm * other.vector_norm))
@@ -0,0 +1,161 @@
+from redditquotebot.nlp import CleanedSentence
+from spacy.tokens.doc import Doc
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple, Union
+import base64
+import hashlib
+import json
+import os
+import time
+import numpy as np
+
+
+class MemoEntry():
+    """The memoised result of matching a comment body.
+    """
+
+    def __init__(self, sentences: Optional[List[Union[Doc, CleanedSentence]]], scoring_key: str, matches: List[Tuple[int, float]], added: float):
+        """
+        Args:
+            sentences (Optional[List[Union[Doc, CleanedSentence]]]): The cleaned sentences of the body, if known.
+            scoring_key (str): Describes the matcher, threshold and author filter the matches were found with.
+            matches (List[Tuple[int, float]]): The index and score of each matching quote.
+            added (float): The time the entry was stored.
+        """
+        self.sentences = sentences
+        self.scoring_key = scoring_key
+        self.matches = matches
+        self.added = added
+
+
+class CommentMemo():
+    """A bounded least recently used cache of matched comment bodies, keyed by a hash of the body.
+
+    Repeated comments (copy pastes, spam, catchphrases) reuse the stored sentences and matches instead of being parsed and scored again.
+    Entries are evicted when the cache is full, or when they are older than a time to live if one is set.
+    """
+
+    # Increment when the layout of saved files changes.
+    VERSION = 1
+
+    def __init__(self, size: int, ttl: Optional[float] = None, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            size (int): The maximum number of entries.
+            ttl (Optional[float], optional): Time in seconds an entry is kept for. Defaults to keeping entries until they are evicted.
+            clock (Callable[[], float], optional): Source of the current time in seconds. Defaults to time.time.
+        """
+        self.size = size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(body: str) -> str:
+        """Get the key of an ASCII normalised comment body.
+
+        Args:
+            body (str): The comment body.
+
+        Returns:
+            str: The key, as a hex digest.
+        """
+        return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+    def get(self, body: str) -> Optional[MemoEntry]:
+        """Get the entry of a comment body, marking it as recently used.
+
+        Args:
+            body (str): The ASCII normalised comment body.
+
+        Returns:
+            Optional[MemoEntry]: The entry, or None if the body isn't stored or has expired.
+        """
+        key = self.key(body)
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl is not None and self._clock() - entry.added > self.ttl:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, body: str, sentences: Optional[List[Union[Doc, CleanedSentence]]], scoring_key: str, matches: List[Tuple[int, float]]):
+        """Store the result of matching a comment body, evicting the least recently used entry if full.
+
+        Args:
+            body (str): The ASCII normalised comment body.
+            sentences (Optional[List[Union[Doc, CleanedSentence]]]): The cleaned sentences of the body, if known.
+            scoring_key (str): Describes the matcher, threshold and author filter the matches were found with.
+            matches (List[Tuple[int, float]]): The index and score of each matching quote.
+        """
+        if self.size <= 0:
+            return
+        key = self.key(body)
+        self._entries[key] = MemoEntry(sentences, scoring_key, matches, self._clock())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def save(self, path: str, context: str):
+        """Save the entries to a JSON file, so they survive restarts.
+
+        Args:
+            path (str): The file to write.
+            context (str): Identifies the quotes and model the entries are only valid for.
+        """
+        entries = []
+        for key, entry in self._entries.items():
+            sentences = None
+            if entry.sentences is not None:
+                sentences = [{
+                    "text": sentence.text,
+                    "length": len(sentence),
+                    "vector": base64.b64encode(np.asarray(sentence.vector, dtype=np.float32).tobytes()).decode("ascii")
+                } for sentence in entry.sentences]
+            entries.append({
+                "key": key,
+                "sentences": sentences,
+                "scoring_key": entry.scoring_key,
+                "matches": entry.matches,
+                "added": entry.added
+            })
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handler:
+            json.dump({"version": CommentMemo.VERSION, "context": context, "entries": entries}, handler)
+        os.replace(temporary, path)
+
+    def load(self, path: str, context: str):
+        """Load entries saved by save. Missing files, or files saved with a different version or context, are ignored.
+
+        Args:
+            path (str): The file to read.
+            context (str): Identifies the quotes and model the entries must be valid for.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as handler:
+                loaded = json.load(handler)
+        except (FileNotFoundError, ValueError):
+            return
+        if loaded.get("version") != CommentMemo.VERSION or loaded.get("context") != context:
+            return
+        for stored in loaded["entries"]:
+            sentences = None
+            if stored["sentences"] is not None:
+                sentences = [CleanedSentence.from_vector(
+                    sentence["text"],
+                    sentence["length"],
+                    np.frombuffer(base64.b64decode(sentence["vector"]), dtype=np.float32)
+                ) for sentence in stored["sentences"]]
+            matches = [(int(iq), float(score)) for iq, score in stored["matches"]]
+            self._entries[stored["key"]] = MemoEntry(sentences, stored["scoring_key"], matches, stored["added"])
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
@@ -0,0 +1,141 @@
+from redditquotebot.reddit import Comment
+from redditquotebot.nlp import MatchedQuote
+from typing import Callable, Dict, List, Optional
+import heapq
+import itertools
+import sys
+import time
+
+
+class _StoredComment():
+    def __init__(self, cycle: int, added: float):
+        self.cycle = cycle
+        self.added = added
+        self.heap = []
+        # The heap entry of each quote matched, by quote body, as quotes are compared by their body.
+        self.entries = {}
+
+
+class MatchStore():
+    """Stores quote matches keyed by comment uid, keeping only the best matches of each comment.
+
+    Comments are evicted when a new cycle starts. By default only comments stored during the current cycle are kept,
+    if a time to live is set, comments are instead kept until they are older than it.
+    Each quote is stored once per comment, matching a comment against a quote again replaces the earlier match.
+    """
+
+    def __init__(self, maximum_per_comment: Optional[int] = None, ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            maximum_per_comment (Optional[int], optional): The number of best matches kept for each comment. Defaults to keeping all matches.
+            ttl (Optional[float], optional): Time in seconds a comment is kept for. Defaults to keeping comments for a single cycle.
+            clock (Callable[[], float], optional): Source of the current time in seconds. Defaults to time.monotonic.
+        """
+        self.maximum_per_comment = maximum_per_comment
+        self.ttl = ttl
+        self._clock = clock
+        self._cycle = 0
+        self._order = itertools.count()
+        # Insertion ordered, so the oldest comments are always first.
+        self._comments: Dict[str, _StoredComment] = {}
+
+    def new_cycle(self):
+        """Start a new cycle, evicting comments which are no longer kept.
+        """
+        self._cycle += 1
+        self.evict()
+
+    def evict(self):
+        """Remove comments from previous cycles, or older than the time to live if one is set.
+        """
+        now = self._clock()
+        while len(self._comments):
+            uid = next(iter(self._comments))
+            stored = self._comments[uid]
+            if self.ttl is None and stored.cycle >= self._cycle:
+                break
+            if self.ttl is not None and now - stored.added <= self.ttl:
+                break
+            del self._comments[uid]
+
+    def add(self, match: MatchedQuote):
+        """Store a match. If the comment already has the maximum number of matches, the worst is discarded.
+
+        A match of a quote already stored for the comment, such as when a comment is crawled again while kept, replaces it.
+
+        Args:
+            match (MatchedQuote): The match to store.
+        """
+        stored = self._comments.get(match.comment.uid)
+        if stored is None:
+            stored = _StoredComment(self._cycle, self._clock())
+            self._comments[match.comment.uid] = stored
+        key = match.quote.body
+        # Ties are broken by insertion order, earlier matches ranking higher.
+        order = -next(self._order)
+        previous = stored.entries.pop(key, None)
+        if previous is not None:
+            # Keeps the order of the first match, so replacing a match doesn't change how ties rank.
+            order = previous[1]
+            stored.heap.remove(previous)
+            heapq.heapify(stored.heap)
+        entry = (match.score, order, match)
+        if self.maximum_per_comment is None or len(stored.heap) < self.maximum_per_comment:
+            heapq.heappush(stored.heap, entry)
+            stored.entries[key] = entry
+        elif self.maximum_per_comment > 0:
+            discarded = heapq.heappushpop(stored.heap, entry)
+            if discarded is not entry:
+                del stored.entries[discarded[2].quote.body]
+                stored.entries[key] = entry
+
+    def get(self, comment: Comment, maximum: Optional[int] = None) -> List[MatchedQuote]:
+        """Get the stored matches of a comment, sorted from best match to worst.
+
+        Args:
+            comment (Comment): The comment to search for.
+            maximum (Optional[int], optional): The maximum number of matches, if not used, all stored matches are returned. Defaults to None.
+
+        Returns:
+            List[MatchedQuote]: The matches of the comment.
+        """
+        stored = self._comments.get(comment.uid)
+        if stored is None:
+            return []
+        matches = [match for _, _, match in sorted(stored.heap, reverse=True)]
+        if maximum is None:
+            return matches
+        return matches[0:maximum]
+
+    def clear(self):
+        """Remove all stored matches.
+        """
+        self._comments = {}
+
+    def __len__(self):
+        return len(self._comments)
+
+    def match_count(self) -> int:
+        """Get the number of matches stored across all comments.
+
+        Returns:
+            int: The number of matches.
+        """
+        return sum([len(stored.heap) for stored in self._comments.values()])
+
+    def memory_statistics(self) -> dict:
+        """Get statistics on the size of the store.
+
+        Returns:
+            dict: The number of comments and matches stored, and the approximate size in bytes of the store's own containers,
+                excluding the comments and quotes they reference.
+        """
+        size = sys.getsizeof(self._comments)
+        for stored in self._comments.values():
+            size += sys.getsizeof(stored) + sys.getsizeof(stored.heap) + sys.getsizeof(stored.entries)
+            size += sum([sys.getsizeof(entry) for entry in stored.heap])
+        return {
+            "comments": len(self._comments),
+            "matches": self.match_count(),
+            "bytes": size
+        }
@@ -1,20 +1,26 @@
 from redditquotebot.reddit import Comment
 from redditquotebot.quotes import Quote
+from redditquotebot.nlp import QuoteSentenceMatrix
 from spacy.tokens.doc import Doc
-from typing import List
+from typing import List, Optional
+import numpy as np
 from math import floor
 from statistics import mean
 
 
 class QuoteCommentMatcher():
     """Base class which defines a matcher for a single quote and comment.
+
+    Derived matchers implement _score_pair, which must be free of side effects. Scoring is then available as:
+        score(comment, quote) and score_many(comment, quotes): Stateless, safe to share across threads.
+        compare(comment, quote) followed by score(): Stores the result of the last comparison.
     """
 
     def __init__(self):
         self._score = 0
 
-    def compare(self, comment: Comment, quote: Quote):
-        """Compare a comment and quote. Any derived compare operator should set the score between 0 and 1.
+    def _score_pair(self, comment, quote) -> float:
+        """Score a comment and quote, without modifying the matcher.
 
         Args:
             comment (Comment): The comment to use.
@@ -25,8 +31,26 @@ class QuoteCommentMatcher():
         """
         raise NotImplementedError()
 
-    def score(self) -> float:
-        """Get the resulting score of a compare operation.
+    def _check_score(self, score: float) -> float:
+        if score > 1 or score < 0:
+            raise ValueError(f"Score is expected to be between 0 and 1, got value {score}")
+        return score
+
+    def compare(self, comment: Comment, quote: Quote):
+        """Compare a comment and quote, storing the score.
+
+        Args:
+            comment (Comment): The comment to use.
+            quote (Quote): The quote to use.
+        """
+        self._score = self._score_pair(comment, quote)
+
+    def score(self, comment: Optional[Comment] = None, quote: Optional[Quote] = None) -> float:
+        """Score a comment and quote. If neither are given, get the resulting score of the last compare operation.
+
+        Args:
+            comment (Optional[Comment], optional): The comment to use. Defaults to None.
+            quote (Optional[Quote], optional): The quote to use. Defaults to None.
 
         Raises:
             ValueError: The score is outside the 0-1 range.
@@ -34,9 +58,24 @@ class QuoteCommentMatcher():
         Returns:
             float: The score of the comparion. Must be between 0 and 1
         """
-        if self._score > 1 or self._score < 0:
-            raise ValueError(f"Score is expected to be between 0 and 1, got value {self._score}")
-        return self._score
+        if comment is None and quote is None:
+            return self._check_score(self._score)
+        return self._check_score(self._score_pair(comment, quote))
+
+    def score_many(self, comment: Comment, quotes: List[Quote]) -> np.ndarray:
+        """Score a comment against a list of quotes, without modifying the matcher.
+
+        Args:
+            comment (Comment): The comment to use.
+            quotes (List[Quote]): The quotes to use.
+
+        Raises:
+            ValueError: A score is outside the 0-1 range.
+
+        Returns:
+            np.ndarray: The score of each quote.
+        """
+        return np.array([self.score(comment, quote) for quote in quotes], dtype=np.float64)
 
 
 class QuoteCommentLengthMatcher(QuoteCommentMatcher):
@@ -46,19 +85,40 @@ class QuoteCommentLengthMatcher(QuoteCommentMatcher):
     def __init__(self):
         QuoteCommentMatcher.__init__(self)
 
-    def compare(self, comment: Comment, quote: Quote):
+    def _score_pair(self, comment: Comment, quote: Quote) -> float:
         """Compare character length of the quote's body to the character length of the comment's body.
 
         Args:
             comment (Comment): The comment to use.
             quote (Quote): The quote to use.
+
+        Returns:
+            float: The score, empty bodies are treated as the same length.
         """
         comment_length = len(comment.body)
         quote_length = len(quote.body)
         if comment_length > quote_length:
-            self._score = quote_length / comment_length
+            return quote_length / comment_length
+        elif quote_length == 0:
+            return 1.0
         else:
-            self._score = comment_length / quote_length
+            return comment_length / quote_length
+
+    def score_many(self, comment: Comment, quotes: List[Quote]) -> np.ndarray:
+        """Compare the character length of each quote's body to the character length of the comment's body.
+
+        Args:
+            comment (Comment): The comment to use.
+            quotes (List[Quote]): The quotes to use.
+
+        Returns:
+            np.ndarray: The score of each quote.
+        """
+        comment_length = len(comment.body)
+        quote_lengths = np.array([len(quote.body) for quote in quotes], dtype=np.float64)
+        longest = np.maximum(quote_lengths, comment_length)
+        shortest = np.minimum(quote_lengths, comment_length)
+        return np.where(longest > 0, shortest / np.maximum(longest, 1), 1.0)
 
 
 class QuoteCommentNLPMatcher(QuoteCommentMatcher):
@@ -115,7 +175,7 @@ class QuoteCommentNLPMatcher(QuoteCommentMatcher):
         score *= 1 + bonus * self.bonus_coeff
         return 1.0 if score > 1.0 else score
 
-    def compare(self, comment: List[Doc], quote: List[Doc]):
+    def _score_pair(self, comment: List[Doc], quote: List[Doc]) -> float:
         min_matched_sentence = floor(len(quote) * self.match_sentence_coeff) + 1
         max_scores = [0.0 for _ in range(min_matched_sentence)]
         for csent in comment:
@@ -131,4 +191,20 @@ class QuoteCommentNLPMatcher(QuoteCommentMatcher):
                         for i in range(min_matched_sentence - 1):
                             max_scores[i + 1] = max_scores[i]
                         max_scores[0] = score
-        self._score = mean(max_scores)
+        return mean(max_scores)
+
+    def score_many(self, comment: List[Doc], quotes: List[List[Doc]], matrix: Optional[QuoteSentenceMatrix] = None) -> np.ndarray:
+        """Score the cleaned sentences of a comment against the cleaned sentences of each quote, all at once.
+
+        Args:
+            comment (List[Doc]): The cleaned sentences of the comment.
+            quotes (List[List[Doc]]): The cleaned sentences of each quote.
+            matrix (Optional[QuoteSentenceMatrix], optional): The quotes already packed into a matrix, so it can be reused when
+                scoring many comments. Defaults to building one from quotes on every call.
+
+        Returns:
+            np.ndarray: The score of each quote.
+        """
+        if matrix is None:
+            matrix = QuoteSentenceMatrix(quotes)
+        return matrix.scores(comment, self)
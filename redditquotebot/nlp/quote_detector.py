@@ -1,7 +1,12 @@
 from redditquotebot.reddit import Comment
 from redditquotebot.quotes import Quote
-from redditquotebot.nlp import MatchedQuote, QuoteCommentMatcher, QuoteCommentNLPMatcher
-from typing import List, Optional
+from redditquotebot.nlp import MatchedQuote, MatchStore, QuoteCommentMatcher, QuoteCommentNLPMatcher, QuoteSentenceMatrix, CleanedSentence, QuoteEmbeddingCache, QuoteSentenceIndex, CommentMemo
+from spacy.tokens.doc import Doc
+from spacy.tokens.token import Token
+from typing import List, Optional, Tuple, Union
+import multiprocessing
+import multiprocessing.pool
+import numpy as np
 import spacy
 
 
@@ -10,15 +15,18 @@ class QuoteDetector():
 
     Compares a list of comments, and a list of quotes with a given matcher, and pass score.
     Returns the results, up to an optional maximum, sorted from best match to worse.
+    Matches are kept until the next call to apply, or for a time to live if one is set.
     """
 
-    def __init__(self, quotes: List[Quote]):
+    def __init__(self, quotes: List[Quote], matches_per_comment: Optional[int] = None, match_ttl: Optional[float] = None):
         """
         Args:
             quotes (List[Quote]): List of quotes to use.
+            matches_per_comment (Optional[int], optional): The number of best matches stored for each comment. Defaults to storing all matches.
+            match_ttl (Optional[float], optional): Time in seconds matches are stored for. Defaults to storing matches until the next call to apply.
         """
         self.quotes = quotes
-        self.stored_matches = []
+        self.match_store = MatchStore(matches_per_comment, match_ttl)
 
     def apply(self, matcher: QuoteCommentMatcher, score_threshold: float, filter_author: bool,  comments: List[Comment]):
         """Apply a quote comment matcher to the list of quotes and comments.
@@ -31,11 +39,11 @@ class QuoteDetector():
         """
         if filter_author is True:
             raise NotImplementedError("Filter by author is not currently implemented for this quote detector.")
+        self.match_store.new_cycle()
         for comment in comments:
-            for quote in self.quotes:
-                matcher.compare(comment, quote)
-                if matcher.score() >= score_threshold:
-                    self.stored_matches.append(MatchedQuote(comment, quote, matcher.score()))
+            scores = matcher.score_many(comment, self.quotes)
+            for iq in np.flatnonzero(scores >= score_threshold):
+                self.match_store.add(MatchedQuote(comment, self.quotes[iq], float(scores[iq])))
 
     def get_matches(self, comment: Comment, maximum: Optional[int] = None) -> List[MatchedQuote]:
         """Get the quote matches for a given comment.
@@ -49,42 +57,132 @@ class QuoteDetector():
         Returns:
             List[MatchedQuote]: List of matched quote and comments.
         """
-        target_matches = [match for match in self.stored_matches if match.comment == comment]
-        target_matches = sorted(target_matches, key=lambda match: match.score, reverse=True)
-        if maximum is None:
-            return target_matches
-        else:
-            return target_matches[0:maximum]
+        return self.match_store.get(comment, maximum)
 
     def reset(self):
-        """Reset the internal list of matches. Should be used between calls to apply
+        """Reset the internal store of matches.
         """
-        self.stored_matches = []
+        self.match_store.clear()
+
+    def close(self):
+        """Release any worker processes held by the detector. Does nothing for detectors matching in this process.
+        """
+        pass
 
 
 class QuoteNLPDetector(QuoteDetector):
     """Quote detecter which operates with natural language proccessing (NLP) with spacy
     """
 
-    def __init__(self, quotes: List[Quote]):
+    # Increment when _clean_sentence changes, so cached quote embeddings are rebuilt.
+    CLEANING_VERSION = 1
+
+    # The spacy model used to parse comments and quotes.
+    MODEL = "en_core_web_md"
+
+    def __init__(self, quotes: List[Quote], batch_size: int = 64, n_process: int = 1, reparse_sentences: bool = True, cache_directory: Optional[str] = None,
+                 index_lists: Optional[int] = None, index_probes: int = 8, index_candidates: int = 32,
+                 matches_per_comment: Optional[int] = None, match_ttl: Optional[float] = None, prune_below_threshold: bool = True,
+                 memo_size: int = 0, memo_ttl: Optional[float] = None, memo_path: Optional[str] = None):
         """
         Args:
             quotes (List[Quote]): List of quotes to use.
+            batch_size (int, optional): The number of texts buffered by spacy while parsing. Defaults to 64.
+            n_process (int, optional): The number of processes spacy uses while parsing. Defaults to 1.
+            reparse_sentences (bool, optional): If true, cleaned sentences are parsed again by spacy. Otherwise they are built
+                directly from the parsed tokens, averaging the vectors of the kept words. Defaults to True.
+            cache_directory (Optional[str], optional): Directory used to cache the cleaned quote sentences between runs.
+                If not supplied, quotes are parsed every time. Defaults to None.
+            index_lists (Optional[int], optional): If supplied, quote sentences are partitioned into this many lists by an
+                approximate nearest neighbour index, and only the quotes it finds as candidates are scored. Defaults to None.
+            index_probes (int, optional): The number of index lists searched for each comment sentence. Defaults to 8.
+            index_candidates (int, optional): The number of nearest quote sentences found for each comment sentence. Defaults to 32.
+            matches_per_comment (Optional[int], optional): The number of best matches stored for each comment. Defaults to storing all matches.
+            match_ttl (Optional[float], optional): Time in seconds matches are stored for. Defaults to storing matches until the next call to apply.
+            prune_below_threshold (bool, optional): If true, quotes whose score provably can't reach the threshold are skipped
+                before being fully scored. Defaults to True.
+            memo_size (int, optional): The number of comment bodies whose sentences and matches are memoised, so repeated
+                comments aren't parsed and scored again. Defaults to 0, disabling the memo.
+            memo_ttl (Optional[float], optional): Time in seconds a memoised comment body is kept for. Defaults to None.
+            memo_path (Optional[str], optional): File the memo is loaded from, and written to by save_memo. Defaults to None.
+        """
+        super().__init__(quotes, matches_per_comment, match_ttl)
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.reparse_sentences = reparse_sentences
+        self.cache_directory = cache_directory
+        self.index_lists = index_lists
+        self.index_probes = index_probes
+        self.index_candidates = index_candidates
+        self._load_model()
+        self.prune_below_threshold = prune_below_threshold
+        self.pruned_pairs = 0
+        self.scored_pairs = 0
+        self.comment_memo = CommentMemo(memo_size, memo_ttl) if memo_size > 0 else None
+        self.memo_path = memo_path
+        if self.comment_memo is not None and memo_path is not None:
+            # Memoised matches refer to quotes by index, so saved memos are only valid for the same quotes, model and cleaning.
+            cleaning_rules = f"{self.CLEANING_VERSION}|reparse={self.reparse_sentences}"
+            self._memo_context = QuoteEmbeddingCache.key(self.quotes, self._model_meta(), cleaning_rules)
+            self.comment_memo.load(memo_path, self._memo_context)
+
+    def _load_model(self):
+        # Loads the spacy model, and the cleaned sentences of the quotes with the structures built over them.
+        self.nlp = spacy.load(self.MODEL)
+        self.nlp_quotes = self._load_quotes(self.cache_directory)
+        self.quote_matrix = QuoteSentenceMatrix(self.nlp_quotes)
+        self.quote_index = QuoteSentenceIndex(self.quote_matrix, self.index_lists) if self.index_lists else None
+
+    def _model_meta(self) -> dict:
+        return self.nlp.meta
+
+    def save_memo(self):
+        """Write the comment memo to memo_path, if both are used.
+        """
+        if self.comment_memo is not None and self.memo_path is not None:
+            self.comment_memo.save(self.memo_path, self._memo_context)
+
+    def _load_quotes(self, cache_directory: Optional[str]) -> List[List[Union[Doc, CleanedSentence]]]:
+        if cache_directory is None:
+            return self.parse([q.body for q in self.quotes])
+        cache = QuoteEmbeddingCache(cache_directory)
+        cleaning_rules = f"{self.CLEANING_VERSION}|reparse={self.reparse_sentences}"
+        key = QuoteEmbeddingCache.key(self.quotes, self.nlp.meta, cleaning_rules)
+        nlp_quotes = cache.load(key, len(self.quotes))
+        if nlp_quotes is None:
+            nlp_quotes = self.parse([q.body for q in self.quotes])
+            cache.store(key, nlp_quotes)
+        return nlp_quotes
+
+    def parse(self, bodies: List[str]) -> List[List[Union[Doc, CleanedSentence]]]:
+        """Split a list of texts into cleaned sentences.
+
+        Texts are parsed in batches. When reparse_sentences is set, all cleaned sentences are then parsed again as a single batch.
+
+        Args:
+            bodies (List[str]): The texts to parse.
+
+        Returns:
+            List[List[Union[Doc, CleanedSentence]]]: The cleaned sentences of each text.
         """
-        super().__init__(quotes)
-        self.nlp = spacy.load("en_core_web_md")
-        self.nlp_quotes = []
-        for q in [self.nlp(q.body) for q in self.quotes]:
-            self.nlp_quotes.append(self._get_sentences(q))
+        sentences = [self._get_sentences(body) for body in self._pipe(bodies)]
+        if not self.reparse_sentences:
+            width = self.nlp.vocab.vectors_length
+            return [[CleanedSentence(sentence, width) for sentence in body] for body in sentences]
+        cleaned = iter(self._pipe([" ".join([w.text for w in sentence]) for body in sentences for sentence in body]))
+        return [[next(cleaned) for _ in body] for body in sentences]
 
-    def _get_sentences(self, body):
+    def _pipe(self, texts: List[str]):
+        return self.nlp.pipe(texts, batch_size=self.batch_size, n_process=self.n_process)
+
+    def _get_sentences(self, body) -> List[List[Token]]:
         cleaned_sentences = []
         sentences = [s for s in body.sents]
         for sentence in sentences:
             cleaned_sentences.append(self._clean_sentence(sentence))
         return cleaned_sentences
 
-    def _clean_sentence(self, sentence):
+    def _clean_sentence(self, sentence) -> List[Token]:
         cleaned = []
         for word in sentence:
             # Remove proper nouns
@@ -98,7 +196,7 @@ class QuoteNLPDetector(QuoteDetector):
                 continue
             else:
                 cleaned.append(word)
-        return self.nlp(" ".join([c.text for c in cleaned]))
+        return cleaned
 
     def _get_only_ascii(self, comment: str) -> str:
         return ''.join([i if (ord(i) < 128) and (ord(i) >= 32) and i not in ["-", ":", "?"] else ' ' for i in comment])
@@ -110,20 +208,218 @@ class QuoteNLPDetector(QuoteDetector):
                 return True
         return False
 
+    def index_recall(self, comments: List[Comment]) -> float:
+        """Measure how many of the nearest quote sentences the approximate nearest neighbour index finds, compared to an exhaustive search.
+
+        Args:
+            comments (List[Comment]): Comments whose sentences are used as queries.
+
+        Returns:
+            float: The recall, between 0 and 1. Always 1 when no index is used.
+        """
+        if self.quote_index is None:
+            return 1.0
+        sentences = [s for body in self.parse([self._get_only_ascii(c.body) for c in comments]) for s in body]
+        return self.quote_index.recall(sentences, self.index_probes, self.index_candidates)
+
+    def _score_quotes(self, matcher: QuoteCommentMatcher, sentences, score_threshold: Optional[float] = None) -> np.ndarray:
+        if isinstance(matcher, QuoteCommentNLPMatcher):
+            candidates = np.arange(len(self.quotes))
+            if self.quote_index is not None:
+                candidates = self.quote_index.candidate_quotes(sentences, self.index_probes, self.index_candidates)
+            if self.prune_below_threshold and score_threshold is not None and score_threshold > 0:
+                bounds = self.quote_matrix.upper_bounds(sentences, matcher, candidates)
+                remaining = candidates[bounds[candidates] >= score_threshold]
+                self.pruned_pairs += len(candidates) - len(remaining)
+                candidates = remaining
+            self.scored_pairs += len(candidates)
+            return self.quote_matrix.scores(sentences, matcher, candidates)
+        return matcher.score_many(sentences, self.nlp_quotes)
+
     def apply(self, matcher: QuoteCommentNLPMatcher, score_threshold: float, filter_author: bool, comments: List[Comment]):
         """Apply a NLP based quote comment matcher to the list of quotes and comments.
 
+        QuoteCommentNLPMatcher instances are evaluated against all quotes at once with the quote sentence matrix,
+        other matchers are scored with score_many. The number of comment / quote pairs pruned, and fully scored,
+        are kept in pruned_pairs and scored_pairs until the next call.
+
         Args:
             matcher (QuoteCommentNLPMatcher): The matcher to user.
             score_threshold (float): The pass score, of the matcher has a score above this threshold, the comment / quote combination is stored internally.
             filter_author (bool): If true, comments which contain the author of the quote are discarded.
             comments (List[Comment]): The list of comments to process
         """
+        self.match_store.new_cycle()
+        self.pruned_pairs = 0
+        self.scored_pairs = 0
         for comment in comments:
             comment.body = self._get_only_ascii(comment.body)
-            sentences = self._get_sentences(self.nlp(comment.body))
-            for iq, nlp_quote in enumerate(self.nlp_quotes):
-                matcher.compare(sentences, nlp_quote)
-                if matcher.score() >= score_threshold:
-                    if not self._contains_author(comment.body, self.quotes[iq].author) or not filter_author:
-                        self.stored_matches.append(MatchedQuote(comment, self.quotes[iq], matcher.score()))
+        for ic, iq, score in self.match_bodies(matcher, score_threshold, filter_author, [comment.body for comment in comments]):
+            self.match_store.add(MatchedQuote(comments[ic], self.quotes[iq], score))
+
+    def match_bodies(self, matcher: QuoteCommentMatcher, score_threshold: float, filter_author: bool, bodies: List[str]) -> List[Tuple[int, int, float]]:
+        """Find the quotes matching a list of already cleaned comment bodies, without storing them.
+
+        When the comment memo is used, repeated bodies reuse their memoised matches, or sentences if the scoring parameters changed.
+
+        Args:
+            matcher (QuoteCommentMatcher): The matcher to user.
+            score_threshold (float): The pass score.
+            filter_author (bool): If true, comments which contain the author of the quote are discarded.
+            bodies (List[str]): The ASCII only comment bodies.
+
+        Returns:
+            List[Tuple[int, int, float]]: The index of the body, index of the quote, and score of each match, in order.
+        """
+        if self.comment_memo is None:
+            results, _ = self._match_unique_bodies(matcher, score_threshold, filter_author, bodies, [None for _ in bodies])
+            return [(ic, iq, score) for ic, result in enumerate(results) for iq, score in result]
+
+        parameters = sorted([(k, v) for k, v in vars(matcher).items() if not k.startswith("_")])
+        scoring_key = f"{type(matcher).__name__}|{parameters}|{score_threshold}|{filter_author}"
+        unique = list(dict.fromkeys(bodies))
+        results = {}
+        missing = []
+        known_sentences = []
+        for body in unique:
+            entry = self.comment_memo.get(body)
+            if entry is not None and entry.scoring_key == scoring_key:
+                results[body] = entry.matches
+            else:
+                missing.append(body)
+                known_sentences.append(None if entry is None else entry.sentences)
+
+        missing_results, missing_sentences = self._match_unique_bodies(matcher, score_threshold, filter_author, missing, known_sentences)
+        for body, result, sentences in zip(missing, missing_results, missing_sentences):
+            # Docs are reduced to their vectors, so the memo doesn't hold on to parsed documents.
+            self.comment_memo.put(body, QuoteNLPDetector._reduce_sentences(sentences), scoring_key, result)
+            results[body] = result
+        return [(ic, iq, score) for ic, body in enumerate(bodies) for iq, score in results[body]]
+
+    @staticmethod
+    def _reduce_sentences(sentences: Optional[List[Union[Doc, CleanedSentence]]]) -> Optional[List[CleanedSentence]]:
+        if sentences is None:
+            return None
+        return [CleanedSentence.from_vector(s.text, len(s), s.vector) for s in sentences]
+
+    def _match_unique_bodies(self, matcher: QuoteCommentMatcher, score_threshold: float, filter_author: bool, bodies: List[str],
+                             known_sentences: List[Optional[List[Union[Doc, CleanedSentence]]]]) -> Tuple[List[List[Tuple[int, float]]], List[Optional[List[Union[Doc, CleanedSentence]]]]]:
+        unknown = [ic for ic, sentences in enumerate(known_sentences) if sentences is None]
+        sentences = list(known_sentences)
+        for ic, parsed in zip(unknown, self.parse([bodies[ic] for ic in unknown])):
+            sentences[ic] = parsed
+        results = []
+        for body, body_sentences in zip(bodies, sentences):
+            scores = self._score_quotes(matcher, body_sentences, score_threshold)
+            result = []
+            for iq in np.flatnonzero(scores >= score_threshold):
+                if not self._contains_author(body, self.quotes[iq].author) or not filter_author:
+                    result.append((int(iq), float(scores[iq])))
+            results.append(result)
+        return results, sentences
+
+
+# Detector used by each QuoteParallelNLPDetector worker process, created once when the process starts.
+_worker_detector = None
+
+
+def _start_worker(quotes: List[Quote], arguments: dict):
+    global _worker_detector
+    # Failures are raised from _match_shard, as the pool endlessly restarts workers whose initialiser raises.
+    try:
+        _worker_detector = QuoteNLPDetector(quotes, **arguments)
+    except Exception as exp:
+        _worker_detector = exp
+
+
+def _match_shard(matcher: QuoteCommentMatcher, score_threshold: float, filter_author: bool, bodies: List[str],
+                 known_sentences: List[Optional[List[CleanedSentence]]], return_sentences: bool) -> Tuple[list, list, int, int]:
+    if isinstance(_worker_detector, Exception):
+        raise _worker_detector
+    _worker_detector.pruned_pairs = 0
+    _worker_detector.scored_pairs = 0
+    results, sentences = _worker_detector._match_unique_bodies(matcher, score_threshold, filter_author, bodies, known_sentences)
+    # Docs are reduced to their vectors to be sent back, only when they are memoised.
+    sentences = [QuoteNLPDetector._reduce_sentences(s) if return_sentences else None for s in sentences]
+    return results, sentences, _worker_detector.pruned_pairs, _worker_detector.scored_pairs
+
+
+class QuoteParallelNLPDetector(QuoteNLPDetector):
+    """NLP quote detector which spreads comments across a pool of worker processes.
+
+    Each worker loads the spacy model and quote sentences once, when the pool is first used. Using a cache directory is
+    recommended, so workers load the quote sentences stored by one another rather than each parsing them.
+    Matches are merged in comment order, so results are identical to QuoteNLPDetector.
+
+    Comments are only parsed in the workers, so this process doesn't load the spacy model or quote sentences unless they are
+    used directly, i.e by parse, index_recall or SentencePairs. Sentences of memoised comments are sent to the workers,
+    rather than parsed again.
+    """
+
+    # Processes are spawned rather than forked, so workers don't inherit the parent's threads.
+    START_METHOD = "spawn"
+
+    # Attributes set by QuoteNLPDetector._load_model, loaded in this process when first used.
+    MODEL_ATTRIBUTES = ("nlp", "nlp_quotes", "quote_matrix", "quote_index")
+
+    def __init__(self, quotes: List[Quote], workers: int = 2, **kwargs):
+        """
+        Args:
+            quotes (List[Quote]): List of quotes to use.
+            workers (int, optional): The number of worker processes. Defaults to 2.
+            kwargs: Keyword arguments passed to QuoteNLPDetector, in this process and in each worker.
+        """
+        super().__init__(quotes, **kwargs)
+        self.workers = workers
+        self._worker_arguments = {k: v for k, v in kwargs.items() if k not in ["matches_per_comment", "match_ttl", "memo_size", "memo_ttl", "memo_path"]}
+        self._worker_arguments["n_process"] = 1
+        self._pool = None
+
+    def _load_model(self):
+        # Deferred until one of MODEL_ATTRIBUTES is used, see __getattr__.
+        pass
+
+    def __getattr__(self, name: str):
+        # Only called for attributes which aren't set.
+        if name in QuoteParallelNLPDetector.MODEL_ATTRIBUTES:
+            super()._load_model()
+            return getattr(self, name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def _model_meta(self) -> dict:
+        if "nlp" in vars(self):
+            return self.nlp.meta
+        # Read from the installed package, without loading the model.
+        return spacy.util.get_model_meta(spacy.util.get_package_path(self.MODEL))
+
+    def _get_pool(self) -> multiprocessing.pool.Pool:
+        if self._pool is None:
+            context = multiprocessing.get_context(self.START_METHOD)
+            self._pool = context.Pool(self.workers, _start_worker, (self.quotes, self._worker_arguments))
+        return self._pool
+
+    def _match_unique_bodies(self, matcher: QuoteCommentMatcher, score_threshold: float, filter_author: bool, bodies: List[str],
+                             known_sentences: List[Optional[List[Union[Doc, CleanedSentence]]]]) -> Tuple[List[List[Tuple[int, float]]], List[Optional[List[Union[Doc, CleanedSentence]]]]]:
+        if not len(bodies):
+            return [], []
+        # Parsed sentences are only sent back to be memoised.
+        return_sentences = self.comment_memo is not None
+        shard_size = -(-len(bodies) // max(self.workers, 1))
+        shards = [(matcher, score_threshold, filter_author, bodies[start:start + shard_size], known_sentences[start:start + shard_size], return_sentences)
+                  for start in range(0, len(bodies), shard_size)]
+        results = []
+        sentences = []
+        for shard_results, shard_sentences, pruned, scored in self._get_pool().starmap(_match_shard, shards):
+            results += shard_results
+            sentences += shard_sentences
+            self.pruned_pairs += pruned
+            self.scored_pairs += scored
+        return results, sentences
+
+    def close(self):
+        """Stop the worker processes. They are started again if the detector is used afterwards.
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
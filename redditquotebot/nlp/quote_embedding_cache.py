@@ -0,0 +1,123 @@
+from redditquotebot.quotes import Quote
+from redditquotebot.nlp import CleanedSentence
+from typing import List, Optional
+from glob import glob
+import hashlib
+import json
+import os
+import numpy as np
+
+
+class QuoteEmbeddingCache():
+    """Stores the cleaned sentence vectors of a list of quotes on disk, so they are only computed once.
+
+    Entries are keyed by a hash of the quotes, the spacy model name and version, and the cleaning rules used.
+    An entry with a different key is never loaded, and is replaced the next time the cache is stored.
+    """
+
+    # Increment when the layout of the stored files changes.
+    VERSION = 1
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory (str): The directory the cache files are stored in. Created if it doesn't exist.
+        """
+        self.directory = directory
+
+    @staticmethod
+    def key(quotes: List[Quote], meta: dict, cleaning_rules: str) -> str:
+        """Get the cache key for a set of quotes, parsed by a given model.
+
+        Args:
+            quotes (List[Quote]): The quotes which are embedded.
+            meta (dict): The meta data of the spacy model used to parse the quotes, i.e Language.meta.
+            cleaning_rules (str): Description of the rules used to clean quote sentences.
+
+        Returns:
+            str: The key, as a hex digest.
+        """
+        digest = hashlib.sha256()
+        model = f"{meta['lang']}_{meta['name']}-{meta['version']}"
+        digest.update(f"{QuoteEmbeddingCache.VERSION}|{model}|{cleaning_rules}".encode("utf-8"))
+        for quote in quotes:
+            digest.update(json.dumps(quote.to_dict()).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{key}{suffix}")
+
+    def load(self, key: str, quote_count: int) -> Optional[List[List[CleanedSentence]]]:
+        """Load the cleaned quote sentences stored for a key.
+
+        Vectors are read in one go, each sentence's vector being a view of the loaded array. They aren't memory mapped, as
+        QuoteSentenceMatrix copies every vector when it is built.
+
+        Args:
+            key (str): The key of the entry.
+            quote_count (int): The number of quotes the entry holds.
+
+        Returns:
+            Optional[List[List[CleanedSentence]]]: The cleaned sentences of each quote, or None if no entry exists for the key.
+        """
+        try:
+            with open(self._path(key, "_sentences.json"), "r", encoding="utf-8") as handler:
+                manifest = json.load(handler)
+            vectors = np.load(self._path(key, "_vectors.npy"))
+            quote_ids = np.load(self._path(key, "_quote_ids.npy"))
+        except (FileNotFoundError, ValueError):
+            return None
+        if manifest["version"] != QuoteEmbeddingCache.VERSION or manifest["quote_count"] != quote_count:
+            return None
+
+        quotes = [[] for _ in range(quote_count)]
+        for index, sentence in enumerate(manifest["sentences"]):
+            quotes[quote_ids[index]].append(CleanedSentence.from_vector(sentence["text"], sentence["length"], vectors[index]))
+        return quotes
+
+    def store(self, key: str, quotes: List[List[CleanedSentence]]):
+        """Store the cleaned quote sentences for a key, replacing any other entries.
+
+        The sentence list is written last, so an interrupted store is never loaded.
+
+        Args:
+            key (str): The key of the entry.
+            quotes (List[List[CleanedSentence]]): The cleaned sentences of each quote. Spacy Docs can also be used.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        sentences = [(iq, sentence) for iq, quote in enumerate(quotes) for sentence in quote]
+        width = max([len(sentence.vector) for _, sentence in sentences], default=0)
+        vectors = np.zeros((len(sentences), width), dtype=np.float32)
+        for index, (_, sentence) in enumerate(sentences):
+            vectors[index] = sentence.vector
+        self._save_array(key, "_vectors.npy", vectors)
+        self._save_array(key, "_quote_ids.npy", np.array([iq for iq, _ in sentences], dtype=np.int64))
+
+        manifest = {
+            "version": QuoteEmbeddingCache.VERSION,
+            "quote_count": len(quotes),
+            "sentences": [{"text": sentence.text, "length": len(sentence)} for _, sentence in sentences]
+        }
+        temporary = self._temporary_path(key, "_sentences.json")
+        with open(temporary, "w", encoding="utf-8") as handler:
+            json.dump(manifest, handler)
+        os.replace(temporary, self._path(key, "_sentences.json"))
+        self._remove_stale(key)
+
+    def _temporary_path(self, key: str, suffix: str) -> str:
+        # Unique to each process, as detector worker processes may store the same entry at once.
+        return f"{self._path(key, suffix)}.{os.getpid()}.tmp"
+
+    def _save_array(self, key: str, suffix: str, array: np.ndarray):
+        # Replaced in one step, so an entry being stored by another process is never read partly written.
+        temporary = self._temporary_path(key, suffix)
+        with open(temporary, "wb") as handler:
+            np.save(handler, array)
+        os.replace(temporary, self._path(key, suffix))
+
+    def _remove_stale(self, key: str):
+        for suffix in ["_sentences.json", "_vectors.npy", "_quote_ids.npy"]:
+            for path in glob(self._path("?" * len(key), suffix)):
+                stale_key = os.path.basename(path)[0:len(key)]
+                if stale_key != key and all(c in "0123456789abcdef" for c in stale_key):
+                    os.remove(path)
@@ -0,0 +1,135 @@
+from redditquotebot.nlp import CleanedSentence, QuoteSentenceMatrix
+from spacy.tokens.doc import Doc
+from typing import List, Union
+import numpy as np
+
+
+class QuoteSentenceIndex():
+    """Approximate nearest neighbour index over the sentences of a QuoteSentenceMatrix.
+
+    Quote sentence vectors are partitioned into lists with spherical k-means (an inverted file index).
+    A search only compares a comment sentence against the sentences of the lists with the closest centroids.
+
+    The number of lists probed, and the number of candidates returned, trade recall for speed.
+    """
+
+    def __init__(self, matrix: QuoteSentenceMatrix, lists: int, iterations: int = 10, seed: int = 0):
+        """
+        Args:
+            matrix (QuoteSentenceMatrix): The quote sentences to index.
+            lists (int): The number of lists (k-means clusters) to partition the sentences into.
+            iterations (int, optional): The number of k-means iterations. Defaults to 10.
+            seed (int, optional): Seed for choosing the initial centroids. Defaults to 0.
+        """
+        self.matrix = matrix
+        rows = np.flatnonzero(matrix.valid)
+        vectors = matrix.vectors[rows]
+        lists = max(min(lists, len(rows)), 1)
+        generator = np.random.default_rng(seed)
+
+        self.centroids = np.zeros((lists, matrix.vectors.shape[1]), dtype=np.float32)
+        assignment = np.zeros(len(rows), dtype=np.int64)
+        if len(rows):
+            self.centroids = vectors[generator.choice(len(rows), size=lists, replace=False)]
+            for _ in range(iterations):
+                assignment = self._nearest(vectors)
+                self._update_centroids(vectors, assignment, generator)
+            assignment = self._nearest(vectors)
+
+        # Store the lists as one array of rows, ordered by list, with the offset of each list.
+        order = np.argsort(assignment, kind="stable")
+        self.rows = rows[order]
+        self.offsets = np.searchsorted(assignment[order], np.arange(len(self.centroids) + 1))
+
+    def _update_centroids(self, vectors: np.ndarray, assignment: np.ndarray, generator: np.random.Generator):
+        counts = np.bincount(assignment, minlength=len(self.centroids))
+        order = np.argsort(assignment, kind="stable")
+        starts = np.searchsorted(assignment[order], np.arange(len(self.centroids)))
+        filled = counts > 0
+        sums = np.add.reduceat(vectors[order], starts[filled], axis=0)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        self.centroids[filled] = sums / np.where(norms > 0, norms, 1)
+        # Empty lists are reseeded from random sentences
+        self.centroids[~filled] = vectors[generator.integers(len(vectors), size=int((~filled).sum()))]
+
+    def _nearest(self, vectors: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        nearest = np.zeros(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk):
+            nearest[start:start + chunk] = (vectors[start:start + chunk] @ self.centroids.T).argmax(axis=1)
+        return nearest
+
+    def search(self, vector: np.ndarray, probes: int, count: int) -> np.ndarray:
+        """Find the quote sentences closest to a normalised vector.
+
+        Args:
+            vector (np.ndarray): The normalised query vector.
+            probes (int): The number of lists to search.
+            count (int): The maximum number of sentences returned.
+
+        Returns:
+            np.ndarray: Rows of the closest quote sentences in the matrix, best first.
+        """
+        if len(self.rows) == 0:
+            return self.rows
+        probes = min(probes, len(self.centroids))
+        closest_lists = np.argpartition(-(self.centroids @ vector), probes - 1)[0:probes]
+        rows = np.concatenate([self.rows[self.offsets[i]:self.offsets[i + 1]] for i in closest_lists])
+        return self._top(rows, self.matrix.vectors[rows] @ vector, count)
+
+    def exhaustive_search(self, vector: np.ndarray, count: int) -> np.ndarray:
+        """Find the quote sentences closest to a normalised vector, comparing every indexed sentence.
+
+        Args:
+            vector (np.ndarray): The normalised query vector.
+            count (int): The maximum number of sentences returned.
+
+        Returns:
+            np.ndarray: Rows of the closest quote sentences in the matrix, best first.
+        """
+        if len(self.rows) == 0:
+            return self.rows
+        return self._top(self.rows, self.matrix.vectors[self.rows] @ vector, count)
+
+    def _top(self, rows: np.ndarray, similarity: np.ndarray, count: int) -> np.ndarray:
+        if len(rows) > count:
+            best = np.argpartition(-similarity, count - 1)[0:count]
+            rows, similarity = rows[best], similarity[best]
+        return rows[np.argsort(-similarity, kind="stable")]
+
+    def candidate_quotes(self, sentences: List[Union[Doc, CleanedSentence]], probes: int, count: int) -> np.ndarray:
+        """Get the quotes containing the closest sentences to any of the given sentences.
+
+        Args:
+            sentences (List[Union[Doc, CleanedSentence]]): The cleaned sentences of a comment.
+            probes (int): The number of lists to search per sentence.
+            count (int): The maximum number of quote sentences found per sentence.
+
+        Returns:
+            np.ndarray: Sorted indexes of the candidate quotes.
+        """
+        rows = [self.search(s.vector / s.vector_norm, probes, count) for s in sentences if s and s.vector_norm]
+        if len(rows) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(self.matrix.quote_ids[np.concatenate(rows)])
+
+    def recall(self, sentences: List[Union[Doc, CleanedSentence]], probes: int, count: int) -> float:
+        """Measure the recall of the index against an exhaustive search.
+
+        Args:
+            sentences (List[Union[Doc, CleanedSentence]]): The cleaned sentences used as queries.
+            probes (int): The number of lists to search per sentence.
+            count (int): The number of quote sentences found per sentence.
+
+        Returns:
+            float: The fraction of the exhaustive nearest sentences which were also found by the index. 1.0 if there are no queries.
+        """
+        found = 0
+        expected = 0
+        for sentence in sentences:
+            if not sentence or not sentence.vector_norm:
+                continue
+            vector = sentence.vector / sentence.vector_norm
+            exact = self.exhaustive_search(vector, count)
+            found += len(np.intersect1d(exact, self.search(vector, probes, count)))
+            expected += len(exact)
+        return found / expected if expected else 1.0
@@ -0,0 +1,234 @@
+from redditquotebot.nlp import CleanedSentence
+from spacy.tokens.doc import Doc
+from typing import List, Optional, Union
+import numpy as np
+
+
+class QuoteSentenceMatrix():
+    """Packs the cleaned sentences of every quote into contiguous arrays, so a comment can be scored against all quotes at once.
+
+    Each quote sentence is stored as a normalised vector, alongside its word count and character length.
+    Sentences are also kept sorted by character length, so only those within the length ratio window of a comment sentence are compared.
+    Scores produced by this class are equivalent to running QuoteCommentNLPMatcher.compare against each quote in turn.
+
+    Vectors are stored in fixed blocks of BLOCK_ROWS rows, and similarities are always computed a whole block at a time, so a
+    row's float32 rounding never depends on which other rows are scored alongside it.
+    """
+    BLOCK_ROWS = 32
+
+    def __init__(self, quotes: List[List[Union[Doc, CleanedSentence]]], bound_dimensions: int = 32):
+        """
+        Args:
+            quotes (List[List[Union[Doc, CleanedSentence]]]): The cleaned sentences of each quote.
+            bound_dimensions (int, optional): The number of principal components used when bounding scores. Defaults to 32.
+        """
+        sentences = [sentence for quote in quotes for sentence in quote]
+        width = max([len(sentence.vector) for sentence in sentences], default=0)
+        blocks = -(-len(sentences) // self.BLOCK_ROWS)
+        self._blocks = np.zeros((blocks, self.BLOCK_ROWS, width), dtype=np.float32)
+        self.vectors = self._blocks.reshape(blocks * self.BLOCK_ROWS, width)[0:len(sentences)]
+        self.word_counts = np.zeros(len(sentences), dtype=np.int64)
+        self.lengths = np.zeros(len(sentences), dtype=np.int64)
+        self.valid = np.zeros(len(sentences), dtype=bool)
+        self.sentence_counts = np.array([len(quote) for quote in quotes], dtype=np.int64)
+        self.quote_ids = np.repeat(np.arange(len(quotes), dtype=np.int64), self.sentence_counts)
+        self._text_index = {}
+
+        for index, sentence in enumerate(sentences):
+            self.word_counts[index] = len(sentence.text.split(" "))
+            self.lengths[index] = len(sentence.text)
+            if sentence and sentence.vector_norm:
+                self.vectors[index] = sentence.vector / sentence.vector_norm
+                self.valid[index] = True
+                self._text_index.setdefault(sentence.text, []).append(index)
+
+        # Valid rows sorted by character length, so the rows within a length ratio window are found by binary search.
+        valid_rows = np.flatnonzero(self.valid)
+        self._length_order = valid_rows[np.argsort(self.lengths[valid_rows], kind="stable")]
+        self._sorted_lengths = self.lengths[self._length_order]
+
+        # Projections used for bounding scores, computed on first use.
+        self._bound_dimensions = bound_dimensions
+        self._basis = None
+
+        # Map each quote to the rows of its sentences. Unused slots point at an extra, always zero, column.
+        max_sentences = int(self.sentence_counts.max(initial=0))
+        self.slots = np.full((len(quotes), max_sentences), len(sentences), dtype=np.int64)
+        start = 0
+        for iq, count in enumerate(self.sentence_counts):
+            self.slots[iq, 0:count] = np.arange(start, start + count)
+            start += count
+
+    def __len__(self):
+        return len(self.sentence_counts)
+
+    def length_window(self, length: int, quote_comment_delta: float) -> np.ndarray:
+        """Get the valid rows whose character length is similar to a given length.
+
+        Args:
+            length (int): The character length of the comment sentence.
+            quote_comment_delta (float): The length ratio the quote sentence must exceed, as used by QuoteCommentNLPMatcher.
+
+        Returns:
+            np.ndarray: The rows, sorted by character length.
+        """
+        # The window is found with a small margin, then the exact ratio is applied to the rows inside it.
+        lower = np.searchsorted(self._sorted_lengths, quote_comment_delta * length * (1 - 1e-9), side="left")
+        upper = len(self._sorted_lengths)
+        if quote_comment_delta > 0:
+            upper = np.searchsorted(self._sorted_lengths, length / quote_comment_delta * (1 + 1e-9), side="right")
+        rows = self._length_order[lower:upper]
+        lengths = self._sorted_lengths[lower:upper]
+        ratio = np.minimum(lengths, length) / np.maximum(np.maximum(lengths, length), 1)
+        return rows[ratio > quote_comment_delta]
+
+    def _sentence_rows(self, sentence: Union[Doc, CleanedSentence], matcher, candidates: Optional[np.ndarray]) -> np.ndarray:
+        if len(sentence.text.split(" ")) <= matcher.minimum_sentence_word_length:
+            return self._length_order[0:0]
+        if not sentence or not sentence.vector_norm:
+            return self._length_order[0:0]
+        rows = self.length_window(len(sentence.text), matcher.quote_comment_delta)
+        rows = rows[self.word_counts[rows] > matcher.minimum_sentence_word_length]
+        if candidates is not None:
+            rows = rows[candidates[rows]]
+        return rows
+
+    def _apply_length_bonus(self, similarity: np.ndarray, rows: np.ndarray, matcher) -> np.ndarray:
+        bonus = np.minimum(self.word_counts[rows] - matcher.bonus_start, matcher.bonus_end)
+        return similarity * (1 + bonus * matcher.bonus_coeff)
+
+    def _similarity(self, sentence: Union[Doc, CleanedSentence], rows: np.ndarray) -> np.ndarray:
+        vector = sentence.vector / sentence.vector_norm
+        # Every block holding a row is multiplied in full, so scores don't depend on which rows are requested.
+        blocks = np.unique(rows // self.BLOCK_ROWS)
+        if len(blocks) == len(self._blocks):
+            products = self._blocks @ vector
+        else:
+            products = self._blocks[blocks] @ vector
+        similarity = products[np.searchsorted(blocks, rows // self.BLOCK_ROWS), rows % self.BLOCK_ROWS].astype(np.float64)
+        # Rounding can leave parallel vectors a hair away from 1, so near perfect similarities are snapped to 1.
+        similarity[similarity > 1 - 1e-6] = 1.0
+        # Identical sentences are given a perfect score, matching Doc.similarity
+        if sentence.text in self._text_index:
+            similarity[np.isin(rows, self._text_index[sentence.text])] = 1.0
+        return similarity
+
+    def similarities(self, sentence: Union[Doc, CleanedSentence]) -> np.ndarray:
+        """Get the similarity of a sentence to every quote sentence, before any matcher's filters or length bonus are applied.
+
+        Args:
+            sentence (Union[Doc, CleanedSentence]): The cleaned comment sentence.
+
+        Returns:
+            np.ndarray: The similarity of each row, followed by the always zero column used by slots. Rows without a vector are 0.
+        """
+        similarity = np.zeros(len(self.vectors) + 1)
+        if not sentence or not sentence.vector_norm:
+            return similarity
+        rows = np.flatnonzero(self.valid)
+        similarity[rows] = self._similarity(sentence, rows)
+        return similarity
+
+    def _sentence_scores(self, sentence: Union[Doc, CleanedSentence], matcher, candidates: Optional[np.ndarray]) -> np.ndarray:
+        scores = np.zeros(len(self.vectors) + 1)
+        rows = self._sentence_rows(sentence, matcher, candidates)
+        if len(rows) == 0:
+            return scores
+        scores[rows] = np.minimum(self._apply_length_bonus(self._similarity(sentence, rows), rows, matcher), 1.0)
+        return scores
+
+    def _project(self):
+        # Project the vectors onto their leading principal components. The dot product of the projections, plus the product of
+        # the norms of what remains, bounds the full dot product from above at a fraction of the cost.
+        covariance = self.vectors.T.astype(np.float64) @ self.vectors
+        _, components = np.linalg.eigh(covariance)
+        self._basis = components[:, ::-1][:, 0:self._bound_dimensions].astype(np.float32)
+        self._projections = self.vectors @ self._basis
+        self._residuals = np.sqrt(np.maximum(1 - (self._projections.astype(np.float64) ** 2).sum(axis=1), 0))
+
+    def _sentence_bounds(self, sentence: Union[Doc, CleanedSentence], matcher, candidates: Optional[np.ndarray]) -> np.ndarray:
+        bounds = np.zeros(len(self.vectors) + 1)
+        rows = self._sentence_rows(sentence, matcher, candidates)
+        if len(rows) == 0:
+            return bounds
+
+        if self._basis is None:
+            self._project()
+        vector = sentence.vector / sentence.vector_norm
+        projection = vector @ self._basis
+        residual = np.sqrt(max(1 - float((projection.astype(np.float64) ** 2).sum()), 0))
+        # Widened slightly, so float32 rounding never bounds a score below its true value.
+        similarity = np.minimum((self._projections[rows] @ projection) + self._residuals[rows] * residual + 1e-5, 1.0)
+        if sentence.text in self._text_index:
+            similarity[np.isin(rows, self._text_index[sentence.text])] = 1.0
+
+        bonus = self._apply_length_bonus(np.ones(len(rows)), rows, matcher)
+        # A negative bonus flips the sign of the similarity, so it is bounded by its magnitude instead.
+        bounds[rows] = np.minimum(np.where(bonus >= 0, similarity * bonus, -bonus), 1.0)
+        return bounds
+
+    def upper_bounds(self, comment: List[Union[Doc, CleanedSentence]], matcher, quotes: Optional[np.ndarray] = None) -> np.ndarray:
+        """Get an upper bound of the score of a comment against every quote, or a subset of quotes, without computing full similarities.
+
+        A quote's score never exceeds its best sentence pair score, which is bounded using the principal component projections.
+
+        Args:
+            comment (List[Union[Doc, CleanedSentence]]): The cleaned sentences of the comment.
+            matcher (QuoteCommentNLPMatcher): The matcher providing the scoring parameters.
+            quotes (Optional[np.ndarray], optional): Sorted indexes of the quotes to bound. Other quotes are bounded by 0. Defaults to all quotes.
+
+        Returns:
+            np.ndarray: The upper bound of each quote's score.
+        """
+        result = np.zeros(len(self))
+        if quotes is None:
+            quotes = np.arange(len(self))
+        if len(comment) == 0 or len(quotes) == 0 or self.slots.shape[1] == 0:
+            return result
+
+        slots = self.slots[quotes]
+        candidates = None
+        if len(quotes) < len(self):
+            candidates = np.zeros(len(self.vectors) + 1, dtype=bool)
+            candidates[slots] = True
+        bounds = np.max([self._sentence_bounds(sentence, matcher, candidates) for sentence in comment], axis=0)
+        result[quotes] = bounds[slots].max(axis=1)
+        return result
+
+    def scores(self, comment: List[Union[Doc, CleanedSentence]], matcher, quotes: Optional[np.ndarray] = None) -> np.ndarray:
+        """Score a comment against every quote, or a subset of quotes.
+
+        Args:
+            comment (List[Union[Doc, CleanedSentence]]): The cleaned sentences of the comment.
+            matcher (QuoteCommentNLPMatcher): The matcher providing the scoring parameters.
+            quotes (Optional[np.ndarray], optional): Sorted indexes of the quotes to score. Other quotes score 0. Defaults to all quotes.
+
+        Returns:
+            np.ndarray: The score of each quote, in the order the quotes were given.
+        """
+        result = np.zeros(len(self))
+        if quotes is None:
+            quotes = np.arange(len(self))
+        if len(comment) == 0 or len(quotes) == 0 or self.slots.shape[1] == 0:
+            return result
+
+        slots = self.slots[quotes]
+        candidates = None
+        if len(quotes) < len(self):
+            candidates = np.zeros(len(self.vectors) + 1, dtype=bool)
+            candidates[slots] = True
+
+        # Sentence pair scores for each quote, ordered as the matcher visits them: comment sentence, then quote sentence.
+        pairs = np.concatenate([self._sentence_scores(sentence, matcher, candidates)[slots] for sentence in comment], axis=1)
+        pairs = np.maximum(pairs, 0.0)
+
+        # The matcher keeps the best score, and the best score before it, to fill the matched sentence requirement.
+        best = pairs.max(axis=1)
+        first_best = pairs.argmax(axis=1)
+        running_best = np.maximum.accumulate(pairs, axis=1)
+        previous_index = np.maximum(first_best - 1, 0)
+        previous = np.where(first_best > 0, running_best[np.arange(len(quotes)), previous_index], 0.0)
+
+        required = np.floor(self.sentence_counts[quotes] * matcher.match_sentence_coeff) + 1
+        result[quotes] = (best + (required - 1) * previous) / required
+        return result
@@ -1,4 +1,6 @@
 from typing import List
+import hashlib
+import json
 
 
 class Quote():
@@ -32,6 +34,14 @@ class Quote():
             "category": self.category
         }
 
+    def content_id(self) -> str:
+        """Get an id of the quote, from a hash of its contents. Equal contents always give the same id.
+
+        Returns:
+            str: The id, as a hex digest.
+        """
+        return hashlib.sha256(json.dumps(self.to_dict(), sort_keys=True).encode("utf-8")).hexdigest()[0:16]
+
     @staticmethod
     def from_dict(quote_dict: dict):
         """Populate quote contents from a dictionary
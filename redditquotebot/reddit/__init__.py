@@ -3,3 +3,4 @@ from .comment import Comment
 from .reply import Reply
 from .comment_filter import CommentAuthorFilter, CommentFilter, CommentUTCFilter, CommentUIDFilter, CommentEdditedFilter, CommentLengthFilter, CommentScoreFilter
 from .reddit import Reddit
+from .subreddit_fetcher import SubredditFetcher
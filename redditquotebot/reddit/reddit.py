@@ -1,24 +1,40 @@
 from redditquotebot.reddit import RedditConnectionError, RedditReplyError, RedditUserAuthenticationError
-from redditquotebot.utilities import Configuration, CredentialStore
+from redditquotebot.utilities import Configuration, CredentialStore, ScrapeState, TokenBucket
 from redditquotebot.reddit import Comment, Reply
-from typing import List
+from typing import List, Optional, Tuple
+import heapq
 import praw
+import prawcore
+from praw.models import MoreComments
 from prawcore.exceptions import Forbidden
 
 
+class _RateLimitedRequestor(prawcore.Requestor):
+    # Takes a token from a shared bucket before every HTTP request praw makes.
+    def __init__(self, *args, bucket: TokenBucket, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._bucket = bucket
+
+    def request(self, *args, **kwargs):
+        self._bucket.acquire()
+        return super().request(*args, **kwargs)
+
+
 class Reddit():
     """Interface around praw, for interacting with Reddit
     """
 
-    def __init__(self, configuration: Configuration, credentials: CredentialStore):
+    def __init__(self, configuration: Configuration, credentials: CredentialStore, bucket: Optional[TokenBucket] = None):
         """Initialise module
 
         Args:
             configuration (Configuration): The configuration to use.
             credentials (CredentialStore): Credentials to use for connecting to Reddit.
+            bucket (Optional[TokenBucket], optional): Rate limit every request is taken from, shared with the instances made by worker. Defaults to no limit beyond praw's own.
         """
         self.configuration = configuration
         self.credentials = credentials
+        self.bucket = bucket
         self._reddit = None
 
     def connect(self):
@@ -28,6 +44,12 @@ class Reddit():
             exp: An unknown exception occured. Could be one of https://praw.readthedocs.io/en/v3.6.2/pages/exceptions.html
             RedditConnectionError: The username supplied did not match that associated with praw, after connection.
         """
+        requestor = {}
+        if self.bucket is not None:
+            requestor = {
+                "requestor_class": _RateLimitedRequestor,
+                "requestor_kwargs": {"bucket": self.bucket}
+            }
         try:
             self._reddit = praw.Reddit(
                 user_agent=self.credentials.reddit.user_agent,
@@ -35,7 +57,8 @@ class Reddit():
                 client_secret=self.credentials.reddit.client_secret,
                 username=self.credentials.reddit.username,
                 password=self.credentials.reddit.password,
-                ratelimit_minutes=60
+                ratelimit_minutes=60,
+                **requestor
             )
         except Exception as exp:
             raise exp from exp
@@ -47,6 +70,16 @@ class Reddit():
         # No special handling required
         pass
 
+    def worker(self) -> "Reddit":
+        """Get a new, unconnected, instance with the same configuration, credentials and rate limit.
+
+        Praw isn't thread safe, so each thread accessing Reddit needs its own instance.
+
+        Returns:
+            Reddit: The new instance.
+        """
+        return Reddit(self.configuration, self.credentials, self.bucket)
+
     def get_comments(self, subreddit: str) -> List[Comment]:
         """Get comments from a particular subreddit.
 
@@ -72,6 +105,117 @@ class Reddit():
 
         return comments
 
+    def get_new_comments(self, subreddit: str, newest_fullname: Optional[str], newest_utc: float) -> List[Comment]:
+        """Get the newest comments from a subreddit's comment listing, stopping at the first comment already seen.
+
+        Only the listing pages needed are requested, rather than every comment tree of the newest submissions.
+        The amount of comments is limited by the configuration.reddit.max_comments_per_request field.
+
+        Args:
+            subreddit (str): The subreddit to query
+            newest_fullname (Optional[str]): The fullname of the newest comment previously fetched, if known.
+            newest_utc (float): The creation time of the newest comment previously fetched. Used when the comment
+                with newest_fullname has been removed from the listing.
+
+        Returns:
+            List[Comment]: The new comments, newest first.
+        """
+        subreddit = self._reddit.subreddit(subreddit)
+        max_comments = self.configuration.reddit.max_comments_per_request
+        comments = []
+        for comment in subreddit.comments(limit=max_comments):
+            if comment.fullname == newest_fullname or comment.created_utc < newest_utc:
+                break
+            comments.append(self._extract_comment(comment))
+        return comments
+
+    def get_incremental_comments(self, subreddit: str, scrape_state: ScrapeState) -> List[Comment]:
+        """Get new comments from the newest submissions of a subreddit, only fetching what changed since the last crawl.
+
+        Submissions whose comment count hasn't changed are skipped without fetching their comment tree. Comments are only
+        returned if they are newer than the submission's watermark. MoreComments are expanded largest first, up to
+        configuration.reddit.more_comments_budget expansions per call, and any left over are stored in the scrape state and
+        expanded first on the next call.
+        The amount of comments is limited by the configuration.reddit.max_comments_per_request field, no further submissions
+        are visited once it is reached.
+
+        Args:
+            subreddit (str): The subreddit to query
+            scrape_state (ScrapeState): Holds the crawl state of each submission, updated in place.
+
+        Returns:
+            List[Comment]: The new comments found.
+        """
+        name = subreddit
+        subreddit = self._reddit.subreddit(subreddit)
+        max_comments = self.configuration.reddit.max_comments_per_request
+        budget = self.configuration.reddit.more_comments_budget
+        comments = []
+
+        # Expansions left over from previous calls are continued first
+        for submission_id in scrape_state.pending_submissions(name):
+            state = scrape_state.submission_state(name, submission_id)
+            submission = self._reddit.submission(id=submission_id)
+            pending = [self._restore_more_comments(submission, more) for more in state["pending"]]
+            heapq.heapify(pending)
+            found, budget = self._expand_more_comments(pending, budget)
+            comments += self._store_submission_comments(name, submission_id, state["num_comments"], found, pending, scrape_state)
+
+        count = self.configuration.reddit.new_submissions_per_request
+        newest = []
+        for submission in subreddit.new(limit=count):
+            newest.append(submission.id)
+            if len(comments) >= max_comments:
+                continue
+            state = scrape_state.submission_state(name, submission.id)
+            if state is not None and (len(state["pending"]) or state["num_comments"] == submission.num_comments):
+                continue
+            pending = submission.comments.replace_more(limit=0)
+            for more in pending:
+                more.submission = submission
+            heapq.heapify(pending)
+            found = submission.comments.list()
+            expanded, budget = self._expand_more_comments(pending, budget)
+            comments += self._store_submission_comments(name, submission.id, submission.num_comments, found + expanded, pending, scrape_state)
+
+        scrape_state.retain_submissions(name, newest)
+        return comments
+
+    def _store_submission_comments(self, subreddit: str, submission_id: str, num_comments: int, found: list, pending: List[MoreComments], scrape_state: ScrapeState) -> List[Comment]:
+        state = scrape_state.submission_state(subreddit, submission_id)
+        watermark = state["watermark"] if state is not None else 0
+        comments = [self._extract_comment(comment) for comment in found]
+        comments = [comment for comment in comments if comment.utc > watermark]
+        latest_utc = max([comment.utc for comment in comments], default=watermark)
+        stored_pending = [{"children": more.children, "count": more.count, "parent_id": more.parent_id} for more in pending]
+        scrape_state.update_submission_state(subreddit, submission_id, num_comments, latest_utc, stored_pending)
+        return comments
+
+    def _restore_more_comments(self, submission, stored: dict) -> MoreComments:
+        more = MoreComments(self._reddit, dict(stored))
+        more.submission = submission
+        return more
+
+    def _expand_more_comments(self, pending: List[MoreComments], budget: Optional[int]) -> Tuple[list, Optional[int]]:
+        # Each expansion costs one request. New MoreComments found are added to the pending heap, largest first.
+        found = []
+        seen = set()
+        while len(pending) and (budget is None or budget > 0):
+            more = heapq.heappop(pending)
+            loaded = list(more.comments())
+            if budget is not None:
+                budget -= 1
+            while len(loaded):
+                item = loaded.pop()
+                if isinstance(item, MoreComments):
+                    item.submission = more.submission
+                    heapq.heappush(pending, item)
+                elif item.id not in seen:
+                    seen.add(item.id)
+                    found.append(item)
+                    loaded.extend(item.replies)
+        return found, budget
+
     def get_user_comments(self, user_name: str) -> List[Comment]:
         """Get a list of comments posted by a given user.
 
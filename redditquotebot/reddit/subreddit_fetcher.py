@@ -0,0 +1,64 @@
+from redditquotebot.reddit import Reddit
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, TypeVar, Union
+import threading
+
+T = TypeVar("T")
+
+
+class SubredditFetcher():
+    """Fetches from several subreddits concurrently, using a bounded pool of threads.
+
+    Praw isn't thread safe, so each thread connects its own Reddit instance the first time it is used, and keeps it for later fetches.
+    The instances share the rate limit of the Reddit they are created from.
+    """
+
+    def __init__(self, reddit: Reddit, workers: int):
+        """
+        Args:
+            reddit (Reddit): Provides the configuration, credentials and rate limit of the thread instances.
+            workers (int): The maximum number of subreddits fetched at once.
+        """
+        self.reddit = reddit
+        self.workers = workers
+        self._pool = None
+        self._local = threading.local()
+
+    def _thread_reddit(self) -> Reddit:
+        reddit = getattr(self._local, "reddit", None)
+        if reddit is None:
+            reddit = self.reddit.worker()
+            reddit.connect()
+            self._local.reddit = reddit
+        return reddit
+
+    def _fetch_one(self, fetch: Callable[[Reddit, str], T], subreddit: str) -> T:
+        return fetch(self._thread_reddit(), subreddit)
+
+    def fetch(self, subreddits: List[str], fetch: Callable[[Reddit, str], T]) -> Dict[str, Union[T, Exception]]:
+        """Call a fetch function for each subreddit concurrently, waiting for all of them to finish.
+
+        Args:
+            subreddits (List[str]): The subreddits to fetch.
+            fetch (Callable[[Reddit, str], T]): Called with the thread's Reddit instance and a subreddit name.
+
+        Returns:
+            Dict[str, Union[T, Exception]]: The result of each subreddit, or the exception raised while fetching it.
+        """
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="subreddit-fetcher")
+        futures = {subreddit: self._pool.submit(self._fetch_one, fetch, subreddit) for subreddit in subreddits}
+        results = {}
+        for subreddit, future in futures.items():
+            try:
+                results[subreddit] = future.result()
+            except Exception as exp:
+                results[subreddit] = exp
+        return results
+
+    def close(self):
+        """Stop the worker threads.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -1,10 +1,12 @@
 import sys
-from typing import List
+from typing import Dict, List, Optional, Union
 from redditquotebot.reddit import *
 from redditquotebot.utilities import *
 from redditquotebot.quotes import *
 from redditquotebot.nlp import *
+from redditquotebot.bot_pipeline import BotPipeline
 import logging
+import signal
 import time
 
 logger = logging.getLogger(__name__)
@@ -39,23 +41,57 @@ class RedditQuoteBot():
         self.quote_matcher = QuoteCommentMatcher()
         self.quote_threshold = 1.0
         self.detector = QuoteDetector([])
+        self.fetcher = None
+        self.scheduler = None
+        self.write_behind = None
+        self._polled_since_clean = set()
 
-    def get_latest_comments(self, subreddit: str, scrape_state: ScrapeState, records: RecordKeeper) -> List[Comment]:
-        """Get the latest comments from a given subreddit.
+    def fetch_comments(self, subreddit: str, scrape_state: ScrapeState, reddit: Optional[Reddit] = None) -> List[Comment]:
+        """Fetch the latest comments from a given subreddit, without filtering them.
 
-        Uses the scrape state and recored keeper files to filter out comments which have already been stored. Only returns and stores new comments.
+        Comments are either taken from the newest submissions, only the changed parts of the newest submissions, or the subreddit's
+        newest comment listing, depending on configuration.reddit.ingestion_mode.
 
         Args:
-            subreddit (str): The subreddit to qurey
+            subreddit (str): The subreddit to query
+            scrape_state (ScrapeState): Object tracking scrape state
+            reddit (Optional[Reddit], optional): The Reddit instance to fetch with. Defaults to the bot's own instance.
+
+        Returns:
+            List[Comment]: The fetched comments.
+        """
+        if reddit is None:
+            reddit = self.reddit
+        mode = self.configuration.reddit.ingestion_mode
+        if mode == "comments":
+            latest_fullname = scrape_state.latest_subreddit_fullname(subreddit)
+            comments = reddit.get_new_comments(subreddit, latest_fullname, scrape_state.latest_subreddit_utc(subreddit))
+            if len(comments):
+                scrape_state.update_latest_subreddit_fullname(subreddit, f"t1_{comments[0].uid}")
+        elif mode == "incremental_submissions":
+            comments = reddit.get_incremental_comments(subreddit, scrape_state)
+        elif mode == "submissions":
+            comments = reddit.get_comments(subreddit)
+        else:
+            raise ValueError(f"Unknown ingestion mode {mode}, expected submissions, incremental_submissions or comments.")
+        return comments
+
+    def filter_comments(self, subreddit: str, comments: List[Comment], scrape_state: ScrapeState, records: RecordKeeper) -> List[Comment]:
+        """Filter out fetched comments which have already been stored, or shouldn't be matched. Only returns and stores new comments.
+
+        Args:
+            subreddit (str): The subreddit the comments were fetched from
+            comments (List[Comment]): The fetched comments
             scrape_state (ScrapeState): Object tracking scrape state
             records (RecordKeeper): Object for record keeping
 
         Returns:
             List[Comment]: A list of new comment, which have not previously been fetched.
         """
-
-        comments = self.reddit.get_comments(subreddit)
         latest_stored_utc = scrape_state.latest_subreddit_utc(subreddit)
+        if self.configuration.reddit.ingestion_mode == "incremental_submissions":
+            # Replies to older submissions can be older than the newest comment stored, each submission's watermark is used instead.
+            latest_stored_utc = 0
         comment_filter = CommentFilter(comments)
         comment_filter.apply(lambda comment: CommentUTCFilter(comment) > latest_stored_utc)
         comment_filter.apply(lambda comment: CommentAuthorFilter(comment) != self.credentials.reddit.username)
@@ -70,6 +106,22 @@ class RedditQuoteBot():
             scrape_state.update_latest_subreddit_utc(subreddit, latest_fetched_utc)
         return filtered_comments
 
+    def get_latest_comments(self, subreddit: str, scrape_state: ScrapeState, records: RecordKeeper) -> List[Comment]:
+        """Get the latest comments from a given subreddit.
+
+        Uses the scrape state and recored keeper files to filter out comments which have already been stored. Only returns and stores new comments.
+
+        Args:
+            subreddit (str): The subreddit to qurey
+            scrape_state (ScrapeState): Object tracking scrape state
+            records (RecordKeeper): Object for record keeping
+
+        Returns:
+            List[Comment]: A list of new comment, which have not previously been fetched.
+        """
+        comments = self.fetch_comments(subreddit, scrape_state)
+        return self.filter_comments(subreddit, comments, scrape_state, records)
+
     def get_matching_quotes(self, comments: List[Comment], records: RecordKeeper) -> List[List[MatchedQuote]]:
         """Get matching quotes for a list of comments. Uses internal quote database
 
@@ -91,6 +143,11 @@ class RedditQuoteBot():
             if len(found):
                 matches.append(found)
                 records.log_matched_quote(found)
+        logger.debug(f"Match store: {self.detector.match_store.memory_statistics()}")
+        if isinstance(self.detector, QuoteNLPDetector):
+            logger.debug(f"Quote pairs pruned: {self.detector.pruned_pairs}, scored: {self.detector.scored_pairs}")
+            if self.detector.comment_memo is not None:
+                logger.debug(f"Comment memo hits: {self.detector.comment_memo.hits}, misses: {self.detector.comment_memo.misses}")
         return matches
 
     def reply_to_comments(self, matches: List[List[MatchedQuote]], threshold: float, records: RecordKeeper) -> List[Reply]:
@@ -143,27 +200,53 @@ class RedditQuoteBot():
         """
         self.reddit.connect()
 
+    def close(self):
+        """Stop the detector's worker processes and the fetch threads.
+        """
+        self.detector.close()
+        if self.fetcher is not None:
+            self.fetcher.close()
+            self.fetcher = None
+
     def start(self):
         """Start up the bot!
+
+        If configuration.bot.pipeline is enabled, the bot is run as a BotPipeline instead.
+        A termination signal (SIGTERM), as sent by docker stop, is handled as a keyboard interrupt. However the main loop
+        ends, resident state is written and the detector's workers are stopped.
         """
-        subreddits = self.configuration.reddit.subreddits
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        if self.configuration.bot.pipeline:
+            BotPipeline(self, self.configuration.reddit.fetch_workers, self.configuration.bot.pipeline_queue_size).run()
+            return
         logger.info("Start up new bot main loop.")
 
-        while (True):
-            try:
+        try:
+            while (True):
+                scrape_state = self._load_scrape_state()
+                records = self._load_records()
+                subreddits = self._next_subreddits(scrape_state)
+                fetched = self._fetch_concurrently(subreddits, scrape_state, records)
                 for subreddit in subreddits:
-                    scrape_state = self._load_scrape_state()
-                    records = self._load_records()
-
                     if subreddit in records.banned_subreddits():
+                        if self.scheduler is not None:
+                            self.scheduler.postpone(scrape_state, subreddit, self.configuration.bot.maximum_poll_interval)
                         time.sleep(10)
                         continue
 
                     subreddit_timer = TimeDelta()
                     try:
-                        new_comments = self.get_latest_comments(subreddit, scrape_state, records)
+                        if subreddit in fetched:
+                            comments = fetched[subreddit]
+                            if isinstance(comments, Exception):
+                                raise comments
+                        else:
+                            comments = self.fetch_comments(subreddit, scrape_state)
+                        new_comments = self.filter_comments(subreddit, comments, scrape_state, records)
                     except Exception as exp:
                         logger.error(f"Received exception {exp} from Reddit")
+                        if self.scheduler is not None:
+                            self.scheduler.postpone(scrape_state, subreddit, self.configuration.bot.minimum_poll_interval)
                         time.sleep(30)
                         continue
 
@@ -180,6 +263,8 @@ class RedditQuoteBot():
                         records.add_banned_subreddit(subreddit)
                         replies = []
 
+                    if self.scheduler is not None:
+                        self.scheduler.record_poll(scrape_state, subreddit, len(new_comments), len(matches))
                     reply_time = round(subreddit_timer.elapsed(), 2)
                     logger.info(
                         f"Subreddit {subreddit}: {len(new_comments)} comments in {comment_time}s, {len(matches)} matches in {match_time}s, {len(replies)} replies in {reply_time}s")
@@ -187,13 +272,68 @@ class RedditQuoteBot():
                         self._save_records(records)
                         self._save_scrape_state(scrape_state)
 
+                if self.scheduler is not None:
+                    with DelayedKeyboardInterrupt():
+                        self._save_scrape_state(scrape_state)
+                    logger.debug(f"Poll schedule: {self.scheduler.report(scrape_state)}")
+
+                # Own comments are cleaned once every subreddit has been polled.
+                self._polled_since_clean.update(subreddits)
+                if not self._polled_since_clean.issuperset(self.configuration.reddit.subreddits):
+                    continue
+                self._polled_since_clean = set()
                 records = self._load_records()
                 self.clean_own_comments(records)
                 with DelayedKeyboardInterrupt():
                     self._save_records(records)
-            except KeyboardInterrupt:
-                print()
-                sys.exit()
+                    if isinstance(self.detector, QuoteNLPDetector):
+                        self.detector.save_memo()
+        except KeyboardInterrupt:
+            print()
+            sys.exit()
+        finally:
+            # Also reached when an unexpected exception ends the loop, so held back writes aren't lost.
+            with DelayedKeyboardInterrupt():
+                self._flush_state()
+                self.close()
+
+    def _next_subreddits(self, scrape_state: ScrapeState) -> List[str]:
+        # Every subreddit is polled each cycle, unless the adaptive schedule is enabled. Then the cycle waits for the next subreddits due.
+        if not self.configuration.bot.adaptive_schedule:
+            return self.configuration.reddit.subreddits
+        scheduler = self._scheduler(scrape_state)
+        next_poll = scheduler.next_poll()
+        if next_poll is not None and next_poll > time.time():
+            # Resident state is written while idle, rather than held until the next change.
+            with DelayedKeyboardInterrupt():
+                self._flush_state()
+        return scheduler.wait()
+
+    def _scheduler(self, scrape_state: ScrapeState) -> PollScheduler:
+        # Created on first use, from the schedule stored in the scrape state.
+        if self.scheduler is None:
+            self.scheduler = PollScheduler(
+                self.configuration.reddit.subreddits,
+                self.configuration.bot.minimum_poll_interval,
+                self.configuration.bot.maximum_poll_interval,
+                self.configuration.bot.target_comments_per_poll
+            )
+            self.scheduler.load(scrape_state)
+        return self.scheduler
+
+    def _fetch_concurrently(self, subreddits: List[str], scrape_state: ScrapeState, records: RecordKeeper) -> Dict[str, Union[List[Comment], Exception]]:
+        # Subreddits are fetched up front, across configuration.reddit.fetch_workers threads. Nothing is fetched here with a single worker,
+        # each subreddit is then fetched as it is visited.
+        workers = self.configuration.reddit.fetch_workers
+        if workers <= 1:
+            return {}
+        if self.fetcher is None:
+            self.fetcher = SubredditFetcher(self.reddit, workers)
+        active = [subreddit for subreddit in subreddits if subreddit not in records.banned_subreddits()]
+        fetch_timer = TimeDelta()
+        fetched = self.fetcher.fetch(active, lambda reddit, subreddit: self.fetch_comments(subreddit, scrape_state, reddit))
+        logger.info(f"Fetched {len(active)} subreddits in {round(fetch_timer.elapsed(), 2)}s")
+        return fetched
 
     def _load_scrape_state(self) -> ScrapeState:
         if not self.ram_based_scrape_state:
@@ -220,6 +360,11 @@ class RedditQuoteBot():
         records.maximum_removed_comments(self.configuration.records.maximum_removed_comment_count)
         return records
 
+    def _flush_state(self):
+        # Writes resident records and scrape state held back by configuration.bot.resident_state.
+        if self.write_behind is not None:
+            self.write_behind.flush()
+
     def _save_scrape_state(self, scrape_state: ScrapeState):
         if not self.ram_based_scrape_state:
             self.scrape_state_storer["handler"](self.scrape_state_storer["filepath"], scrape_state)
@@ -2,7 +2,13 @@ from .credential_store import CredentialLoader, CredentialStore, CredentialGener
 from .configuration import Configuration, ConfigurationLoader, ConfigurationGenerator
 from .scrape_state import ScrapeState, ScrapeStateLoader, ScrapeStateStorer
 from .record_keeper import RecordKeeper, RecordLoader, RecordStorer
+from .record_journal import RecordJournal
+from .record_reader import RecordReader
+from .write_behind_cache import WriteBehindCache
+from .sqlite_record_keeper import SQLiteRecordKeeper, SQLiteRecordLoader, SQLiteRecordStorer
 from .file_associator import FileAssociator, FileTypes
 from .logger import setup_logger
 from .time_delta import TimeDelta
+from .token_bucket import TokenBucket
+from .poll_scheduler import PollScheduler
 from .delayed_keyboard_interrupt import DelayedKeyboardInterrupt
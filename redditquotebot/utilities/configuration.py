@@ -15,7 +15,11 @@ class Configuration():
             ],
             new_submissions_per_request=10,
             max_comments_per_request=100,
-            minimum_comment_length=15
+            minimum_comment_length=15,
+            ingestion_mode="submissions",
+            more_comments_budget=None,
+            fetch_workers=1,
+            requests_per_minute=100
         )
         self.bot = SimpleNamespace(
             reply_to_comments=False,
@@ -23,6 +27,15 @@ class Configuration():
             reply_threshold=0.99,
             remove_own_comments=True,
             remove_comment_threshold=-1,
+            adaptive_schedule=False,
+            minimum_poll_interval=60,
+            maximum_poll_interval=3600,
+            target_comments_per_poll=50,
+            pipeline=False,
+            pipeline_queue_size=4,
+            resident_state=False,
+            flush_interval=60,
+            flush_after_changes=20
         )
         self.nlp = SimpleNamespace(
             match_store_threshold=0.97,
@@ -32,13 +45,25 @@ class Configuration():
             quote_length_bonus_start=6,
             quote_length_bonus_end=10,
             matched_sentence_coefficient=0.5,
-            discard_comments_with_author=True
+            discard_comments_with_author=True,
+            pipe_batch_size=64,
+            pipe_processes=1,
+            reparse_cleaned_sentences=True,
+            index_lists=None,
+            index_probes=8,
+            index_candidates=32,
+            prune_below_threshold=True,
+            detector_workers=1,
+            comment_memo_size=0,
+            comment_memo_ttl=None
         )
         self.records = SimpleNamespace(
             maximum_comment_count=0,
             maximum_match_count=100,
             maximum_reply_count=None,
             maximum_removed_comment_count=None,
+            storage="json",
+            compact_after=1000
         )
 
     def to_dict(self) -> dict:
@@ -49,13 +74,26 @@ class Configuration():
                 "new_submissions_per_request": self.reddit.new_submissions_per_request,
                 "max_comments_per_request": self.reddit.max_comments_per_request,
                 "minimum_comment_length": self.reddit.minimum_comment_length,
+                "ingestion_mode": self.reddit.ingestion_mode,
+                "more_comments_budget": self.reddit.more_comments_budget,
+                "fetch_workers": self.reddit.fetch_workers,
+                "requests_per_minute": self.reddit.requests_per_minute
             },
             "bot": {
                 "reply_to_comments": self.bot.reply_to_comments,
                 "reply_threshold": self.bot.reply_threshold,
                 "matched_quotes_to_log": self.bot.matched_quotes_to_log,
                 "remove_own_comments": self.bot.remove_own_comments,
-                "remove_comment_threshold": self.bot.remove_comment_threshold
+                "remove_comment_threshold": self.bot.remove_comment_threshold,
+                "adaptive_schedule": self.bot.adaptive_schedule,
+                "minimum_poll_interval": self.bot.minimum_poll_interval,
+                "maximum_poll_interval": self.bot.maximum_poll_interval,
+                "target_comments_per_poll": self.bot.target_comments_per_poll,
+                "pipeline": self.bot.pipeline,
+                "pipeline_queue_size": self.bot.pipeline_queue_size,
+                "resident_state": self.bot.resident_state,
+                "flush_interval": self.bot.flush_interval,
+                "flush_after_changes": self.bot.flush_after_changes
             },
             "nlp": {
                 "match_store_threshold": self.nlp.match_store_threshold,
@@ -65,13 +103,25 @@ class Configuration():
                 "quote_length_bonus_start": self.nlp.quote_length_bonus_start,
                 "quote_length_bonus_end": self.nlp.quote_length_bonus_end,
                 "matched_sentence_coefficient": self.nlp.matched_sentence_coefficient,
-                "discard_comments_with_author": self.nlp.discard_comments_with_author
+                "discard_comments_with_author": self.nlp.discard_comments_with_author,
+                "pipe_batch_size": self.nlp.pipe_batch_size,
+                "pipe_processes": self.nlp.pipe_processes,
+                "reparse_cleaned_sentences": self.nlp.reparse_cleaned_sentences,
+                "index_lists": self.nlp.index_lists,
+                "index_probes": self.nlp.index_probes,
+                "index_candidates": self.nlp.index_candidates,
+                "prune_below_threshold": self.nlp.prune_below_threshold,
+                "detector_workers": self.nlp.detector_workers,
+                "comment_memo_size": self.nlp.comment_memo_size,
+                "comment_memo_ttl": self.nlp.comment_memo_ttl
             },
             "records": {
                 "maximum_comment_count": self.records.maximum_comment_count,
                 "maximum_match_count": self.records.maximum_match_count,
                 "maximum_reply_count": self.records.maximum_reply_count,
-                "maximum_removed_comment_count": self.records.maximum_removed_comment_count
+                "maximum_removed_comment_count": self.records.maximum_removed_comment_count,
+                "storage": self.records.storage,
+                "compact_after": self.records.compact_after
             },
         }
 
@@ -118,6 +168,71 @@ class ConfigurationLoader():
             config.records.maximum_removed_comment_count = loaded["records"]["maximum_removed_comment_count"]
         except KeyError as exp:
             raise KeyError("Cannot load given configuration.") from exp
+        # Adding in a try block keeps backwards compatibility.
+        try:
+            config.reddit.ingestion_mode = loaded["reddit"]["ingestion_mode"]
+        except KeyError:
+            pass
+        try:
+            config.reddit.more_comments_budget = loaded["reddit"]["more_comments_budget"]
+        except KeyError:
+            pass
+        try:
+            config.reddit.fetch_workers = loaded["reddit"]["fetch_workers"]
+            config.reddit.requests_per_minute = loaded["reddit"]["requests_per_minute"]
+        except KeyError:
+            pass
+        try:
+            config.bot.adaptive_schedule = loaded["bot"]["adaptive_schedule"]
+            config.bot.minimum_poll_interval = loaded["bot"]["minimum_poll_interval"]
+            config.bot.maximum_poll_interval = loaded["bot"]["maximum_poll_interval"]
+            config.bot.target_comments_per_poll = loaded["bot"]["target_comments_per_poll"]
+        except KeyError:
+            pass
+        try:
+            config.bot.pipeline = loaded["bot"]["pipeline"]
+            config.bot.pipeline_queue_size = loaded["bot"]["pipeline_queue_size"]
+        except KeyError:
+            pass
+        try:
+            config.bot.resident_state = loaded["bot"]["resident_state"]
+            config.bot.flush_interval = loaded["bot"]["flush_interval"]
+            config.bot.flush_after_changes = loaded["bot"]["flush_after_changes"]
+        except KeyError:
+            pass
+        try:
+            config.records.storage = loaded["records"]["storage"]
+            config.records.compact_after = loaded["records"]["compact_after"]
+        except KeyError:
+            pass
+        try:
+            config.nlp.pipe_batch_size = loaded["nlp"]["pipe_batch_size"]
+            config.nlp.pipe_processes = loaded["nlp"]["pipe_processes"]
+        except KeyError:
+            pass
+        try:
+            config.nlp.reparse_cleaned_sentences = loaded["nlp"]["reparse_cleaned_sentences"]
+        except KeyError:
+            pass
+        try:
+            config.nlp.index_lists = loaded["nlp"]["index_lists"]
+            config.nlp.index_probes = loaded["nlp"]["index_probes"]
+            config.nlp.index_candidates = loaded["nlp"]["index_candidates"]
+        except KeyError:
+            pass
+        try:
+            config.nlp.prune_below_threshold = loaded["nlp"]["prune_below_threshold"]
+        except KeyError:
+            pass
+        try:
+            config.nlp.detector_workers = loaded["nlp"]["detector_workers"]
+        except KeyError:
+            pass
+        try:
+            config.nlp.comment_memo_size = loaded["nlp"]["comment_memo_size"]
+            config.nlp.comment_memo_ttl = loaded["nlp"]["comment_memo_ttl"]
+        except KeyError:
+            pass
         return config
 
 
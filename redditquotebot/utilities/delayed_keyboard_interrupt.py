@@ -2,19 +2,27 @@ import signal
 
 
 class DelayedKeyboardInterrupt:
-    """Context manager for delaying keyboard interrupt in critical code sections.
+    """Context manager for delaying keyboard interrupt, and termination (SIGTERM), in critical code sections.
 
     Source: https://stackoverflow.com/questions/842557/how-to-prevent-a-block-of-code-from-being-interrupted-by-keyboardinterrupt-in-py
     """
 
+    SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
     def __enter__(self):
         self.signal_received = False
-        self.old_handler = signal.signal(signal.SIGINT, self.handler)
+        self.old_handlers = {sig: signal.signal(sig, self.handler) for sig in DelayedKeyboardInterrupt.SIGNALS}
 
     def handler(self, sig, frame):
         self.signal_received = (sig, frame)
 
     def __exit__(self, type, value, traceback):
-        signal.signal(signal.SIGINT, self.old_handler)
+        for sig, handler in self.old_handlers.items():
+            signal.signal(sig, handler)
         if self.signal_received:
-            self.old_handler(*self.signal_received)
+            old_handler = self.old_handlers[self.signal_received[0]]
+            if callable(old_handler):
+                old_handler(*self.signal_received)
+            else:
+                # The default action, i.e terminating, is taken by raising the signal again.
+                signal.raise_signal(self.signal_received[0])
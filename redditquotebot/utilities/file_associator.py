@@ -7,13 +7,18 @@ class FileTypes(Enum):
     """Defines known filetypes which can be resolved
     """
     JSON = ".json"
+    JSONL = ".jsonl"
     CSV = ".csv"
+    SQLITE = ".sqlite"
 
 
 class FileAssociator():
     """Create a file associator which assigns file extensions to callbacks
     """
 
+    # Filetypes which manage their own files, so handlers are given the path instead of an open file.
+    PATH_FILE_TYPES = {FileTypes.SQLITE}
+
     def __init__(self, associations: Dict[FileTypes, Callable]):
         """Initialise
 
@@ -41,7 +46,7 @@ class FileAssociator():
         raise LookupError(f"Unknown file extension {extension}")
 
     def read(self, path: str):
-        """Open a file for reading, and call the registered handler.
+        """Open a file for reading, and call the registered handler. Handlers of PATH_FILE_TYPES are given the path instead.
 
         Args:
             path (str): Path to file to open.
@@ -54,6 +59,8 @@ class FileAssociator():
             _type_: Any return value from the associated file handler.
         """
         file_type = self.resolve_file_type(path)
+        if file_type in FileAssociator.PATH_FILE_TYPES:
+            return self._handler(file_type)(path)
         with open(path, "r", encoding="utf-8") as file_handler:
             try:
                 return self.associations[file_type](file_handler)
@@ -61,7 +68,7 @@ class FileAssociator():
                 raise KeyError("Not file handler installed for file type.") from exp
 
     def write(self, path: str, *args):
-        """Open a file for writing, and call the registered handler.
+        """Open a file for writing, and call the registered handler. Handlers of PATH_FILE_TYPES are given the path instead.
 
         Args:
             path (str): Path to file to open.
@@ -74,8 +81,16 @@ class FileAssociator():
             _type_: Any return value from the associated file handler.
         """
         file_type = self.resolve_file_type(path)
+        if file_type in FileAssociator.PATH_FILE_TYPES:
+            return self._handler(file_type)(path, args)
         with open(path, "w", encoding="utf-8") as file_handler:
             try:
                 return self.associations[file_type](file_handler, args)
             except KeyError as exp:
                 raise KeyError("Not file handler installed for file type.") from exp
+
+    def _handler(self, file_type: FileTypes) -> Callable:
+        try:
+            return self.associations[file_type]
+        except KeyError as exp:
+            raise KeyError("Not file handler installed for file type.") from exp
@@ -0,0 +1,157 @@
+from redditquotebot.utilities import ScrapeState
+from typing import Callable, List, Optional
+import heapq
+import time
+
+
+class PollScheduler():
+    """Schedules when each subreddit is polled next, from its observed rate of new comments and matches.
+
+    A subreddit is polled roughly when the target number of new comments is expected to be waiting, so busy subreddits are polled often
+    and quiet ones rarely. Subreddits which produce matches are polled sooner, an average of one match per poll halving the interval.
+    Rates are smoothed with an exponential moving average, and stored in the scrape state so the schedule survives restarts.
+    """
+
+    # Weight of the newest observation in the moving averages.
+    SMOOTHING = 0.3
+
+    def __init__(self, subreddits: List[str], minimum_interval: float, maximum_interval: float, target_comments: float, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            subreddits (List[str]): The subreddits to schedule.
+            minimum_interval (float): The shortest time in seconds between polls of a subreddit.
+            maximum_interval (float): The longest time in seconds between polls of a subreddit.
+            target_comments (float): The number of new comments a poll aims to find.
+            clock (Callable[[], float], optional): Source of the current time in seconds. Defaults to time.time.
+        """
+        self.subreddits = subreddits
+        self.minimum_interval = minimum_interval
+        self.maximum_interval = maximum_interval
+        self.target_comments = target_comments
+        self._clock = clock
+        self._queue = []
+
+    def load(self, scrape_state: ScrapeState):
+        """Rebuild the queue from the next poll times stored in a scrape state.
+
+        Args:
+            scrape_state (ScrapeState): The scrape state holding each subreddit's schedule.
+        """
+        self._queue = [(scrape_state.subreddit_schedule(subreddit)["next_poll"], subreddit) for subreddit in self.subreddits]
+        heapq.heapify(self._queue)
+
+    def next_poll(self) -> Optional[float]:
+        """Get the time the next subreddit is due.
+
+        Returns:
+            Optional[float]: The time, or None if no subreddits are queued.
+        """
+        if not len(self._queue):
+            return None
+        return self._queue[0][0]
+
+    def due(self) -> List[str]:
+        """Remove and return every subreddit which is due, earliest first.
+
+        Subreddits are queued again by record_poll or postpone.
+
+        Returns:
+            List[str]: The due subreddits.
+        """
+        now = self._clock()
+        due = []
+        while len(self._queue) and self._queue[0][0] <= now:
+            due.append(heapq.heappop(self._queue)[1])
+        return due
+
+    def wait(self, sleep: Callable[[float], None] = time.sleep) -> List[str]:
+        """Wait until at least one subreddit is due.
+
+        Args:
+            sleep (Callable[[float], None], optional): Used to wait. Defaults to time.sleep.
+
+        Returns:
+            List[str]: The due subreddits.
+        """
+        due = self.due()
+        while not len(due) and len(self._queue):
+            sleep(max(self.next_poll() - self._clock(), 0))
+            due = self.due()
+        return due
+
+    def interval(self, comment_rate: float, match_yield: float) -> float:
+        """Get the time between polls for a subreddit's rates.
+
+        Args:
+            comment_rate (float): New comments per second.
+            match_yield (float): Matches per poll.
+
+        Returns:
+            float: The interval in seconds, within the minimum and maximum intervals.
+        """
+        interval = self.maximum_interval
+        if comment_rate > 0:
+            interval = self.target_comments / comment_rate
+        interval /= 1 + match_yield
+        return min(max(interval, self.minimum_interval), self.maximum_interval)
+
+    def record_poll(self, scrape_state: ScrapeState, subreddit: str, comments: int, matches: int):
+        """Update a subreddit's rates after it has been polled, and queue its next poll.
+
+        The first poll of a subreddit can't measure a rate, so it is polled again after the minimum interval.
+
+        Args:
+            scrape_state (ScrapeState): The scrape state holding each subreddit's schedule.
+            subreddit (str): The polled subreddit.
+            comments (int): The number of new comments found.
+            matches (int): The number of comments matched to quotes.
+        """
+        now = self._clock()
+        schedule = scrape_state.subreddit_schedule(subreddit)
+        comment_rate = schedule["comment_rate"]
+        match_yield = schedule["match_yield"]
+        if schedule["last_poll"] is None:
+            next_poll = now + self.minimum_interval
+            match_yield = matches
+        else:
+            rate = comments / max(now - schedule["last_poll"], 1e-3)
+            comment_rate = self.SMOOTHING * rate + (1 - self.SMOOTHING) * comment_rate
+            match_yield = self.SMOOTHING * matches + (1 - self.SMOOTHING) * match_yield
+            next_poll = now + self.interval(comment_rate, match_yield)
+        scrape_state.update_subreddit_schedule(subreddit, comment_rate, match_yield, now, next_poll)
+        heapq.heappush(self._queue, (next_poll, subreddit))
+
+    def postpone(self, scrape_state: ScrapeState, subreddit: str, delay: float):
+        """Queue a subreddit again without updating its rates, such as after a failed poll.
+
+        Args:
+            scrape_state (ScrapeState): The scrape state holding each subreddit's schedule.
+            subreddit (str): The subreddit to postpone.
+            delay (float): The time in seconds until it is polled.
+        """
+        schedule = scrape_state.subreddit_schedule(subreddit)
+        next_poll = self._clock() + delay
+        scrape_state.update_subreddit_schedule(subreddit, schedule["comment_rate"], schedule["match_yield"], schedule["last_poll"], next_poll)
+        heapq.heappush(self._queue, (next_poll, subreddit))
+
+    def report(self, scrape_state: ScrapeState) -> List[dict]:
+        """Get the schedule of every subreddit, soonest first.
+
+        Args:
+            scrape_state (ScrapeState): The scrape state holding each subreddit's schedule.
+
+        Returns:
+            List[dict]: For each subreddit, its name, new comments per hour, matches per poll, current interval and seconds until its next poll.
+        """
+        now = self._clock()
+        report = []
+        for subreddit in self.subreddits:
+            schedule = scrape_state.subreddit_schedule(subreddit)
+            report.append({
+                "subreddit": subreddit,
+                "comments_per_hour": round(schedule["comment_rate"] * 3600, 2),
+                "match_yield": round(schedule["match_yield"], 3),
+                "interval": round(self.interval(schedule["comment_rate"], schedule["match_yield"]), 1),
+                "next_poll_in": round(max(schedule["next_poll"] - now, 0), 1)
+            })
+        return sorted(report, key=lambda entry: entry["next_poll_in"])
@@ -0,0 +1,145 @@
+from redditquotebot.utilities import RecordKeeper, RecordLoader
+from typing import Dict, Optional
+import json
+import os
+
+
+class RecordJournal():
+    """Stores records as a JSON snapshot, plus a journal of the changes made since, one JSON line per change.
+
+    Saving only appends the changes logged since the last save, so its cost doesn't grow with the size of the records.
+    Once enough changes are journaled, the snapshot is rewritten and the journal emptied (compaction).
+    Each journal line is numbered, and the snapshot holds the number of the last change it contains, so loading after a crash
+    at any point replays each change exactly once. A partially written last line is discarded.
+
+    The snapshot is a regular records file, readable by RecordLoader.from_json. An existing records file is used as the first snapshot.
+    Records are kept in memory once read, as the journal is their only writer.
+    """
+
+    def __init__(self, compact_after: int = 1000):
+        """
+        Args:
+            compact_after (int, optional): The number of journaled changes which triggers a compaction. Defaults to 1000.
+        """
+        self.compact_after = compact_after
+        self._records: Dict[str, RecordKeeper] = {}
+        self._sequence: Dict[str, int] = {}
+        self._journaled: Dict[str, int] = {}
+
+    @staticmethod
+    def journal_path(path: str) -> str:
+        """Get the path of the journal kept alongside a snapshot.
+
+        Args:
+            path (str): The path of the snapshot.
+
+        Returns:
+            str: The path of the journal.
+        """
+        return f"{os.path.splitext(path)[0]}.journal.jsonl"
+
+    def read(self, path: str) -> RecordKeeper:
+        """Load the records stored at a path, replaying the journal over the snapshot. Later reads return the same records.
+
+        Args:
+            path (str): The path of the snapshot.
+
+        Raises:
+            KeyError: The snapshot doesn't contain expected keys. Consider removing.
+
+        Returns:
+            RecordKeeper: The records, with journaling enabled.
+        """
+        if path in self._records:
+            return self._records[path]
+
+        records = RecordKeeper()
+        sequence = 0
+        try:
+            with open(path, "r", encoding="utf-8") as handler:
+                data = json.load(handler)
+            records = RecordLoader.from_dict(data)
+            sequence = data.get("journal_sequence", 0)
+        except FileNotFoundError:
+            pass
+
+        journaled = 0
+        journal_path = RecordJournal.journal_path(path)
+        try:
+            with open(journal_path, "rb") as handler:
+                valid_length = 0
+                for line in handler:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        change = json.loads(line)
+                    except ValueError:
+                        break
+                    valid_length += len(line)
+                    journaled += 1
+                    if change["sequence"] > sequence:
+                        records.apply_journal(change)
+                        sequence = change["sequence"]
+            # Anything after the last complete change was cut short by a crash.
+            if valid_length != os.path.getsize(journal_path):
+                os.truncate(journal_path, valid_length)
+        except FileNotFoundError:
+            pass
+
+        records.journaling = True
+        self._records[path] = records
+        self._sequence[path] = sequence
+        self._journaled[path] = journaled
+        return records
+
+    def write(self, path: str, records: Optional[RecordKeeper] = None):
+        """Append the changes logged since the last write to the journal, compacting it if it has grown too long.
+
+        Args:
+            path (str): The path of the snapshot.
+            records (Optional[RecordKeeper], optional): The records to store. Records not read from this journal are written as a new snapshot. Defaults to empty records.
+        """
+        if records is None:
+            records = RecordKeeper()
+        if self._records.get(path) is not records:
+            self._records[path] = records
+            self._sequence.setdefault(path, 0)
+            records.journaling = True
+            records.take_journal()
+            self.compact(path)
+            return
+
+        changes = records.take_journal()
+        if not len(changes):
+            return
+        lines = []
+        for change in changes:
+            self._sequence[path] += 1
+            lines.append(json.dumps({"sequence": self._sequence[path], **change}) + "\n")
+        with open(RecordJournal.journal_path(path), "a", encoding="utf-8") as handler:
+            handler.write("".join(lines))
+            handler.flush()
+            os.fsync(handler.fileno())
+        self._journaled[path] = self._journaled.get(path, 0) + len(lines)
+        if self._journaled[path] >= self.compact_after:
+            self.compact(path)
+
+    def compact(self, path: str):
+        """Rewrite the snapshot with the current records, and empty the journal.
+
+        Args:
+            path (str): The path of the snapshot.
+        """
+        records = self._records[path]
+        data = records.to_dict()
+        data["journal_sequence"] = self._sequence[path]
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as handler:
+            json.dump(data, handler, indent=2)
+            handler.flush()
+            os.fsync(handler.fileno())
+        os.replace(temporary, path)
+        # Changes already in the snapshot are skipped when replaying, so a crash before this point loses nothing.
+        with open(RecordJournal.journal_path(path), "w", encoding="utf-8"):
+            pass
+        self._journaled[path] = 0
@@ -1,15 +1,24 @@
 from io import TextIOWrapper
-from typing import Optional, List, Union
+from typing import Any, Iterable, Optional, List, Tuple, Union
+from itertools import chain
 from redditquotebot.reddit import Comment, Reply
 from redditquotebot.nlp import MatchedQuote
-from collections import deque
+from redditquotebot.quotes import Quote
+from collections import Counter, deque
 import json
 
 
 class RecordKeeper():
     """Contains information on the latest comments, matches and replies.
+
+    Matches and replies are stored compactly. Each only holds the uid of its comment and the content id of its quote, with the comments
+    and quotes they reference stored once, under "matched_comments" and "quotes". Reply bodies are rendered when replies are read.
+    Comments and quotes are dropped as soon as the last match or reply referencing them is discarded.
     """
 
+    # Increment when the layout of stored records changes.
+    VERSION = 2
+
     def __init__(self):
         self._maximum_comments = None
         self._maximum_matches = None
@@ -20,8 +29,17 @@ class RecordKeeper():
             "matches": deque(maxlen=self._maximum_matches),
             "replies": deque(maxlen=self._maximum_replies),
             "removed": deque(maxlen=self._maximum_removed),
-            "banned_subreddits": []
+            "banned_subreddits": [],
+            "quotes": {},
+            "matched_comments": {}
         }
+        self._quote_ids = {}
+        # The number of matches and replies referencing each stored comment and quote.
+        self._comment_references = Counter()
+        self._quote_references = Counter()
+        # Changes since the journal was last taken, only kept while journaling.
+        self.journaling = False
+        self._journal = []
 
     def maximum_comments(self, count: Union[None, int]) -> None:
         """Set the maximum amount of comments which can exist in a record.
@@ -32,6 +50,8 @@ class RecordKeeper():
             count (Union[None, int]): maximum count
         """
         self._maximum_comments = count
+        if self.records["comments"].maxlen == count:
+            return
         new_comments = deque(self.records["comments"], maxlen=count)
         self.records["comments"] = new_comments
 
@@ -44,6 +64,9 @@ class RecordKeeper():
             count (Union[None, int]): maximum count
         """
         self._maximum_matches = count
+        if self.records["matches"].maxlen == count:
+            return
+        self._release_evicted("matches", count)
         new_matches = deque(self.records["matches"], maxlen=count)
         self.records["matches"] = new_matches
 
@@ -56,6 +79,9 @@ class RecordKeeper():
             count (Union[None, int]): maximum count
         """
         self._maximum_replies = count
+        if self.records["replies"].maxlen == count:
+            return
+        self._release_evicted("replies", count)
         new_replies = deque(self.records["replies"], maxlen=count)
         self.records["replies"] = new_replies
 
@@ -68,6 +94,8 @@ class RecordKeeper():
             count (Union[None, int]): maximum count
         """
         self._maximum_removed = count
+        if self.records["removed"].maxlen == count:
+            return
         new_removals = deque(self.records["removed"], maxlen=count)
         self.records["removed"] = new_removals
 
@@ -87,12 +115,131 @@ class RecordKeeper():
         """
         if subreddit not in self.records["banned_subreddits"]:
             self.records["banned_subreddits"].append(subreddit)
+            self._log_journal("banned_subreddits", [subreddit])
+
+    def _log_journal(self, kind: str, data: list):
+        if not self.journaling or not len(data):
+            return
+        # Records which are discarded as soon as they are logged aren't journaled.
+        if kind != "banned_subreddits" and self.records[kind].maxlen == 0:
+            return
+        self._journal.append({"type": kind, "data": data})
+
+    def take_journal(self) -> List[dict]:
+        """Get the changes logged since the journal was last taken, and clear them. Only changes logged while journaling is enabled are kept.
+
+        Returns:
+            List[dict]: The changes, each with the type of record ("comments", "matches", "replies", "removed" or "banned_subreddits"),
+                and the list of records added.
+        """
+        journal = self._journal
+        self._journal = []
+        return journal
+
+    def apply_journal(self, entry: dict):
+        """Apply a change taken from the journal, without journaling it again.
+
+        Args:
+            entry (dict): A change, as returned by take_journal.
+        """
+        if entry["type"] == "banned_subreddits":
+            for subreddit in entry["data"]:
+                if subreddit not in self.records["banned_subreddits"]:
+                    self.records["banned_subreddits"].append(subreddit)
+        elif entry["type"] in ("matches", "replies"):
+            self._add_references(entry["type"], entry["data"])
+        else:
+            self.records[entry["type"]] += entry["data"]
+
+    def _add_references(self, kind: str, entries: List[dict]):
+        # Stores matches or replies given as dictionaries of a comment, a quote and for matches a score, in their compact form.
+        if self.records[kind].maxlen == 0:
+            return
+        compact = []
+        for entry in entries:
+            comment = entry["comment"]
+            quote = entry["quote"]
+            # Ids are remembered for each quote's contents, so each quote is only hashed once.
+            contents = (quote["body"], quote["author"], tuple(quote["category"]))
+            quote_id = self._quote_ids.get(contents)
+            if quote_id is None:
+                quote_id = Quote.from_dict(quote).content_id()
+                self._quote_ids[contents] = quote_id
+            if quote_id not in self.records["quotes"]:
+                self.records["quotes"][quote_id] = quote
+            self.records["matched_comments"][comment["uid"]] = comment
+            reference = {"comment_uid": comment["uid"], "quote_id": quote_id}
+            if kind == "matches":
+                reference["score"] = entry["score"]
+            compact.append(reference)
+        self._extend_references(kind, compact)
+
+    def _extend_references(self, kind: str, references: List[dict]):
+        # Appends compact matches or replies, releasing the oldest as the maximum count discards them.
+        section = self.records[kind]
+        if section.maxlen == 0:
+            return
+        for reference in references:
+            self._comment_references[reference["comment_uid"]] += 1
+            self._quote_references[reference["quote_id"]] += 1
+            if len(section) == section.maxlen:
+                self._release([section.popleft()])
+            section.append(reference)
+
+    def _release_evicted(self, kind: str, count: Union[None, int]):
+        # Releases the oldest matches or replies, which are discarded when the maximum count is lowered to count.
+        section = self.records[kind]
+        if count is not None and len(section) > count:
+            self._release([section[i] for i in range(len(section) - count)])
+
+    def _release(self, references: List[dict]):
+        # Drops comments and quotes once no match or reply references them.
+        for reference in references:
+            uid = reference["comment_uid"]
+            self._comment_references[uid] -= 1
+            if self._comment_references[uid] <= 0:
+                del self._comment_references[uid]
+                self.records["matched_comments"].pop(uid, None)
+            quote_id = reference["quote_id"]
+            self._quote_references[quote_id] -= 1
+            if self._quote_references[quote_id] <= 0:
+                del self._quote_references[quote_id]
+                self.records["quotes"].pop(quote_id, None)
+
+    def _expand(self, reference: dict) -> dict:
+        expanded = {
+            "comment": self.records["matched_comments"][reference["comment_uid"]],
+            "quote": self.records["quotes"][reference["quote_id"]]
+        }
+        if "score" in reference:
+            expanded["score"] = reference["score"]
+        return expanded
+
+    def entries(self, kind: str) -> List[dict]:
+        """Get the stored dictionaries of a kind of record, without building objects from them.
+
+        Matches and replies are expanded to the dictionaries of their comment and quote, as given by MatchedQuote.to_dict
+        and Reply.to_dict, without the reply body.
+
+        Args:
+            kind (str): The kind of record, one of "comments", "matches", "replies" or "removed".
+
+        Returns:
+            List[dict]: The stored records, oldest first.
+        """
+        if kind in ("matches", "replies"):
+            return [self._expand(reference) for reference in self.records[kind]]
+        return list(self.records[kind])
 
     def to_dict(self) -> dict:
         """Get the records as a dictionary"""
         d = {
+            "version": RecordKeeper.VERSION,
             "records": {
                 "comments": list(self.records["comments"]),
+                # Ahead of the matches and replies referencing them, so they can be expanded while the file is read.
+                "quotes": self.records["quotes"],
+                "matched_comments": self.records["matched_comments"],
                 "matches": list(self.records["matches"]),
                 "replies": list(self.records["replies"]),
                 "removed": list(self.records["removed"]),
@@ -115,6 +262,7 @@ class RecordKeeper():
             self.records["comments"] += comments
         except KeyError:
             self.records["comments"] = comments
+        self._log_journal("comments", comments)
 
     def logged_comments(self) -> List[Comment]:
         """Get all comments currently logged
@@ -134,13 +282,10 @@ class RecordKeeper():
             matches (Union[List[MatchedQuote], MatchedQuote]): Either a list of matches, or a single match
         """
         if isinstance(match, MatchedQuote):
-            match = [match.to_dict()]
-        else:
-            match = [m.to_dict() for m in match]
-        try:
-            self.records["matches"] += match
-        except KeyError:
-            self.records["matches"] = match
+            match = [match]
+        match = [m.to_dict() for m in match]
+        self._add_references("matches", match)
+        self._log_journal("matches", match)
 
     def logged_matches(self) -> List[MatchedQuote]:
         """Get all matches currently logged
@@ -148,10 +293,7 @@ class RecordKeeper():
         Returns:
             List[MatchedQuote]: All logged matches
         """
-        try:
-            return [MatchedQuote.from_dict(r) for r in self.records["matches"]]
-        except KeyError:
-            return []
+        return [MatchedQuote.from_dict(self._expand(r)) for r in self.records["matches"]]
 
     def log_reply(self, reply: Union[List[Reply], Reply]):
         """Log reply to the record keeper
@@ -160,13 +302,11 @@ class RecordKeeper():
             reply (Union[List[Reply], Reply]): Either a list of replies, or a single reply
         """
         if isinstance(reply, Reply):
-            reply = [reply.to_dict()]
-        else:
-            reply = [r.to_dict() for r in reply]
-        try:
-            self.records["replies"] += reply
-        except KeyError:
-            self.records["replies"] = reply
+            reply = [reply]
+        # The body isn't stored, it is rendered from the comment and quote when read.
+        reply = [{"comment": r.comment.to_dict(), "quote": r.quote.to_dict()} for r in reply]
+        self._add_references("replies", reply)
+        self._log_journal("replies", reply)
 
     def logged_replies(self) -> List[Reply]:
         """Get all replies currently logged
@@ -174,10 +314,7 @@ class RecordKeeper():
         Returns:
             List[Reply]: All logged replies
         """
-        try:
-            return [Reply.from_dict(r) for r in self.records["replies"]]
-        except KeyError:
-            return []
+        return [Reply.from_dict(self._expand(r)) for r in self.records["replies"]]
 
     def log_removed_comment(self, comments: Union[List[Comment], Comment]):
         """Log a removed comment to the record keeper.
@@ -193,6 +330,7 @@ class RecordKeeper():
             self.records["removed"] += comments
         except KeyError:
             self.records["removed"] = comments
+        self._log_journal("removed", comments)
 
     def logged_removed_comments(self) -> List[Comment]:
         """Get all comments currently removed.
@@ -223,38 +361,195 @@ class RecordLoader():
         Returns:
             RecordKeeper: instance of records
         """
-        data = json.load(file_handler)
+        return RecordLoader.from_dict(json.load(file_handler))
+
+    @staticmethod
+    def from_dict(data: dict) -> RecordKeeper:
+        """Load records from the dictionary of a records file, as given by RecordKeeper.to_dict.
+
+        Args:
+            data (dict): The parsed records file.
+
+        Raises:
+            KeyError: The given records don't contain expected keys. Consider removing.
+
+        Returns:
+            RecordKeeper: instance of records
+        """
         records = RecordKeeper()
         try:
-            records.log_comments([Comment.from_dict(c) for c in data["records"]["comments"]])
-            records.log_matched_quote([MatchedQuote.from_dict(m) for m in data["records"]["matches"]])
-            records.log_reply([Reply.from_dict(r) for r in data["records"]["replies"]])
+            stored = data["records"]
+            records.apply_journal({"type": "comments", "data": stored["comments"]})
+            if data.get("version", 1) >= 2:
+                records._extend_references("matches", stored["matches"])
+                records._extend_references("replies", stored["replies"])
+                # Only the comments and quotes referenced are kept.
+                records.records["quotes"] = {qid: q for qid, q in stored["quotes"].items() if qid in records._quote_references}
+                records.records["matched_comments"] = {
+                    uid: c for uid, c in stored["matched_comments"].items() if uid in records._comment_references}
+            else:
+                # Files written before version 2 embed the comment and quote of every match and reply, they are compacted on load.
+                records.apply_journal({"type": "matches", "data": stored["matches"]})
+                records.apply_journal({"type": "replies", "data": stored["replies"]})
         except KeyError as exp:
             raise KeyError("Correct keys not found in records file. Consider removing.") from exp
         try:
-            for sub in data["records"]["banned_subreddits"]:
-                records.add_banned_subreddit(sub)
+            records.apply_journal({"type": "banned_subreddits", "data": data["records"]["banned_subreddits"]})
         except KeyError as exp:
             pass
 
         try:
-            records.log_removed_comment([Comment.from_dict(c) for c in data["records"]["removed"]])
+            records.apply_journal({"type": "removed", "data": data["records"]["removed"]})
         except KeyError as exp:
             pass
         return records
 
+    @staticmethod
+    def from_jsonl(file_handler: TextIOWrapper) -> RecordKeeper:
+        """Load records from a JSON Lines file, as written by RecordStorer.to_jsonl.
+
+        Args:
+            file_handler (str): Open file handler
+
+        Raises:
+            KeyError: A line doesn't contain expected keys.
+            FileNotFoundError: The given filename cannot be found
+
+        Returns:
+            RecordKeeper: instance of records
+        """
+        records = RecordKeeper()
+        for line in file_handler:
+            if line.strip():
+                record = json.loads(line)
+                records.apply_journal({"type": record["type"], "data": [record["data"]]})
+        return records
+
+
+class _JSONRecordWriter():
+    # Writes a JSON records file one record at a time, in the layout of RecordKeeper.to_dict. Matches and replies are held
+    # compactly until a later section is reached, so the comments and quotes they reference are written ahead of them.
+
+    STAGES = {"comments": 0, "matches": 1, "replies": 1, "removed": 2, "banned_subreddits": 3}
+    # The section streamed at each stage, matches and replies are written together from memory.
+    SECTIONS = ("comments", None, "removed", "banned_subreddits")
+
+    def __init__(self, file_handler: TextIOWrapper):
+        self._handler = file_handler
+        self._stage = -1
+        self._keys = 0
+        self._elements = 0
+        self._references = RecordKeeper()
+        self._banned = set()
+        file_handler.write(f'{{\n  "version": {RecordKeeper.VERSION},\n  "records": {{')
+
+    def write(self, section: str, entry: Any):
+        stage = _JSONRecordWriter.STAGES[section]
+        if stage < self._stage:
+            raise ValueError(f"Records of {section} given after a later section, sections must be given in order.")
+        while self._stage < stage:
+            self._advance()
+        if stage == 1:
+            self._references.apply_journal({"type": section, "data": [entry]})
+            return
+        if section == "banned_subreddits":
+            if entry in self._banned:
+                return
+            self._banned.add(entry)
+        self._element(json.dumps(entry))
+
+    def close(self):
+        while self._stage < len(_JSONRecordWriter.SECTIONS):
+            self._advance()
+        self._handler.write("\n  }\n}")
+
+    def _advance(self):
+        if self._stage in (0, 2, 3):
+            self._close("]")
+        elif self._stage == 1:
+            for table in ("quotes", "matched_comments"):
+                self._open(table, "{")
+                for key, value in self._references.records[table].items():
+                    self._element(f"{json.dumps(key)}: {json.dumps(value)}")
+                self._close("}")
+            for section in ("matches", "replies"):
+                self._open(section, "[")
+                for reference in self._references.records[section]:
+                    self._element(json.dumps(reference))
+                self._close("]")
+            self._references = None
+        self._stage += 1
+        if self._stage in (0, 2, 3):
+            self._open(_JSONRecordWriter.SECTIONS[self._stage], "[")
+
+    def _open(self, key: str, bracket: str):
+        self._handler.write(f'{"," if self._keys else ""}\n    {json.dumps(key)}: {bracket}')
+        self._keys += 1
+        self._elements = 0
+
+    def _element(self, text: str):
+        self._handler.write(f'{"," if self._elements else ""}\n      {text}')
+        self._elements += 1
+
+    def _close(self, bracket: str):
+        self._handler.write(f"\n    {bracket}" if self._elements else bracket)
+
 
 class RecordStorer():
     """Provides static methods for generating and storing records to external sources
     """
     @staticmethod
-    def to_json(file_handler: TextIOWrapper, records: Optional[RecordKeeper] = None):
+    def to_json(file_handler: TextIOWrapper, records: Union[None, RecordKeeper, Iterable[Tuple[str, Any]]] = None):
+        """Store records as a JSON records file.
+
+        Args:
+            file_handler (TextIOWrapper): Open file handler
+            records (Union[None, RecordKeeper, Iterable[Tuple[str, Any]]], optional): The records, or (section, entry) pairs as
+                read by RecordReader, which are written as they are read. Only the matches and replies of pairs are held in memory,
+                compactly, until the sections after them. Defaults to empty records.
+
+        Raises:
+            ValueError: The pairs aren't in section order, i.e. comments, matches and replies, removed, then banned subreddits.
+        """
+        if isinstance(records, tuple):
+            if len(records) != 0:
+                records = records[0]
+            else:
+                records = None
+
+        if records is None:
+            records = RecordKeeper()
+        if isinstance(records, RecordKeeper):
+            json.dump(records.to_dict(), file_handler, indent=2)
+            return
+        writer = _JSONRecordWriter(file_handler)
+        for section, entry in records:
+            writer.write(section, entry)
+        writer.close()
+
+    @staticmethod
+    def to_jsonl(file_handler: TextIOWrapper, records: Union[None, RecordKeeper, Iterable[Tuple[str, Any]]] = None):
+        """Store records as JSON Lines, one record per line. Each line holds the section ("type") and entry ("data") of a record,
+        with matches and replies holding their comment and quote.
+
+        Args:
+            file_handler (TextIOWrapper): Open file handler
+            records (Union[None, RecordKeeper, Iterable[Tuple[str, Any]]], optional): The records, or (section, entry) pairs as
+                read by RecordReader, which are written as they are read. Defaults to empty records.
+        """
         if isinstance(records, tuple):
             if len(records) != 0:
                 records = records[0]
             else:
                 records = None
 
-        if not records:
+        if records is None:
             records = RecordKeeper()
-        json.dump(records.to_dict(), file_handler, indent=2)
+        pairs = records
+        if isinstance(records, RecordKeeper):
+            pairs = chain(
+                ((section, entry) for section in ("comments", "matches", "replies", "removed") for entry in records.entries(section)),
+                (("banned_subreddits", name) for name in records.banned_subreddits())
+            )
+        for section, entry in pairs:
+            file_handler.write(json.dumps({"type": section, "data": entry}) + "\n")
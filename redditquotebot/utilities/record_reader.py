@@ -0,0 +1,196 @@
+from io import TextIOWrapper
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+import os
+import re
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class _JSONStream():
+    # Parses a JSON document from a text file a value at a time, reading it in chunks. Arrays and objects can be iterated
+    # without holding them in memory, other values are decoded whole.
+
+    def __init__(self, file_handler: TextIOWrapper, chunk_size: int = 1 << 16):
+        self._handler = file_handler
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._handler.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._position:] + chunk
+        self._position = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self._position = _WHITESPACE.match(self._buffer, self._position).end()
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                raise ValueError("Unexpected end of records file.")
+
+    def expect(self, character: str):
+        if self.peek() != character:
+            raise ValueError(f"Expected {character} in records file, found {self._buffer[self._position]}.")
+        self._position += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                # The value continues in the next chunk.
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer may also continue in the next chunk.
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._position = end
+            return value
+
+    def _members(self, opening: str, closing: str) -> Iterator[None]:
+        self.expect(opening)
+        if self.peek() == closing:
+            self._position += 1
+            return
+        while True:
+            yield
+            separator = self.peek()
+            self._position += 1
+            if separator == closing:
+                return
+            if separator != ",":
+                raise ValueError(f"Expected , or {closing} in records file, found {separator}.")
+
+    def elements(self) -> Iterator[None]:
+        """Iterate an array. The caller reads each element."""
+        return self._members("[", "]")
+
+    def keys(self) -> Iterator[str]:
+        """Iterate the keys of an object. The caller reads the value of each key."""
+        for _ in self._members("{", "}"):
+            key = self.value()
+            self.expect(":")
+            yield key
+
+    def skip(self):
+        # Members are decoded whole and discarded, so only one member of the skipped value is held at a time.
+        if self.peek() == "[":
+            for _ in self.elements():
+                self.value()
+        elif self.peek() == "{":
+            for _ in self.keys():
+                self.value()
+        else:
+            self.value()
+
+
+class RecordReader():
+    """Reads records one at a time from a records file, without loading the whole file.
+
+    Records are given as (section, entry) pairs. Entries are the dictionaries given by RecordKeeper.entries, banned subreddits are their name.
+    JSON Lines files are read in constant memory. Matches and replies of version 2 JSON files reference their comments and quotes,
+    which are held in memory while those sections are read.
+    """
+
+    SECTIONS = ("comments", "matches", "replies", "removed", "banned_subreddits")
+
+    @staticmethod
+    def from_json(file_handler: TextIOWrapper, sections: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, Any]]:
+        """Read records from a JSON records file.
+
+        Args:
+            file_handler (TextIOWrapper): Open file handler
+            sections (Optional[Iterable[str]], optional): The sections to read, others are skipped. Defaults to every section.
+
+        Raises:
+            ValueError: The file isn't valid JSON.
+
+        Yields:
+            Tuple[str, Any]: The section and entry of each record, in file order.
+        """
+        sections = set(RecordReader.SECTIONS if sections is None else sections)
+        references = len(sections & {"matches", "replies"}) != 0
+        tables: Dict[str, Dict[str, dict]] = {"quotes": {}, "matched_comments": {}}
+        # References read before the comments and quotes they use, expanded once the tables are read.
+        pending: List[Tuple[str, dict]] = []
+
+        stream = _JSONStream(file_handler)
+        for key in stream.keys():
+            if key != "records":
+                stream.skip()
+                continue
+            for section in stream.keys():
+                if section in tables and references:
+                    for uid in stream.keys():
+                        tables[section][uid] = stream.value()
+                elif section in sections:
+                    for _ in stream.elements():
+                        entry = stream.value()
+                        if section in ("matches", "replies") and "comment_uid" in entry:
+                            if entry["comment_uid"] not in tables["matched_comments"] or entry["quote_id"] not in tables["quotes"]:
+                                pending.append((section, entry))
+                                continue
+                            entry = RecordReader._expand(entry, tables)
+                        yield section, entry
+                else:
+                    stream.skip()
+        for section, entry in pending:
+            yield section, RecordReader._expand(entry, tables)
+
+    @staticmethod
+    def _expand(reference: dict, tables: Dict[str, Dict[str, dict]]) -> dict:
+        expanded = {"comment": tables["matched_comments"][reference["comment_uid"]], "quote": tables["quotes"][reference["quote_id"]]}
+        if "score" in reference:
+            expanded["score"] = reference["score"]
+        return expanded
+
+    @staticmethod
+    def from_jsonl(file_handler: TextIOWrapper, sections: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, Any]]:
+        """Read records from a JSON Lines records file, as written by RecordStorer.to_jsonl.
+
+        Args:
+            file_handler (TextIOWrapper): Open file handler
+            sections (Optional[Iterable[str]], optional): The sections to read, others are skipped. Defaults to every section.
+
+        Raises:
+            KeyError: A line doesn't contain expected keys.
+
+        Yields:
+            Tuple[str, Any]: The section and entry of each record, in file order.
+        """
+        sections = set(RecordReader.SECTIONS if sections is None else sections)
+        for line in file_handler:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["type"] in sections:
+                yield record["type"], record["data"]
+
+    @staticmethod
+    def read(path: str, sections: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, Any]]:
+        """Read records from a file, as JSON Lines if its extension is .jsonl, otherwise as JSON.
+
+        Args:
+            path (str): The records file.
+            sections (Optional[Iterable[str]], optional): The sections to read, others are skipped. Defaults to every section.
+
+        Yields:
+            Tuple[str, Any]: The section and entry of each record, in file order.
+        """
+        with open(path, "r", encoding="utf-8") as handler:
+            if os.path.splitext(path)[1] == ".jsonl":
+                yield from RecordReader.from_jsonl(handler, sections)
+            else:
+                yield from RecordReader.from_json(handler, sections)
@@ -1,5 +1,6 @@
 from io import TextIOWrapper
-from typing import Optional
+from typing import List, Optional
+import copy
 import json
 
 
@@ -9,6 +10,9 @@ class ScrapeState():
 
     def __init__(self):
         self.latest_comments = {}
+        self.latest_fullnames = {}
+        self.submissions = {}
+        self.schedules = {}
 
     def update_latest_subreddit_utc(self, subreddit: str, utc: int):
         try:
@@ -23,10 +27,145 @@ class ScrapeState():
         except KeyError:
             return 0
 
+    def update_latest_subreddit_fullname(self, subreddit: str, fullname: str):
+        self.latest_fullnames[subreddit] = fullname
+
+    def latest_subreddit_fullname(self, subreddit: str) -> Optional[str]:
+        try:
+            return self.latest_fullnames[subreddit]
+        except KeyError:
+            return None
+
+    def submission_state(self, subreddit: str, submission_id: str) -> Optional[dict]:
+        """Get the crawl state of a submission.
+
+        Args:
+            subreddit (str): The subreddit of the submission.
+            submission_id (str): The submission's id.
+
+        Returns:
+            Optional[dict]: The number of comments the submission had when its tree was last fetched ("num_comments"),
+                the creation time of comments already returned ("watermark"), the newest comment seen so far ("latest_utc"),
+                and MoreComments which still need expanding ("pending"). None if the submission has never been crawled.
+        """
+        try:
+            return self.submissions[subreddit][submission_id]
+        except KeyError:
+            return None
+
+    def update_submission_state(self, subreddit: str, submission_id: str, num_comments: int, latest_utc: float, pending: List[dict]):
+        """Store the crawl state of a submission. Once nothing is pending, the watermark is moved up to the newest comment seen.
+
+        Args:
+            subreddit (str): The subreddit of the submission.
+            submission_id (str): The submission's id.
+            num_comments (int): The number of comments the submission had when its tree was fetched.
+            latest_utc (float): The creation time of the newest comment seen.
+            pending (List[dict]): MoreComments which still need expanding, each with "children", "count" and "parent_id" keys.
+        """
+        state = self.submission_state(subreddit, submission_id)
+        watermark = state["watermark"] if state is not None else 0
+        latest_utc = max(latest_utc, state["latest_utc"]) if state is not None else latest_utc
+        if not len(pending):
+            watermark = latest_utc
+        self.submissions.setdefault(subreddit, {})[submission_id] = {
+            "num_comments": num_comments,
+            "watermark": watermark,
+            "latest_utc": latest_utc,
+            "pending": pending
+        }
+
+    def pending_submissions(self, subreddit: str) -> List[str]:
+        """Get the submissions of a subreddit which still have MoreComments to expand.
+
+        Args:
+            subreddit (str): The subreddit to query.
+
+        Returns:
+            List[str]: The submission ids.
+        """
+        return [uid for uid, state in self.submissions.get(subreddit, {}).items() if len(state["pending"])]
+
+    def retain_submissions(self, subreddit: str, submission_ids: List[str]):
+        """Forget the crawl state of submissions which are no longer among the newest, unless they have work pending.
+
+        Args:
+            subreddit (str): The subreddit of the submissions.
+            submission_ids (List[str]): The ids of the submissions to keep.
+        """
+        keep = set(submission_ids) | set(self.pending_submissions(subreddit))
+        self.submissions[subreddit] = {uid: state for uid, state in self.submissions.get(subreddit, {}).items() if uid in keep}
+
+    def fetch_cursors(self, subreddit: str) -> "ScrapeState":
+        """Get a copy of the state used when fetching a subreddit, so it can be fetched apart from this scrape state.
+
+        Args:
+            subreddit (str): The subreddit to copy.
+
+        Returns:
+            ScrapeState: A new scrape state, holding only the subreddit's latest comment, fullname and submission states.
+        """
+        state = ScrapeState()
+        for name in ["latest_comments", "latest_fullnames", "submissions"]:
+            if subreddit in getattr(self, name):
+                getattr(state, name)[subreddit] = copy.deepcopy(getattr(self, name)[subreddit])
+        return state
+
+    def update_fetch_cursors(self, cursors: "ScrapeState", subreddit: str):
+        """Take the fullname and submission states of a subreddit from a scrape state it was fetched with.
+
+        Args:
+            cursors (ScrapeState): The scrape state returned by fetch_cursors, after fetching.
+            subreddit (str): The fetched subreddit.
+        """
+        for name in ["latest_fullnames", "submissions"]:
+            if subreddit in getattr(cursors, name):
+                getattr(self, name)[subreddit] = getattr(cursors, name)[subreddit]
+
+    def subreddit_schedule(self, subreddit: str) -> dict:
+        """Get the polling statistics of a subreddit.
+
+        Args:
+            subreddit (str): The subreddit to query.
+
+        Returns:
+            dict: The smoothed rate of new comments per second ("comment_rate"), the smoothed matches per poll ("match_yield"),
+                and the time of the last and next poll ("last_poll", "next_poll"). A subreddit never polled has no last poll, and is due now.
+        """
+        try:
+            return self.schedules[subreddit]
+        except KeyError:
+            return {
+                "comment_rate": 0.0,
+                "match_yield": 0.0,
+                "last_poll": None,
+                "next_poll": 0
+            }
+
+    def update_subreddit_schedule(self, subreddit: str, comment_rate: float, match_yield: float, last_poll: Optional[float], next_poll: float):
+        """Store the polling statistics of a subreddit.
+
+        Args:
+            subreddit (str): The subreddit to update.
+            comment_rate (float): The smoothed rate of new comments per second.
+            match_yield (float): The smoothed matches per poll.
+            last_poll (Optional[float]): The time of the last poll.
+            next_poll (float): The time of the next poll.
+        """
+        self.schedules[subreddit] = {
+            "comment_rate": comment_rate,
+            "match_yield": match_yield,
+            "last_poll": last_poll,
+            "next_poll": next_poll
+        }
+
     def to_dict(self) -> dict:
         """Get the scrape state as a dictionary"""
         return {
-            "latest_comments": self.latest_comments
+            "latest_comments": self.latest_comments,
+            "latest_fullnames": self.latest_fullnames,
+            "submissions": self.submissions,
+            "schedules": self.schedules
         }
 
 
@@ -53,6 +192,18 @@ class ScrapeStateLoader():
             state.latest_comments = data["latest_comments"]
         except KeyError as exp:
             raise KeyError("Correct keys not found in state file. Consider removing.") from exp
+        try:
+            state.latest_fullnames = data["latest_fullnames"]
+        except KeyError:
+            pass
+        try:
+            state.submissions = data["submissions"]
+        except KeyError:
+            pass
+        try:
+            state.schedules = data["schedules"]
+        except KeyError:
+            pass
         return state
 
 
@@ -0,0 +1,272 @@
+from redditquotebot.reddit import Comment, Reply
+from redditquotebot.nlp import MatchedQuote
+from redditquotebot.utilities import RecordKeeper, RecordJournal
+from typing import Iterator, List, Optional, Union
+import json
+import os
+import sqlite3
+
+
+class SQLiteRecordKeeper(RecordKeeper):
+    """A RecordKeeper stored in an SQLite database, rather than in memory. None of the records are held in memory once committed.
+
+    Logged records are buffered, and inserted in a single transaction when committed. Queries see buffered records too.
+    Maximum counts are applied on commit, by deleting the oldest rows.
+
+    Each table holds the full record as JSON in its data column, alongside indexed columns for querying history:
+    comments and removed (uid, subreddit, utc, score), matches (comment_uid, subreddit, utc, score),
+    replies (comment_uid, subreddit, utc) and banned_subreddits (subreddit).
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS comments (id INTEGER PRIMARY KEY, uid TEXT, subreddit TEXT, utc REAL, score INTEGER, data TEXT);
+        CREATE INDEX IF NOT EXISTS comments_uid ON comments (uid);
+        CREATE INDEX IF NOT EXISTS comments_subreddit_utc ON comments (subreddit, utc);
+        CREATE INDEX IF NOT EXISTS comments_score ON comments (score);
+        CREATE TABLE IF NOT EXISTS matches (id INTEGER PRIMARY KEY, comment_uid TEXT, subreddit TEXT, utc REAL, score REAL, data TEXT);
+        CREATE INDEX IF NOT EXISTS matches_comment_uid ON matches (comment_uid);
+        CREATE INDEX IF NOT EXISTS matches_subreddit_utc ON matches (subreddit, utc);
+        CREATE INDEX IF NOT EXISTS matches_score ON matches (score);
+        CREATE TABLE IF NOT EXISTS replies (id INTEGER PRIMARY KEY, comment_uid TEXT, subreddit TEXT, utc REAL, data TEXT);
+        CREATE INDEX IF NOT EXISTS replies_comment_uid ON replies (comment_uid);
+        CREATE INDEX IF NOT EXISTS replies_subreddit_utc ON replies (subreddit, utc);
+        CREATE TABLE IF NOT EXISTS removed (id INTEGER PRIMARY KEY, uid TEXT, subreddit TEXT, utc REAL, score INTEGER, data TEXT);
+        CREATE INDEX IF NOT EXISTS removed_uid ON removed (uid);
+        CREATE INDEX IF NOT EXISTS removed_subreddit_utc ON removed (subreddit, utc);
+        CREATE TABLE IF NOT EXISTS banned_subreddits (subreddit TEXT PRIMARY KEY);
+    """
+
+    INSERTS = {
+        "comments": "INSERT INTO comments (uid, subreddit, utc, score, data) VALUES (?, ?, ?, ?, ?)",
+        "matches": "INSERT INTO matches (comment_uid, subreddit, utc, score, data) VALUES (?, ?, ?, ?, ?)",
+        "replies": "INSERT INTO replies (comment_uid, subreddit, utc, data) VALUES (?, ?, ?, ?)",
+        "removed": "INSERT INTO removed (uid, subreddit, utc, score, data) VALUES (?, ?, ?, ?, ?)"
+    }
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): The database file. Created if it doesn't exist.
+        """
+        # RecordKeeper.__init__ isn't called, as none of the in-memory records it builds are used. Every method reading them is overridden.
+        self.path = path
+        # Shared between threads by the bot pipeline, which serialises access.
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SQLiteRecordKeeper.SCHEMA)
+        self._maximums = {kind: None for kind in SQLiteRecordKeeper.INSERTS}
+        self._pending = {kind: [] for kind in SQLiteRecordKeeper.INSERTS}
+        # Changes are committed to the database, rather than journaled.
+        self.journaling = False
+        self.closed = False
+
+    def maximum_comments(self, count: Union[None, int]) -> None:
+        self._maximums["comments"] = count
+
+    def maximum_matches(self, count: Union[None, int]) -> None:
+        self._maximums["matches"] = count
+
+    def maximum_replies(self, count: Union[None, int]) -> None:
+        self._maximums["replies"] = count
+
+    def maximum_removed_comments(self, count: Union[None, int]) -> None:
+        self._maximums["removed"] = count
+
+    def banned_subreddits(self) -> List[str]:
+        return [row[0] for row in self._connection.execute("SELECT subreddit FROM banned_subreddits ORDER BY rowid")]
+
+    def add_banned_subreddit(self, subreddit: str) -> None:
+        self._connection.execute("INSERT OR IGNORE INTO banned_subreddits (subreddit) VALUES (?)", (subreddit,))
+
+    def _log(self, kind: str, entries: List[dict]):
+        if self._maximums[kind] != 0:
+            self._pending[kind] += [self._row(kind, entry) for entry in entries]
+
+    @staticmethod
+    def _row(kind: str, entry: dict) -> tuple:
+        # The indexed columns of a record, followed by its data.
+        if kind in ("comments", "removed"):
+            return (entry["uid"], entry["subreddit"], entry["utc"], entry["score"], json.dumps(entry))
+        comment = entry["comment"]
+        if kind == "matches":
+            return (comment["uid"], comment["subreddit"], comment["utc"], entry["score"], json.dumps(entry))
+        return (comment["uid"], comment["subreddit"], comment["utc"], json.dumps(entry))
+
+    def log_comments(self, comments: Union[List[Comment], Comment]):
+        if isinstance(comments, Comment):
+            comments = [comments]
+        self._log("comments", [c.to_dict() for c in comments])
+
+    def log_matched_quote(self, match: Union[List[MatchedQuote], MatchedQuote]):
+        if isinstance(match, MatchedQuote):
+            match = [match]
+        self._log("matches", [m.to_dict() for m in match])
+
+    def log_reply(self, reply: Union[List[Reply], Reply]):
+        if isinstance(reply, Reply):
+            reply = [reply]
+        self._log("replies", [r.to_dict() for r in reply])
+
+    def log_removed_comment(self, comments: Union[List[Comment], Comment]):
+        if isinstance(comments, Comment):
+            comments = [comments]
+        self._log("removed", [c.to_dict() for c in comments])
+
+    def take_journal(self) -> List[dict]:
+        return []
+
+    def apply_journal(self, entry: dict):
+        if entry["type"] == "banned_subreddits":
+            for subreddit in entry["data"]:
+                self.add_banned_subreddit(subreddit)
+        else:
+            self._log(entry["type"], entry["data"])
+
+    def _flush(self):
+        for kind, rows in self._pending.items():
+            if len(rows):
+                self._connection.executemany(SQLiteRecordKeeper.INSERTS[kind], rows)
+        self._pending = {kind: [] for kind in SQLiteRecordKeeper.INSERTS}
+        for kind, maximum in self._maximums.items():
+            if maximum is not None:
+                self._connection.execute(
+                    f"DELETE FROM {kind} WHERE id <= (SELECT id FROM {kind} ORDER BY id DESC LIMIT 1 OFFSET ?)", (maximum,))
+
+    def _data(self, kind: str) -> Iterator[dict]:
+        self._flush()
+        for row in self._connection.execute(f"SELECT data FROM {kind} ORDER BY id"):
+            yield json.loads(row[0])
+
+    def logged_comments(self) -> List[Comment]:
+        return [Comment.from_dict(d) for d in self._data("comments")]
+
+    def logged_matches(self) -> List[MatchedQuote]:
+        return [MatchedQuote.from_dict(d) for d in self._data("matches")]
+
+    def logged_replies(self) -> List[Reply]:
+        return [Reply.from_dict(d) for d in self._data("replies")]
+
+    def logged_removed_comments(self) -> List[Comment]:
+        return [Comment.from_dict(d) for d in self._data("removed")]
+
+    def entries(self, kind: str) -> List[dict]:
+        return list(self._data(kind))
+
+    def to_dict(self) -> dict:
+        # Laid out as a records file, by replaying every record into a RecordKeeper.
+        records = RecordKeeper()
+        for kind in SQLiteRecordKeeper.INSERTS:
+            records.apply_journal({"type": kind, "data": list(self._data(kind))})
+        records.apply_journal({"type": "banned_subreddits", "data": self.banned_subreddits()})
+        return records.to_dict()
+
+    def import_records(self, records: RecordKeeper):
+        """Add every record held by another RecordKeeper, such as one loaded from a JSON records file.
+
+        Args:
+            records (RecordKeeper): The records to add.
+        """
+        for kind in SQLiteRecordKeeper.INSERTS:
+            self.apply_journal({"type": kind, "data": records.entries(kind)})
+        self.apply_journal({"type": "banned_subreddits", "data": records.banned_subreddits()})
+
+    def query(self, sql: str, parameters: tuple = ()) -> sqlite3.Cursor:
+        """Run a query against the records, including those not yet committed. Rows are read as the cursor is iterated.
+
+        Args:
+            sql (str): The SQL statement.
+            parameters (tuple, optional): Values bound to the statement's placeholders. Defaults to ().
+
+        Returns:
+            sqlite3.Cursor: The cursor of the query.
+        """
+        self._flush()
+        return self._connection.execute(sql, parameters)
+
+    def commit(self):
+        """Insert buffered records, apply the maximum counts, and commit.
+        """
+        self._flush()
+        self._connection.commit()
+
+    def close(self):
+        """Commit, and close the database.
+        """
+        self.commit()
+        self._connection.close()
+        self.closed = True
+
+
+class SQLiteRecordLoader():
+    """Provides static methods for loading records from an SQLite database
+    """
+
+    # Records opened by from_sqlite, by path, so loading every cycle reuses one connection.
+    _opened = {}
+
+    @staticmethod
+    def json_path(path: str) -> str:
+        """Get the path of the JSON records file migrated into a new database.
+
+        Args:
+            path (str): The database file.
+
+        Returns:
+            str: The path of the JSON records file, alongside the database.
+        """
+        return f"{os.path.splitext(path)[0]}.json"
+
+    @staticmethod
+    def from_sqlite(path: str) -> SQLiteRecordKeeper:
+        """Open the records stored in an SQLite database. Later loads of the same path return the same records, until they are closed.
+
+        When the database doesn't exist yet, and a JSON records file does alongside it, the JSON records (and any journal of them)
+        are imported into the new database, so switching storage keeps the history of the bot. The JSON file is left in place.
+
+        Args:
+            path (str): The database file. Created if it doesn't exist.
+
+        Raises:
+            KeyError: The JSON records file being migrated doesn't contain expected keys.
+
+        Returns:
+            SQLiteRecordKeeper: The records.
+        """
+        records = SQLiteRecordLoader._opened.get(path)
+        if records is None or records.closed:
+            json_path = SQLiteRecordLoader.json_path(path)
+            migrate = not os.path.exists(path) and os.path.exists(json_path)
+            # Read before the database is created, so a records file which can't be read doesn't leave an empty database behind.
+            existing = RecordJournal().read(json_path) if migrate else None
+            records = SQLiteRecordKeeper(path)
+            if existing is not None:
+                records.import_records(existing)
+                records.commit()
+            SQLiteRecordLoader._opened[path] = records
+        return records
+
+
+class SQLiteRecordStorer():
+    """Provides static methods for storing records to an SQLite database
+    """
+    @staticmethod
+    def to_sqlite(path: str, records: Optional[RecordKeeper] = None):
+        """Commit records to an SQLite database.
+
+        Args:
+            path (str): The database file. Created if it doesn't exist.
+            records (Optional[RecordKeeper], optional): The records. Records not opened from the database are added to it. Defaults to no records.
+        """
+        if isinstance(records, tuple):
+            if len(records) != 0:
+                records = records[0]
+            else:
+                records = None
+
+        if isinstance(records, SQLiteRecordKeeper) and records.path == path:
+            records.commit()
+            return
+        database = SQLiteRecordKeeper(path)
+        if records:
+            database.import_records(records)
+        database.close()
@@ -0,0 +1,56 @@
+from typing import Callable
+import threading
+import time
+
+
+class TokenBucket():
+    """Limits the rate of an action shared across threads.
+
+    Tokens are added at a fixed rate, up to a capacity. Each action takes a token, waiting for one to be added if none are left,
+    so short bursts up to the capacity are allowed while the long term rate never exceeds the refill rate.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float): The maximum number of tokens held. The bucket starts full.
+            clock (Callable[[], float], optional): Source of the current time in seconds. Defaults to time.monotonic.
+            sleep (Callable[[float], None], optional): Used to wait for tokens. Defaults to time.sleep.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Take tokens if enough are available, without waiting.
+
+        Args:
+            tokens (float, optional): The number of tokens to take. Defaults to 1.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the time in seconds until enough tokens will be available.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1):
+        """Take tokens, waiting until enough are available.
+
+        Args:
+            tokens (float, optional): The number of tokens to take. Defaults to 1.
+        """
+        wait = self.try_acquire(tokens)
+        while wait > 0:
+            self._sleep(wait)
+            wait = self.try_acquire(tokens)
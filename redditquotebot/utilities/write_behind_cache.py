@@ -0,0 +1,112 @@
+from typing import Any, Callable, Dict
+import os
+import time
+
+
+class WriteBehindCache():
+    """Keeps objects loaded from files resident in memory, and writes changes back behind the caller.
+
+    A file is read once, later reads return the same object. Writes mark the object as dirty, and it is only written to disk
+    once enough changes have been made, or enough time has passed since its last write. There is no timer, the time is only
+    checked when a change is written, so the last changes are held until the next write or flush. flush writes every dirty
+    object, and must be called before exiting.
+
+    Files are written to a temporary file alongside, then renamed over the original, so a crash never leaves a partly written file.
+    """
+
+    def __init__(self, flush_interval: float = 60, flush_after_changes: int = 20, clock: Callable[[], float] = time.time):
+        """
+        Args:
+            flush_interval (float, optional): The seconds after which the next change written is flushed with the changes held before it. Defaults to 60.
+            flush_after_changes (int, optional): The number of changes which triggers a write. Defaults to 20.
+            clock (Callable[[], float], optional): Source of the current time in seconds. Defaults to time.time.
+        """
+        self.flush_interval = flush_interval
+        self.flush_after_changes = flush_after_changes
+        self._clock = clock
+        self._objects: Dict[str, Any] = {}
+        self._storers: Dict[str, Callable[[str, Any], None]] = {}
+        self._changes: Dict[str, int] = {}
+        self._last_flush: Dict[str, float] = {}
+
+    @staticmethod
+    def temporary_path(path: str) -> str:
+        """Get the path a file is written to before replacing the original. The extension is kept, so it resolves to the same filetype.
+
+        Args:
+            path (str): The path of the file.
+
+        Returns:
+            str: The temporary path.
+        """
+        base, extension = os.path.splitext(path)
+        return f"{base}.tmp{extension}"
+
+    def reader(self, loader: Callable[[str], Any]) -> Callable[[str], Any]:
+        """Wrap a loader, so each path is only loaded once.
+
+        Args:
+            loader (Callable[[str], Any]): Loads the object stored at a path.
+
+        Returns:
+            Callable[[str], Any]: Returns the resident object of a path, loading it on first use.
+        """
+        def read(path: str) -> Any:
+            if path not in self._objects:
+                self._objects[path] = loader(path)
+                self._changes[path] = 0
+                self._last_flush[path] = self._clock()
+            return self._objects[path]
+        return read
+
+    def writer(self, storer: Callable[..., None]) -> Callable[..., None]:
+        """Wrap a storer, so writes are held in memory until a flush is due.
+
+        Args:
+            storer (Callable[..., None]): Stores an object at a path, called as storer(path, object).
+
+        Returns:
+            Callable[..., None]: Records a change to the object of a path, writing it if a flush is due.
+        """
+        def write(path: str, *args):
+            obj = args[0] if len(args) else None
+            if obj is None:
+                # Writes the storer's default, which is loaded from disk when next read.
+                self._objects.pop(path, None)
+                self._changes[path] = 0
+                storer(WriteBehindCache.temporary_path(path))
+                os.replace(WriteBehindCache.temporary_path(path), path)
+                return
+            # A different object replaces the resident one, and is written straight away.
+            replaced = self._objects.get(path) is not obj
+            self._objects[path] = obj
+            self._storers[path] = storer
+            self._changes[path] = self._changes.get(path, 0) + 1
+            if replaced or self._changes[path] >= self.flush_after_changes or \
+                    self._clock() - self._last_flush.get(path, float("-inf")) >= self.flush_interval:
+                self.flush(path)
+        return write
+
+    def dirty(self) -> bool:
+        """Check if any changes have not been written.
+
+        Returns:
+            bool: True if a flush would write a file.
+        """
+        return any(self._changes.get(path, 0) for path in self._storers)
+
+    def flush(self, path: str = None):
+        """Write dirty objects to disk.
+
+        Args:
+            path (str, optional): The path to write, if dirty. Defaults to every dirty path.
+        """
+        paths = list(self._storers) if path is None else [path]
+        for path in paths:
+            if not self._changes.get(path, 0):
+                continue
+            temporary = WriteBehindCache.temporary_path(path)
+            self._storers[path](temporary, self._objects[path])
+            os.replace(temporary, path)
+            self._changes[path] = 0
+            self._last_flush[path] = self._clock()
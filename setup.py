@@ -25,7 +25,8 @@ with open("README.md", "r") as fh:
         ],
         install_requires=[
             "praw==7.6.0",
-            "spacy==3.4.2"
+            "spacy==3.4.2",
+            "numpy==1.23.4"
         ],
         extras_require={},
         use_scm_version=True,
@@ -0,0 +1,82 @@
+import unittest
+from redditquotebot.quotes import Quote
+from redditquotebot.nlp import CleanedSentence, QuoteCommentNLPMatcher, QuoteNLPDetector
+import spacy
+
+nlp = spacy.load("en_core_web_md")
+
+
+class BuildingSentences(unittest.TestCase):
+
+    def test_attributes(self):
+        sentence = CleanedSentence([t for t in nlp("had long dream")], nlp.vocab.vectors_length)
+        self.assertEqual(sentence.text, "had long dream")
+        self.assertEqual(len(sentence), 3)
+        self.assertGreater(sentence.vector_norm, 0)
+
+    def test_no_tokens(self):
+        sentence = CleanedSentence([], nlp.vocab.vectors_length)
+        self.assertEqual(sentence.text, "")
+        self.assertEqual(len(sentence), 0)
+        self.assertEqual(sentence.vector_norm, 0)
+        self.assertEqual(len(sentence.vector), nlp.vocab.vectors_length)
+
+    def test_vector_matches_parsed_text(self):
+        sentence = CleanedSentence([t for t in nlp("had long dream")], nlp.vocab.vectors_length)
+        parsed = nlp("had long dream")
+        self.assertAlmostEqual(sentence.vector_norm, parsed.vector_norm, places=4)
+
+
+class ComparingSentences(unittest.TestCase):
+
+    def setUp(self):
+        width = nlp.vocab.vectors_length
+        self.dream = CleanedSentence([t for t in nlp("had long dream")], width)
+        self.dreams = CleanedSentence([t for t in nlp("has long dreams")], width)
+        self.empty = CleanedSentence([], width)
+
+    def test_identical(self):
+        self.assertEqual(self.dream.similarity(self.dream), 1.0)
+
+    def test_similar(self):
+        similarity = self.dream.similarity(self.dreams)
+        self.assertAlmostEqual(similarity, nlp("had long dream").similarity(nlp("has long dreams")), places=4)
+
+    def test_empty(self):
+        self.assertEqual(self.dream.similarity(self.empty), 0.0)
+        self.assertEqual(self.empty.similarity(self.empty), 1.0)
+
+
+class ReparseCompatibility(unittest.TestCase):
+
+    def setUp(self):
+        self.quotes = [
+            Quote("I has a long dream", "Jimmy", []),
+            Quote("Is this really the end. It looks like it.", "", []),
+            Quote("Be yourself; everyone else is already taken.", "Oscar Wilde", []),
+            Quote("Nothing in life is to be feared, it is only to be understood. Now is the time to understand more.", "", []),
+        ]
+        self.comments = [
+            "I had a long dream. Jimmy",
+            "It looks like the end, doesn't it?",
+            "Just be yourself, everyone else is taken already.",
+            "Nothing in life should be feared. It has only to be understood!",
+        ]
+        self.reparsed = QuoteNLPDetector(self.quotes)
+        self.single_parse = QuoteNLPDetector(self.quotes, reparse_sentences=False)
+
+    def test_scores_within_tolerance(self):
+        matcher = QuoteCommentNLPMatcher(0.5, 2, bonus_coeff=0.0008, match_sentence_coeff=0.5)
+        reparsed = self.reparsed.parse(self.comments)
+        single_parse = self.single_parse.parse(self.comments)
+        for comment, reparsed_sentences, single_parse_sentences in zip(self.comments, reparsed, single_parse):
+            expected = self.reparsed.quote_matrix.scores(reparsed_sentences, matcher)
+            scores = self.single_parse.quote_matrix.scores(single_parse_sentences, matcher)
+            for index in range(len(self.quotes)):
+                self.assertAlmostEqual(scores[index], expected[index], delta=0.01, msg=comment)
+
+    def test_sentence_text_matches(self):
+        reparsed = self.reparsed.parse(self.comments)
+        single_parse = self.single_parse.parse(self.comments)
+        for reparsed_sentences, single_parse_sentences in zip(reparsed, single_parse):
+            self.assertEqual([s.text for s in single_parse_sentences], [s.text for s in reparsed_sentences])
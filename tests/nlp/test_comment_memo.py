@@ -0,0 +1,68 @@
+import unittest
+import tempfile
+import os
+import numpy as np
+from redditquotebot.nlp import CleanedSentence, CommentMemo
+
+
+class MemoisingComments(unittest.TestCase):
+    def setUp(self):
+        self.time = 0
+        self.memo = CommentMemo(2, clock=lambda: self.time)
+        self.sentences = [CleanedSentence.from_vector("had dream", 2, np.array([1, 2, 3], dtype=np.float32))]
+
+    def test_miss_then_hit(self):
+        self.assertIsNone(self.memo.get("I had a dream"))
+        self.memo.put("I had a dream", self.sentences, "key", [(1, 0.9)])
+        entry = self.memo.get("I had a dream")
+        self.assertEqual(entry.matches, [(1, 0.9)])
+        self.assertEqual(entry.scoring_key, "key")
+        self.assertEqual(self.memo.hits, 1)
+        self.assertEqual(self.memo.misses, 1)
+
+    def test_least_recently_used_evicted(self):
+        self.memo.put("a", None, "key", [])
+        self.memo.put("b", None, "key", [])
+        self.memo.get("a")
+        self.memo.put("c", None, "key", [])
+        self.assertEqual(len(self.memo), 2)
+        self.assertIsNone(self.memo.get("b"))
+        self.assertIsNotNone(self.memo.get("a"))
+
+    def test_expired_after_ttl(self):
+        memo = CommentMemo(2, ttl=10, clock=lambda: self.time)
+        memo.put("a", None, "key", [])
+        self.time = 11
+        self.assertIsNone(memo.get("a"))
+        self.assertEqual(len(memo), 0)
+
+    def test_disabled_when_empty(self):
+        memo = CommentMemo(0)
+        memo.put("a", None, "key", [])
+        self.assertEqual(len(memo), 0)
+
+    def test_saving_and_loading(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "memo.json")
+            self.memo.put("a", self.sentences, "key", [(1, 0.9)])
+            self.memo.put("b", None, "key", [])
+            self.memo.save(path, "context")
+            loaded = CommentMemo(2)
+            loaded.load(path, "context")
+            entry = loaded.get("a")
+            self.assertEqual(entry.matches, [(1, 0.9)])
+            self.assertEqual(entry.sentences[0].text, "had dream")
+            self.assertEqual(len(entry.sentences[0]), 2)
+            self.assertEqual(list(entry.sentences[0].vector), [1, 2, 3])
+            self.assertIsNone(loaded.get("b").sentences)
+
+    def test_loading_different_context_ignored(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "memo.json")
+            self.memo.put("a", None, "key", [])
+            self.memo.save(path, "context")
+            loaded = CommentMemo(2)
+            loaded.load(path, "other")
+            self.assertEqual(len(loaded), 0)
+            loaded.load(os.path.join(directory, "missing.json"), "context")
+            self.assertEqual(len(loaded), 0)
@@ -0,0 +1,101 @@
+import unittest
+from redditquotebot.quotes import Quote
+from redditquotebot.reddit import Comment
+from redditquotebot.nlp import MatchedQuote, MatchStore
+
+
+def make_comment(uid: str) -> Comment:
+    comment = Comment()
+    comment.uid = uid
+    return comment
+
+
+class StoringMatches(unittest.TestCase):
+    def setUp(self):
+        self.comment = make_comment("a")
+        self.quotes = [Quote(str(i), "", []) for i in range(5)]
+        self.time = 0
+        self.store = MatchStore(clock=lambda: self.time)
+
+    def test_sorted_best_first(self):
+        for score, quote in zip([0.2, 0.9, 0.5], self.quotes):
+            self.store.add(MatchedQuote(self.comment, quote, score))
+        matches = self.store.get(self.comment)
+        self.assertEqual([m.score for m in matches], [0.9, 0.5, 0.2])
+        self.assertEqual(len(self.store.get(self.comment, 2)), 2)
+
+    def test_ties_keep_insertion_order(self):
+        for quote in self.quotes:
+            self.store.add(MatchedQuote(self.comment, quote, 1.0))
+        self.assertEqual([m.quote for m in self.store.get(self.comment)], self.quotes)
+
+    def test_unknown_comment(self):
+        self.assertEqual(self.store.get(make_comment("b")), [])
+
+    def test_bounded_per_comment(self):
+        store = MatchStore(2)
+        for score, quote in zip([0.2, 0.9, 0.5, 0.1, 0.9], self.quotes):
+            store.add(MatchedQuote(self.comment, quote, score))
+        matches = store.get(self.comment)
+        self.assertEqual([m.quote for m in matches], [self.quotes[1], self.quotes[4]])
+        self.assertEqual(store.match_count(), 2)
+
+    def test_evicted_on_new_cycle(self):
+        self.store.add(MatchedQuote(self.comment, self.quotes[0], 1.0))
+        self.store.new_cycle()
+        self.store.add(MatchedQuote(make_comment("b"), self.quotes[0], 1.0))
+        self.assertEqual(len(self.store), 1)
+        self.assertEqual(self.store.get(self.comment), [])
+
+    def test_evicted_after_ttl(self):
+        store = MatchStore(ttl=10, clock=lambda: self.time)
+        store.add(MatchedQuote(self.comment, self.quotes[0], 1.0))
+        self.time = 5
+        store.add(MatchedQuote(make_comment("b"), self.quotes[0], 1.0))
+        store.new_cycle()
+        self.assertEqual(len(store), 2)
+        self.time = 12
+        store.new_cycle()
+        self.assertEqual(len(store), 1)
+        self.assertEqual(store.get(self.comment), [])
+        self.assertEqual(len(store.get(make_comment("b"))), 1)
+
+    def test_same_match_replaced_under_ttl(self):
+        store = MatchStore(ttl=10, clock=lambda: self.time)
+        store.add(MatchedQuote(self.comment, self.quotes[0], 0.5))
+        store.add(MatchedQuote(self.comment, self.quotes[1], 0.5))
+        store.new_cycle()
+        # Matched again, as when a submission is crawled again.
+        store.add(MatchedQuote(self.comment, self.quotes[0], 0.5))
+        store.add(MatchedQuote(self.comment, self.quotes[1], 0.7))
+        self.assertEqual([m.quote for m in store.get(self.comment)], [self.quotes[1], self.quotes[0]])
+        self.assertEqual([m.score for m in store.get(self.comment)], [0.7, 0.5])
+        self.assertEqual(store.match_count(), 2)
+
+    def test_replaced_match_keeps_tie_order(self):
+        for quote in self.quotes[0:3]:
+            self.store.add(MatchedQuote(self.comment, quote, 1.0))
+        self.store.add(MatchedQuote(self.comment, self.quotes[0], 1.0))
+        self.assertEqual([m.quote for m in self.store.get(self.comment)], self.quotes[0:3])
+
+    def test_replacing_bounded_matches(self):
+        store = MatchStore(2)
+        for score, quote in zip([0.2, 0.9, 0.5], self.quotes):
+            store.add(MatchedQuote(self.comment, quote, score))
+        store.add(MatchedQuote(self.comment, self.quotes[1], 0.9))
+        store.add(MatchedQuote(self.comment, self.quotes[0], 0.6))
+        self.assertEqual([m.quote for m in store.get(self.comment)], [self.quotes[1], self.quotes[0]])
+        self.assertEqual(store.match_count(), 2)
+
+    def test_clear(self):
+        self.store.add(MatchedQuote(self.comment, self.quotes[0], 1.0))
+        self.store.clear()
+        self.assertEqual(len(self.store), 0)
+
+    def test_memory_statistics(self):
+        for quote in self.quotes:
+            self.store.add(MatchedQuote(self.comment, quote, 1.0))
+        statistics = self.store.memory_statistics()
+        self.assertEqual(statistics["comments"], 1)
+        self.assertEqual(statistics["matches"], 5)
+        self.assertGreater(statistics["bytes"], 0)
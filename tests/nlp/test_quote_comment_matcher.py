@@ -1,7 +1,8 @@
 import unittest
+from unittest.mock import patch
 from redditquotebot.quotes import Quote
 from redditquotebot.reddit import Comment
-from redditquotebot.nlp import QuoteCommentMatcher, QuoteCommentLengthMatcher, QuoteCommentNLPMatcher
+from redditquotebot.nlp import QuoteCommentMatcher, QuoteCommentLengthMatcher, QuoteCommentNLPMatcher, QuoteSentenceMatrix
 import spacy
 
 nlp = spacy.load("en_core_web_md")
@@ -54,6 +55,26 @@ class TestingQuoteCommentLengthMatcher(unittest.TestCase):
         matcher.compare(comment, self.quote)
         self.assertEqual(matcher.score(), 0.0)
 
+    def test_comment_and_quote_length_zero(self):
+        matcher = QuoteCommentLengthMatcher()
+        self.assertEqual(matcher.score(Comment(), Quote("", "", [])), 1.0)
+
+    def test_scoring_is_stateless(self):
+        comment = Comment()
+        comment.body = "I had a"
+        matcher = QuoteCommentLengthMatcher()
+        self.assertEqual(matcher.score(comment, self.quote), 0.5)
+        self.assertEqual(matcher.score(), 0)
+
+    def test_scoring_many(self):
+        comment = Comment()
+        comment.body = "I had a"
+        quotes = [self.quote, Quote("I had a", "", []), Quote("", "", []), Quote("I", "", [])]
+        matcher = QuoteCommentLengthMatcher()
+        scores = matcher.score_many(comment, quotes)
+        self.assertEqual(list(scores), [matcher.score(comment, quote) for quote in quotes])
+        self.assertEqual(len(matcher.score_many(comment, [])), 0)
+
 
 class TestingQuoteCommenNLPMatcher(unittest.TestCase):
 
@@ -125,3 +146,27 @@ class TestingQuoteCommenNLPMatcher(unittest.TestCase):
             quote_comment_delta=0.8, minimum_sentence_word_length=3, bonus_coeff=0, match_sentence_coeff=0.5)
         matcher.compare(comments, self.quotes[0:2])
         self.assertEqual(matcher.score(),  0.5)
+
+    def test_scoring_is_stateless(self):
+        comments = [nlp("I had a dream"), nlp("Another sentence which doesn't match")]
+        matcher = QuoteCommentNLPMatcher(quote_comment_delta=0.9, minimum_sentence_word_length=3, bonus_coeff=0)
+        self.assertEqual(matcher.score(comments, self.quotes[0:2]), 1)
+        self.assertEqual(matcher.score(), 0)
+
+    def test_scoring_many(self):
+        comments = [nlp("I has a dream"), nlp("Another sentence which doesn't match")]
+        quotes = [self.quotes[0:2], self.quotes[2:3], [nlp("Another sentence which does match")]]
+        matcher = QuoteCommentNLPMatcher(quote_comment_delta=0.5, minimum_sentence_word_length=2)
+        scores = matcher.score_many(comments, quotes)
+        for score, quote in zip(scores, quotes):
+            self.assertAlmostEqual(score, matcher.score(comments, quote), places=6)
+
+    def test_scoring_many_with_matrix(self):
+        comments = [nlp("I has a dream"), nlp("Another sentence which doesn't match")]
+        quotes = [self.quotes[0:2], self.quotes[2:3], [nlp("Another sentence which does match")]]
+        matcher = QuoteCommentNLPMatcher(quote_comment_delta=0.5, minimum_sentence_word_length=2)
+        matrix = QuoteSentenceMatrix(quotes)
+        with patch("redditquotebot.nlp.quote_comment_matcher.QuoteSentenceMatrix") as build:
+            scores = matcher.score_many(comments, quotes, matrix)
+        build.assert_not_called()
+        self.assertEqual(list(scores), list(matcher.score_many(comments, quotes)))
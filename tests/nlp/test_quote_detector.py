@@ -1,8 +1,11 @@
 from nis import match
 import unittest
+import tempfile
+import os
+from typing import List
 from redditquotebot.quotes import Quote
 from redditquotebot.reddit import Comment
-from redditquotebot.nlp import MatchedQuote, QuoteDetector, QuoteCommentLengthMatcher, QuoteCommentNLPMatcher, QuoteNLPDetector
+from redditquotebot.nlp import MatchedQuote, QuoteDetector, QuoteCommentLengthMatcher, QuoteCommentNLPMatcher, QuoteNLPDetector, QuoteParallelNLPDetector
 
 
 class MatchingComments(unittest.TestCase):
@@ -63,6 +66,21 @@ class MatchingComments(unittest.TestCase):
         self.assertEqual(matches[0].quote, self.quotes[1])
         self.assertEqual(matches[1].quote, self.quotes[2])
 
+    def test_matches_cleared_on_apply(self):
+        matcher = QuoteCommentLengthMatcher()
+        self.detector.apply(matcher, 1, False, self.comments[0:3])
+        self.detector.apply(matcher, 1, False, self.comments[3:])
+        self.assertEqual(len(self.detector.get_matches(self.comments[2])), 0)
+        self.assertEqual(len(self.detector.get_matches(self.comments[3])), 1)
+
+    def test_matches_per_comment_bounded(self):
+        detector = QuoteDetector(self.quotes, matches_per_comment=3)
+        detector.apply(QuoteCommentLengthMatcher(), 0.5, False, self.comments)
+        matches = detector.get_matches(self.comments[2])
+        self.assertEqual(len(matches), 3)
+        self.assertEqual(matches[0].quote, self.quotes[1])
+        self.assertEqual(matches[1].quote, self.quotes[2])
+
 
 class MatchingNLPComments(unittest.TestCase):
     def setUp(self):
@@ -151,3 +169,190 @@ class MatchingNLPComments(unittest.TestCase):
         self.detector.apply(matcher, 0.8, True, self.comments)
         matches = self.detector.get_matches(self.comments[0])
         self.assertEqual(len(matches), 0)
+
+    def test_pruning_counts_pairs(self):
+        comment = Comment()
+        comment.body = "It looks like it"
+        matcher = QuoteCommentNLPMatcher(0.5, 2, bonus_coeff=0)
+        self.detector.apply(matcher, 1.0, False, [comment])
+        self.assertEqual(self.detector.pruned_pairs + self.detector.scored_pairs, 2)
+        self.assertEqual(len(self.detector.get_matches(comment)), 1)
+
+    def test_pruning_disabled(self):
+        detector = QuoteNLPDetector(self.quotes, prune_below_threshold=False)
+        comment = Comment()
+        comment.body = "It looks like it"
+        matcher = QuoteCommentNLPMatcher(0.5, 2, bonus_coeff=0)
+        detector.apply(matcher, 1.0, False, [comment])
+        self.assertEqual(detector.pruned_pairs, 0)
+        self.assertEqual(detector.scored_pairs, 2)
+        self.assertEqual(len(detector.get_matches(comment)), 1)
+
+
+class ParsingNLPComments(unittest.TestCase):
+    def setUp(self):
+        self.detector = QuoteNLPDetector([Quote("I has a long dream", "", [])], batch_size=2)
+
+    def test_parsing_in_batches(self):
+        parsed = self.detector.parse(["I has a long dream.", "I woke up. It was great.", "", "Another one."])
+        self.assertEqual(len(parsed), 4)
+        self.assertEqual([s.text for s in parsed[0]], ["has long dream"])
+        self.assertEqual(len(parsed[1]), 2)
+        self.assertEqual(len(parsed[2]), 0)
+
+    def test_quotes_parsed(self):
+        self.assertEqual([s.text for s in self.detector.nlp_quotes[0]], ["has long dream"])
+
+
+class CachingNLPQuotes(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.quotes = [
+            Quote("I has a long dream", "Jimmy", []),
+            Quote("Is this really the end. It looks like it.", "", []),
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cache_created(self):
+        QuoteNLPDetector(self.quotes, cache_directory=self.directory.name)
+        self.assertEqual(len(os.listdir(self.directory.name)), 3)
+
+    def test_loading_from_cache(self):
+        parsed = QuoteNLPDetector(self.quotes, cache_directory=self.directory.name)
+        cached = QuoteNLPDetector(self.quotes, cache_directory=self.directory.name)
+        self.assertEqual([len(q) for q in cached.nlp_quotes], [len(q) for q in parsed.nlp_quotes])
+        self.assertEqual(cached.nlp_quotes[1][1].text, parsed.nlp_quotes[1][1].text)
+
+        comment = Comment()
+        comment.body = "It looks like it"
+        matcher = QuoteCommentNLPMatcher(0.5, 2, bonus_coeff=0)
+        cached.apply(matcher, 1.0, False, [comment])
+        matches = cached.get_matches(comment)
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(matches[0].quote, self.quotes[1])
+
+    def test_rebuilt_when_quotes_change(self):
+        QuoteNLPDetector(self.quotes, cache_directory=self.directory.name)
+        detector = QuoteNLPDetector(self.quotes[0:1], cache_directory=self.directory.name)
+        self.assertEqual(len(detector.nlp_quotes), 1)
+        self.assertEqual(len(os.listdir(self.directory.name)), 3)
+
+
+class MemoisingNLPComments(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.quotes = [
+            Quote("I has a long dream", "Jimmy", []),
+            Quote("Is this really the end. It looks like it.", "", []),
+        ]
+        self.path = os.path.join(self.directory.name, "memo.json")
+        self.detector = QuoteNLPDetector(self.quotes, memo_size=10, memo_path=self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_comment(self, uid: str, body: str) -> Comment:
+        comment = Comment()
+        comment.uid = uid
+        comment.body = body
+        return comment
+
+    def test_repeated_bodies_reuse_matches(self):
+        matcher = QuoteCommentNLPMatcher(0.5, 2, bonus_coeff=0)
+        comments = [self.make_comment("1", "It looks like it"), self.make_comment("2", "It looks like it")]
+        self.detector.apply(matcher, 1.0, False, comments)
+        self.assertEqual(self.detector.comment_memo.misses, 1)
+        self.assertEqual(self.detector.scored_pairs + self.detector.pruned_pairs, 2)
+        for comment in comments:
+            self.assertEqual(self.detector.get_matches(comment)[0].quote, self.quotes[1])
+
+        comment = self.make_comment("3", "It looks like it")
+        self.detector.apply(matcher, 1.0, False, [comment])
+        self.assertEqual(self.detector.comment_memo.hits, 1)
+        self.assertEqual(self.detector.scored_pairs + self.detector.pruned_pairs, 0)
+        self.assertEqual(self.detector.get_matches(comment)[0].quote, self.quotes[1])
+
+    def test_changed_matcher_rescored(self):
+        comment = self.make_comment("1", "It looks like it")
+        self.detector.apply(QuoteCommentNLPMatcher(0.5, 2, bonus_coeff=0), 1.0, False, [comment])
+        self.detector.apply(QuoteCommentNLPMatcher(0.5, 10, bonus_coeff=0), 1.0, False, [comment])
+        self.assertEqual(len(self.detector.get_matches(comment)), 0)
+
+    def test_memo_saved_and_loaded(self):
+        matcher = QuoteCommentNLPMatcher(0.5, 2, bonus_coeff=0)
+        self.detector.apply(matcher, 1.0, False, [self.make_comment("1", "It looks like it")])
+        self.detector.save_memo()
+        detector = QuoteNLPDetector(self.quotes, memo_size=10, memo_path=self.path)
+        comment = self.make_comment("2", "It looks like it")
+        detector.apply(matcher, 1.0, False, [comment])
+        self.assertEqual(detector.comment_memo.hits, 1)
+        self.assertEqual(detector.get_matches(comment)[0].quote, self.quotes[1])
+
+
+class MatchingNLPCommentsInParallel(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.quotes = [
+            Quote("I has a long dream", "Jimmy", []),
+            Quote("Is this really the end. It looks like it.", "", []),
+        ]
+        self.detector = QuoteParallelNLPDetector(self.quotes, workers=2, cache_directory=self.directory.name)
+
+    def tearDown(self):
+        self.detector.close()
+        self.directory.cleanup()
+
+    def make_comments(self) -> List[Comment]:
+        comments = []
+        for index, body in enumerate(["I has a long dream.", "It looks like it", "I don't know", "I woke up. I has a long dream."]):
+            comment = Comment()
+            comment.uid = str(index)
+            comment.body = body
+            comments.append(comment)
+        return comments
+
+    def test_matches_identical_to_serial(self):
+        matcher = QuoteCommentNLPMatcher(0.5, 2, bonus_coeff=0)
+        serial = QuoteNLPDetector(self.quotes, cache_directory=self.directory.name)
+        comments = self.make_comments()
+        serial.apply(matcher, 0.5, False, comments)
+        self.detector.apply(matcher, 0.5, False, comments)
+        for comment in comments:
+            expected = serial.get_matches(comment)
+            matches = self.detector.get_matches(comment)
+            self.assertEqual([m.quote for m in matches], [m.quote for m in expected])
+            self.assertEqual([m.score for m in matches], [m.score for m in expected])
+        self.assertEqual(self.detector.scored_pairs, serial.scored_pairs)
+
+    def test_single_comment(self):
+        matcher = QuoteCommentNLPMatcher(0.5, 2, bonus_coeff=0)
+        comments = self.make_comments()[1:2]
+        self.detector.apply(matcher, 1.0, False, comments)
+        matches = self.detector.get_matches(comments[0])
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(matches[0].quote, self.quotes[1])
+
+    def test_model_not_loaded(self):
+        self.detector.apply(QuoteCommentNLPMatcher(0.5, 2, bonus_coeff=0), 0.5, False, self.make_comments())
+        self.assertNotIn("nlp", vars(self.detector))
+        self.assertNotIn("quote_matrix", vars(self.detector))
+        # Loaded when used directly.
+        self.assertEqual(len(self.detector.parse(["I has a long dream."])), 1)
+        self.assertIn("nlp", vars(self.detector))
+
+    def test_memoised_sentences_sent_to_workers(self):
+        self.detector.close()
+        self.detector = QuoteParallelNLPDetector(self.quotes, workers=2, cache_directory=self.directory.name, memo_size=10)
+        comments = self.make_comments()
+        self.detector.apply(QuoteCommentNLPMatcher(0.5, 2, bonus_coeff=0), 0.5, False, comments)
+        entry = self.detector.comment_memo.get("It looks like it")
+        self.assertIsNotNone(entry.sentences)
+        # Given the sentences of another body, so the match shows they were scored rather than the body parsed again.
+        entry.sentences = self.detector.comment_memo.get("I has a long dream.").sentences
+        comment = Comment()
+        comment.uid = "repeated"
+        comment.body = "It looks like it"
+        self.detector.apply(QuoteCommentNLPMatcher(0.5, 1, bonus_coeff=0), 0.5, False, [comment])
+        self.assertEqual([m.quote for m in self.detector.get_matches(comment)], [self.quotes[0]])
@@ -0,0 +1,83 @@
+import unittest
+import tempfile
+import os
+import numpy as np
+from redditquotebot.quotes import Quote
+from redditquotebot.nlp import CleanedSentence, QuoteEmbeddingCache
+import spacy
+
+
+class GeneratingKeys(unittest.TestCase):
+    def setUp(self):
+        self.nlp = spacy.blank("en")
+        self.quotes = [Quote("I had a dream", "", []), Quote("Short", "", [])]
+
+    def test_same_inputs(self):
+        key = QuoteEmbeddingCache.key(self.quotes, self.nlp.meta, "rules")
+        self.assertEqual(key, QuoteEmbeddingCache.key(list(self.quotes), self.nlp.meta, "rules"))
+
+    def test_quotes_changed(self):
+        key = QuoteEmbeddingCache.key(self.quotes, self.nlp.meta, "rules")
+        self.assertNotEqual(key, QuoteEmbeddingCache.key(self.quotes[0:1], self.nlp.meta, "rules"))
+
+    def test_cleaning_rules_changed(self):
+        key = QuoteEmbeddingCache.key(self.quotes, self.nlp.meta, "rules")
+        self.assertNotEqual(key, QuoteEmbeddingCache.key(self.quotes, self.nlp.meta, "other rules"))
+
+    def test_model_changed(self):
+        key = QuoteEmbeddingCache.key(self.quotes, self.nlp.meta, "rules")
+        self.nlp.meta["version"] = "9.9.9"
+        self.assertNotEqual(key, QuoteEmbeddingCache.key(self.quotes, self.nlp.meta, "rules"))
+
+
+class StoringAndLoading(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = QuoteEmbeddingCache(os.path.join(self.directory.name, "cache"))
+        self.quotes = [
+            [
+                CleanedSentence.from_vector("had dream", 2, np.array([1, 2, 3], dtype=np.float32)),
+                CleanedSentence.from_vector("", 0, np.zeros(3, dtype=np.float32)),
+            ],
+            [],
+            [CleanedSentence.from_vector("short", 1, np.array([0, 1, 0], dtype=np.float32))],
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_missing_entry(self):
+        self.assertIsNone(self.cache.load("a" * 64, 3))
+
+    def test_round_trip(self):
+        self.cache.store("a" * 64, self.quotes)
+        loaded = self.cache.load("a" * 64, 3)
+        self.assertEqual([len(q) for q in loaded], [2, 0, 1])
+        self.assertEqual(loaded[0][0].text, "had dream")
+        self.assertEqual(len(loaded[0][0]), 2)
+        self.assertEqual(list(loaded[0][0].vector), [1, 2, 3])
+        self.assertAlmostEqual(loaded[0][0].vector_norm, self.quotes[0][0].vector_norm)
+        self.assertEqual(len(loaded[0][1]), 0)
+        self.assertEqual(loaded[2][0].text, "short")
+
+    def test_vectors_share_one_array(self):
+        self.cache.store("a" * 64, self.quotes)
+        loaded = self.cache.load("a" * 64, 3)
+        self.assertNotIsInstance(loaded[0][0].vector, np.memmap)
+        self.assertIs(loaded[0][0].vector.base, loaded[2][0].vector.base)
+
+    def test_quote_count_changed(self):
+        self.cache.store("a" * 64, self.quotes)
+        self.assertIsNone(self.cache.load("a" * 64, 2))
+
+    def test_stale_entries_removed(self):
+        self.cache.store("a" * 64, self.quotes)
+        self.cache.store("b" * 64, self.quotes)
+        self.assertIsNone(self.cache.load("a" * 64, 3))
+        self.assertIsNotNone(self.cache.load("b" * 64, 3))
+        self.assertEqual(len(os.listdir(self.cache.directory)), 3)
+
+    def test_interrupted_store_ignored(self):
+        self.cache.store("a" * 64, self.quotes)
+        os.remove(os.path.join(self.cache.directory, "a" * 64 + "_sentences.json"))
+        self.assertIsNone(self.cache.load("a" * 64, 3))
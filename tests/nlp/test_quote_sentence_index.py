@@ -0,0 +1,53 @@
+import unittest
+import numpy as np
+from redditquotebot.nlp import CleanedSentence, QuoteSentenceMatrix, QuoteSentenceIndex
+
+
+def sentence(vector) -> CleanedSentence:
+    return CleanedSentence.from_vector("text", 1, np.array(vector, dtype=np.float32))
+
+
+class IndexingSentences(unittest.TestCase):
+    def setUp(self):
+        generator = np.random.default_rng(1)
+        self.vectors = generator.normal(size=(200, 8)).astype(np.float32)
+        self.quotes = [[sentence(v) for v in self.vectors[i:i + 2]] for i in range(0, 200, 2)]
+        self.quotes.append([CleanedSentence.from_vector("", 0, np.zeros(8, dtype=np.float32))])
+        self.matrix = QuoteSentenceMatrix(self.quotes)
+        self.index = QuoteSentenceIndex(self.matrix, 10)
+
+    def test_every_valid_sentence_indexed(self):
+        self.assertEqual(len(self.index.offsets), 11)
+        self.assertEqual(sorted(self.index.rows), list(range(200)))
+
+    def test_exact_sentence_found(self):
+        vector = self.vectors[42] / np.linalg.norm(self.vectors[42])
+        self.assertEqual(self.index.search(vector, 1, 5)[0], 42)
+        self.assertEqual(self.index.exhaustive_search(vector, 5)[0], 42)
+
+    def test_all_lists_probed_matches_exhaustive(self):
+        queries = [sentence(v) for v in np.random.default_rng(2).normal(size=(20, 8))]
+        self.assertEqual(self.index.recall(queries, 10, 5), 1.0)
+
+    def test_recall_between_zero_and_one(self):
+        queries = [sentence(v) for v in np.random.default_rng(2).normal(size=(20, 8))]
+        recall = self.index.recall(queries, 1, 5)
+        self.assertGreaterEqual(recall, 0)
+        self.assertLessEqual(recall, 1)
+
+    def test_candidate_quotes(self):
+        candidates = self.index.candidate_quotes([sentence(self.vectors[42]), sentence(self.vectors[7])], 10, 1)
+        self.assertEqual(list(candidates), [3, 21])
+
+    def test_empty_sentences_ignored(self):
+        candidates = self.index.candidate_quotes([CleanedSentence.from_vector("", 0, np.zeros(8, dtype=np.float32))], 10, 1)
+        self.assertEqual(len(candidates), 0)
+
+    def test_more_lists_than_sentences(self):
+        index = QuoteSentenceIndex(QuoteSentenceMatrix(self.quotes[0:2]), 10)
+        self.assertEqual(len(index.centroids), 4)
+        self.assertEqual(sorted(index.rows), [0, 1, 2, 3])
+
+    def test_no_sentences(self):
+        index = QuoteSentenceIndex(QuoteSentenceMatrix([]), 10)
+        self.assertEqual(len(index.candidate_quotes([sentence(self.vectors[0])], 1, 1)), 0)
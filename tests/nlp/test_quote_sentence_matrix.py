@@ -0,0 +1,119 @@
+import unittest
+from redditquotebot.nlp import QuoteCommentNLPMatcher, QuoteSentenceMatrix
+import numpy as np
+import spacy
+
+nlp = spacy.load("en_core_web_md")
+
+
+class BuildingMatrix(unittest.TestCase):
+
+    def test_sentence_attributes(self):
+        matrix = QuoteSentenceMatrix([[nlp("I had a dream"), nlp("short")], [nlp("")]])
+        self.assertEqual(len(matrix), 2)
+        self.assertEqual(list(matrix.sentence_counts), [2, 1])
+        self.assertEqual(list(matrix.word_counts), [4, 1, 1])
+        self.assertEqual(list(matrix.lengths), [13, 5, 0])
+        self.assertEqual(list(matrix.valid), [True, True, False])
+
+    def test_no_quotes(self):
+        matrix = QuoteSentenceMatrix([])
+        matcher = QuoteCommentNLPMatcher(quote_comment_delta=0, minimum_sentence_word_length=0)
+        self.assertEqual(len(matrix.scores([nlp("I had a dream")], matcher)), 0)
+
+
+class ScoringAgainstMatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.quotes = [
+            [nlp("I had a dream")],
+            [nlp("I had a dream"), nlp("short")],
+            [nlp("")],
+            [nlp("Is this really the end"), nlp("It looks like it")],
+            [nlp("Nothing in life is to be feared"), nlp("it is only to be understood"), nlp("now is the time")],
+        ]
+        self.comments = [
+            [nlp("I had a dream")],
+            [nlp("I has a dream"), nlp("Another sentence which doesn't match")],
+            [nlp("it looks like the end"), nlp("is this really it")],
+            [nlp("")],
+            [],
+        ]
+        self.matrix = QuoteSentenceMatrix(self.quotes)
+
+    def assert_scores_match(self, matcher: QuoteCommentNLPMatcher):
+        for comment in self.comments:
+            scores = self.matrix.scores(comment, matcher)
+            for index, quote in enumerate(self.quotes):
+                matcher.compare(comment, quote)
+                self.assertAlmostEqual(scores[index], matcher.score(), places=6)
+
+    def test_default_parameters(self):
+        self.assert_scores_match(QuoteCommentNLPMatcher(quote_comment_delta=0.5, minimum_sentence_word_length=2))
+
+    def test_length_delta(self):
+        self.assert_scores_match(QuoteCommentNLPMatcher(quote_comment_delta=0.9, minimum_sentence_word_length=1))
+
+    def test_length_bonus(self):
+        self.assert_scores_match(QuoteCommentNLPMatcher(
+            quote_comment_delta=0.5, minimum_sentence_word_length=2, bonus_coeff=0.01, bonus_start=2, bonus_end=4))
+
+    def test_multiple_sentence_requirement(self):
+        self.assert_scores_match(QuoteCommentNLPMatcher(
+            quote_comment_delta=0.2, minimum_sentence_word_length=1, match_sentence_coeff=0.5))
+        self.assert_scores_match(QuoteCommentNLPMatcher(
+            quote_comment_delta=0.2, minimum_sentence_word_length=1, match_sentence_coeff=1))
+
+    def test_perfect_match(self):
+        matcher = QuoteCommentNLPMatcher(quote_comment_delta=0.9, minimum_sentence_word_length=3)
+        scores = self.matrix.scores(self.comments[0], matcher)
+        self.assertEqual(scores[0], 1.0)
+
+    def test_length_window(self):
+        rows = self.matrix.length_window(len("I had a dream"), 0.5)
+        self.assertEqual(sorted(self.matrix.lengths[rows]), [13, 13, 15, 16, 22])
+        rows = self.matrix.length_window(len("I had a dream"), 0)
+        self.assertEqual(len(rows), 8)
+
+    def test_scoring_subset(self):
+        matcher = QuoteCommentNLPMatcher(quote_comment_delta=0.5, minimum_sentence_word_length=2)
+        scores = self.matrix.scores(self.comments[0], matcher, np.array([1, 3]))
+        self.assertEqual(list(scores[[0, 2, 4]]), [0, 0, 0])
+        self.assertEqual(scores[1], self.matrix.scores(self.comments[0], matcher)[1])
+
+    def assert_bounds_hold(self, matcher: QuoteCommentNLPMatcher):
+        for comment in self.comments:
+            scores = self.matrix.scores(comment, matcher)
+            bounds = self.matrix.upper_bounds(comment, matcher)
+            for score, bound in zip(scores, bounds):
+                self.assertGreaterEqual(bound, score)
+
+    def test_upper_bounds(self):
+        self.assert_bounds_hold(QuoteCommentNLPMatcher(quote_comment_delta=0.5, minimum_sentence_word_length=2))
+        self.assert_bounds_hold(QuoteCommentNLPMatcher(
+            quote_comment_delta=0.2, minimum_sentence_word_length=1, match_sentence_coeff=0.5, bonus_coeff=0.01, bonus_start=2, bonus_end=4))
+
+    def test_upper_bounds_few_dimensions(self):
+        self.matrix = QuoteSentenceMatrix(self.quotes, bound_dimensions=2)
+        self.assert_bounds_hold(QuoteCommentNLPMatcher(quote_comment_delta=0.2, minimum_sentence_word_length=1))
+
+    def test_similarities(self):
+        similarities = self.matrix.similarities(self.comments[0][0])
+        self.assertEqual(len(similarities), len(self.matrix.vectors) + 1)
+        self.assertEqual(similarities[0], 1.0)
+        self.assertAlmostEqual(similarities[self.matrix.slots[3, 0]], self.comments[0][0].similarity(self.quotes[3][0]), places=6)
+        self.assertEqual(list(similarities[self.matrix.slots[2]]), [0, 0, 0])
+        self.assertEqual(list(self.matrix.similarities(self.comments[3][0])), [0] * len(similarities))
+
+    def test_scores_independent_of_subset(self):
+        # Spans several blocks, so subsets multiply different numbers of rows.
+        self.matrix = QuoteSentenceMatrix(self.quotes * 20)
+        matcher = QuoteCommentNLPMatcher(quote_comment_delta=0.2, minimum_sentence_word_length=1)
+        for comment in self.comments[1:3]:
+            scores = self.matrix.scores(comment, matcher)
+            for quotes in [np.array([3]), np.array([1, 3, 4, 38, 49]), np.arange(0, 100, 7)]:
+                subset = self.matrix.scores(comment, matcher, quotes)
+                self.assertEqual(list(subset[quotes]), list(scores[quotes]))
+            similarities = self.matrix.similarities(comment[0])
+            rows = np.flatnonzero(self.matrix.valid)[::-3]
+            self.assertEqual(list(self.matrix._similarity(comment[0], rows)), list(similarities[rows]))
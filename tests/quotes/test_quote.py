@@ -22,6 +22,15 @@ class TestingEquality(unittest.TestCase):
         self.assertNotEqual(quote1, quote2)
 
 
+class TestingContentIds(unittest.TestCase):
+
+    def test_equal_contents_equal_ids(self):
+        self.assertEqual(Quote("body", "ben", ["nice"]).content_id(), Quote("body", "ben", ["nice"]).content_id())
+
+    def test_different_contents_different_ids(self):
+        self.assertNotEqual(Quote("body", "ben", ["nice"]).content_id(), Quote("body", "ben", ["good"]).content_id())
+
+
 class TestingUsingDictionaries(unittest.TestCase):
 
     def test_quote_from_dictionary(self):
@@ -0,0 +1,233 @@
+from praw.models import MoreComments
+from redditquotebot.reddit import Reddit
+from redditquotebot.utilities import Configuration, CredentialStore, ScrapeState
+import unittest
+
+
+class FakeComment():
+    def __init__(self, uid: str, utc: float, replies: list = None):
+        self.id = uid
+        self.fullname = f"t1_{uid}"
+        self.created_utc = utc
+        self.body = f"comment {uid}"
+        self.edited = False
+        self.subreddit_name_prefixed = "r/test"
+        self.permalink = f"/r/test/comments/{uid}"
+        self.score = 1
+        self.author = None
+        self.replies = [] if replies is None else replies
+
+
+class FakeCommentForest():
+    def __init__(self, comments: list, more: list):
+        self._comments = comments
+        self._more = more
+        self.fetches = 0
+
+    def replace_more(self, limit: int) -> list:
+        self.fetches += 1
+        return list(self._more)
+
+    def list(self) -> list:
+        found = []
+        queue = list(self._comments)
+        while len(queue):
+            comment = queue.pop(0)
+            found.append(comment)
+            queue.extend(comment.replies)
+        return found
+
+
+class FakeSubmission():
+    def __init__(self, uid: str, num_comments: int, comments: list, more: list = None):
+        self.id = uid
+        self.fullname = f"t3_{uid}"
+        self.num_comments = num_comments
+        self.comment_sort = "confidence"
+        self.comments = FakeCommentForest(comments, [] if more is None else more)
+
+
+class FakeSubreddit():
+    def __init__(self, comments: list, submissions: list = None):
+        self._comments = comments
+        self.submissions = [] if submissions is None else submissions
+        self.limits = []
+        self.listed = 0
+
+    def new(self, limit: int) -> list:
+        return self.submissions[0:limit]
+
+    def comments(self, limit: int):
+        # Counts the comments taken from the listing, as praw requests further pages lazily.
+        self.limits.append(limit)
+        for comment in self._comments[0:limit]:
+            self.listed += 1
+            yield comment
+
+
+class FakePraw():
+    def __init__(self, subreddit: FakeSubreddit, children: dict = None):
+        self._subreddit = subreddit
+        # The items loaded by each MoreComments, keyed by its children.
+        self.children = {} if children is None else children
+        self.expanded = []
+
+    def subreddit(self, name: str) -> FakeSubreddit:
+        return self._subreddit
+
+    def submission(self, id: str) -> FakeSubmission:
+        return [submission for submission in self._subreddit.submissions if submission.id == id][0]
+
+    def post(self, path: str, data: dict) -> list:
+        # Expands a MoreComments, each expansion being one request.
+        self.expanded.append((data["link_id"], data["children"]))
+        return list(self.children[data["children"]])
+
+
+def more_comments(praw: FakePraw, children: list, parent_id: str) -> MoreComments:
+    return MoreComments(praw, {"children": children, "count": len(children), "parent_id": parent_id})
+
+
+class GettingNewComments(unittest.TestCase):
+    def setUp(self):
+        self.configuration = Configuration()
+        self.configuration.reddit.max_comments_per_request = 100
+        self.listing = FakeSubreddit([FakeComment("d", 40), FakeComment("c", 30), FakeComment("b", 20), FakeComment("a", 10)])
+        self.reddit = Reddit(self.configuration, CredentialStore())
+        self.reddit._reddit = FakePraw(self.listing)
+
+    def test_first_run_without_cursor(self):
+        comments = self.reddit.get_new_comments("test", None, 0)
+        self.assertEqual([comment.uid for comment in comments], ["d", "c", "b", "a"])
+        self.assertEqual([comment.utc for comment in comments], [40, 30, 20, 10])
+        self.assertEqual(comments[0].url, "https://reddit.com/r/test/comments/d")
+        self.assertEqual(comments[0].author, "unknown")
+        self.assertEqual(self.listing.limits, [100])
+
+    def test_stops_at_cursor_fullname(self):
+        comments = self.reddit.get_new_comments("test", "t1_c", 30)
+        self.assertEqual([comment.uid for comment in comments], ["d"])
+        # Older pages of the listing aren't requested.
+        self.assertEqual(self.listing.listed, 2)
+
+    def test_stops_at_older_comment(self):
+        # The cursor's comment was removed from the listing, so its creation time is used instead.
+        comments = self.reddit.get_new_comments("test", "t1_removed", 25)
+        self.assertEqual([comment.uid for comment in comments], ["d", "c"])
+        self.assertEqual(self.listing.listed, 3)
+
+    def test_nothing_new(self):
+        self.assertEqual(self.reddit.get_new_comments("test", "t1_d", 40), [])
+        self.assertEqual(self.listing.listed, 1)
+
+    def test_limited_by_max_comments(self):
+        self.configuration.reddit.max_comments_per_request = 2
+        comments = self.reddit.get_new_comments("test", None, 0)
+        self.assertEqual([comment.uid for comment in comments], ["d", "c"])
+        self.assertEqual(self.listing.limits, [2])
+
+
+class GettingIncrementalComments(unittest.TestCase):
+    def setUp(self):
+        self.configuration = Configuration()
+        self.configuration.reddit.max_comments_per_request = 100
+        self.configuration.reddit.new_submissions_per_request = 10
+        self.subreddit = FakeSubreddit([])
+        self.praw = FakePraw(self.subreddit)
+        self.reddit = Reddit(self.configuration, CredentialStore())
+        self.reddit._reddit = self.praw
+        self.scrape_state = ScrapeState()
+
+    def crawl(self) -> list:
+        return sorted([comment.uid for comment in self.reddit.get_incremental_comments("test", self.scrape_state)])
+
+    def test_first_crawl(self):
+        more = more_comments(self.praw, ["c"], "t3_s1")
+        self.praw.children["c"] = [FakeComment("c", 30)]
+        self.subreddit.submissions = [FakeSubmission("s1", 3, [FakeComment("a", 10, [FakeComment("b", 20)])], [more])]
+        self.assertEqual(self.crawl(), ["a", "b", "c"])
+        self.assertEqual(self.praw.expanded, [("t3_s1", "c")])
+        self.assertEqual(self.scrape_state.submission_state("test", "s1"),
+                         {"num_comments": 3, "watermark": 30, "latest_utc": 30, "pending": []})
+
+    def test_unchanged_submission_skipped(self):
+        submission = FakeSubmission("s1", 1, [FakeComment("a", 10)])
+        self.subreddit.submissions = [submission]
+        self.assertEqual(self.crawl(), ["a"])
+        self.assertEqual(self.crawl(), [])
+        self.assertEqual(submission.comments.fetches, 1)
+
+    def test_changed_submission_returns_newer_comments(self):
+        submission = FakeSubmission("s1", 1, [FakeComment("a", 10)])
+        self.subreddit.submissions = [submission]
+        self.crawl()
+        submission.num_comments = 2
+        submission.comments._comments.append(FakeComment("b", 20))
+        self.assertEqual(self.crawl(), ["b"])
+        self.assertEqual(submission.comments.fetches, 2)
+        self.assertEqual(self.scrape_state.submission_state("test", "s1")["watermark"], 20)
+
+    def test_budget_carried_to_next_crawl(self):
+        self.configuration.reddit.more_comments_budget = 1
+        self.praw.children["c,d"] = [FakeComment("c", 30), FakeComment("d", 40), more_comments(self.praw, ["f", "g"], "t1_d")]
+        self.praw.children["e"] = [FakeComment("e", 50)]
+        self.praw.children["f,g"] = [FakeComment("f", 15), FakeComment("g", 60)]
+        more = [more_comments(self.praw, ["e"], "t3_s1"), more_comments(self.praw, ["c", "d"], "t3_s1")]
+        submission = FakeSubmission("s1", 7, [FakeComment("a", 10)], more)
+        self.subreddit.submissions = [submission]
+
+        # The largest MoreComments is expanded first, the rest are stored.
+        self.assertEqual(self.crawl(), ["a", "c", "d"])
+        state = self.scrape_state.submission_state("test", "s1")
+        self.assertEqual(sorted([(more["children"], more["parent_id"]) for more in state["pending"]]),
+                         [(["e"], "t3_s1"), (["f", "g"], "t1_d")])
+        self.assertEqual((state["watermark"], state["latest_utc"]), (0, 40))
+        self.assertEqual(self.scrape_state.pending_submissions("test"), ["s1"])
+
+        # Pending expansions continue first, and the submission isn't fetched again while they remain.
+        self.assertEqual(self.crawl(), ["f", "g"])
+        self.assertEqual(submission.comments.fetches, 1)
+        state = self.scrape_state.submission_state("test", "s1")
+        self.assertEqual((state["watermark"], state["latest_utc"]), (0, 60))
+
+        self.assertEqual(self.crawl(), ["e"])
+        self.assertEqual(self.praw.expanded, [("t3_s1", "c,d"), ("t3_s1", "f,g"), ("t3_s1", "e")])
+        state = self.scrape_state.submission_state("test", "s1")
+        self.assertEqual(state, {"num_comments": 7, "watermark": 60, "latest_utc": 60, "pending": []})
+        self.assertEqual(self.scrape_state.pending_submissions("test"), [])
+
+    def test_restoring_more_comments(self):
+        submission = FakeSubmission("s1", 2, [])
+        stored = {"children": ["a", "b"], "count": 2, "parent_id": "t1_x"}
+        more = self.reddit._restore_more_comments(submission, stored)
+        self.assertIsInstance(more, MoreComments)
+        self.assertEqual((more.children, more.count, more.parent_id), (["a", "b"], 2, "t1_x"))
+        self.assertIs(more.submission, submission)
+        self.assertEqual(stored, {"children": ["a", "b"], "count": 2, "parent_id": "t1_x"})
+
+    def test_comments_below_watermark_dropped(self):
+        self.scrape_state.update_submission_state("test", "s1", 1, 25, [])
+        self.subreddit.submissions = [FakeSubmission("s1", 3, [FakeComment("a", 10), FakeComment("b", 25), FakeComment("c", 30)])]
+        self.assertEqual(self.crawl(), ["c"])
+        self.assertEqual(self.scrape_state.submission_state("test", "s1")["watermark"], 30)
+
+    def test_old_submissions_pruned(self):
+        self.configuration.reddit.more_comments_budget = 0
+        self.subreddit.submissions = [
+            FakeSubmission("s1", 1, [FakeComment("a", 10)]),
+            FakeSubmission("s2", 2, [FakeComment("b", 20)], [more_comments(self.praw, ["c"], "t3_s2")]),
+            FakeSubmission("s3", 1, [FakeComment("d", 30)])
+        ]
+        self.crawl()
+        self.configuration.reddit.new_submissions_per_request = 1
+        self.crawl()
+        # s2 has expansions pending, so is kept even though it is no longer among the newest.
+        self.assertEqual(sorted(self.scrape_state.submissions["test"]), ["s1", "s2"])
+
+    def test_max_comments_stops_visiting_submissions(self):
+        self.configuration.reddit.max_comments_per_request = 1
+        second = FakeSubmission("s2", 1, [FakeComment("b", 20)])
+        self.subreddit.submissions = [FakeSubmission("s1", 1, [FakeComment("a", 10)]), second]
+        self.assertEqual(self.crawl(), ["a"])
+        self.assertEqual(second.comments.fetches, 0)
+        self.assertIsNone(self.scrape_state.submission_state("test", "s2"))
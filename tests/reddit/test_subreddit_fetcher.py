@@ -0,0 +1,60 @@
+from redditquotebot.reddit import SubredditFetcher
+import threading
+import time
+import unittest
+
+
+class FakeReddit():
+    def __init__(self):
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def worker(self):
+        return self
+
+    def connect(self):
+        with self.lock:
+            self.connections += 1
+
+
+class FetchingSubreddits(unittest.TestCase):
+    def setUp(self):
+        self.reddit = FakeReddit()
+        self.fetcher = SubredditFetcher(self.reddit, 3)
+
+    def tearDown(self):
+        self.fetcher.close()
+
+    def test_results_keyed_by_subreddit(self):
+        results = self.fetcher.fetch(["a", "b", "c"], lambda reddit, subreddit: subreddit.upper())
+        self.assertEqual(results, {"a": "A", "b": "B", "c": "C"})
+
+    def test_exceptions_returned(self):
+        def fetch(reddit, subreddit):
+            if subreddit == "b":
+                raise RuntimeError("failed")
+            return subreddit
+        results = self.fetcher.fetch(["a", "b"], fetch)
+        self.assertEqual(results["a"], "a")
+        self.assertIsInstance(results["b"], RuntimeError)
+
+    def test_fetched_concurrently(self):
+        running = [0, 0]
+        lock = threading.Lock()
+
+        def fetch(reddit, subreddit):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+
+        self.fetcher.fetch([str(i) for i in range(9)], fetch)
+        self.assertGreater(running[1], 1)
+        self.assertLessEqual(running[1], 3)
+
+    def test_threads_connect_once(self):
+        for _ in range(3):
+            self.fetcher.fetch([str(i) for i in range(6)], lambda reddit, subreddit: time.sleep(0.01))
+        self.assertLessEqual(self.reddit.connections, 3)
@@ -1,10 +1,12 @@
 import unittest
+import tempfile
+import os
 from unittest.mock import patch
-from redditquotebot.backtesting import combine_records, Backtester
-from redditquotebot.utilities import RecordKeeper, RecordLoader
+from redditquotebot.backtesting import combine_records, Backtester, RecordCombiner, RecordMerger, SentencePairs
+from redditquotebot.utilities import RecordKeeper, RecordLoader, RecordStorer
 from redditquotebot.reddit import Comment, Reply
 from redditquotebot.quotes import Quote
-from redditquotebot.nlp import MatchedQuote, QuoteDetector, QuoteCommentLengthMatcher
+from redditquotebot.nlp import MatchedQuote, QuoteDetector, QuoteCommentLengthMatcher, QuoteCommentNLPMatcher, QuoteNLPDetector
 
 
 class CombiningRecords(unittest.TestCase):
@@ -87,6 +89,72 @@ class CombiningRecords(unittest.TestCase):
         combined = combine_records([record1, record2]).logged_replies()
         self.assertEqual(len(combined), len(self.replies))
 
+    def test_duplicates_within_a_record(self):
+        record = RecordKeeper()
+        record.log_comments(self.comments[0:5] + self.comments[0:5])
+        combined = combine_records([record]).logged_comments()
+        self.assertEqual([c.uid for c in combined], [c.uid for c in self.comments[0:5]])
+
+    def test_combine_from_generator(self):
+        def records():
+            for i in range(0, 10, 5):
+                record = RecordKeeper()
+                record.log_comments(self.comments[i:i + 6])
+                yield record
+        combined = combine_records(records()).logged_comments()
+        self.assertEqual(len(combined), len(self.comments))
+
+    def test_combiner_counts_new_entries(self):
+        record1 = RecordKeeper()
+        record2 = RecordKeeper()
+        record1.log_comments(self.comments[0:6])
+        record2.log_comments(self.comments[4::])
+        record2.log_reply(self.replies[0:2])
+        combiner = RecordCombiner(["comments"])
+        self.assertEqual(combiner.add(record1), {"comments": 6})
+        self.assertEqual(combiner.add(record2), {"comments": 4})
+        self.assertEqual(len(combiner.records.logged_comments()), len(self.comments))
+        self.assertEqual(len(combiner.records.logged_replies()), 0)
+
+
+class MergingRecords(unittest.TestCase):
+    def setUp(self):
+        self.comments = []
+        for i in range(20):
+            c = Comment()
+            c.uid = f"{i:02}"
+            c.utc = (i * 7) % 20
+            self.comments.append(c.to_dict())
+
+    def merged(self, merger: RecordMerger, entries: list) -> list:
+        return [entry for _, entry in merger.merge(("comments", e) for e in entries)]
+
+    def test_sorted_in_memory(self):
+        merger = RecordMerger()
+        merged = self.merged(merger, self.comments + self.comments[0:5])
+        self.assertEqual(merged, sorted(self.comments, key=lambda c: c["utc"]))
+        self.assertEqual(merger.runs_spilled, 0)
+
+    def test_spilled_runs(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        merger = RecordMerger(memory_budget=1, directory=directory.name)
+        merged = self.merged(merger, self.comments[10:] + self.comments + self.comments[0:10])
+        self.assertEqual(merged, sorted(self.comments, key=lambda c: c["utc"]))
+        self.assertEqual(merger.runs_spilled, 40)
+        self.assertEqual(os.listdir(directory.name), [])
+
+    def test_merge_passes(self):
+        merger = RecordMerger(memory_budget=1, fan_in=3)
+        merged = self.merged(merger, self.comments + self.comments)
+        self.assertEqual(merged, sorted(self.comments, key=lambda c: c["utc"]))
+        self.assertGreater(merger.runs_spilled, 40)
+
+    def test_sections_kept_apart(self):
+        match = MatchedQuote(Comment.from_dict(self.comments[0]), Quote("a", "b", []), 0.5).to_dict()
+        merged = list(RecordMerger(memory_budget=1).merge([("matches", match), ("comments", self.comments[0]), ("matches", match)]))
+        self.assertEqual(merged, [("comments", self.comments[0]), ("matches", match)])
+
 
 class BasicBacktesting(unittest.TestCase):
 
@@ -101,6 +169,30 @@ class BasicBacktesting(unittest.TestCase):
         self.matcher = QuoteCommentLengthMatcher()
         self.backtester = Backtester(self.quotes, QuoteDetector)
 
+    def test_closing_detector(self):
+        with patch.object(QuoteDetector, "close") as close:
+            with Backtester(self.quotes, QuoteDetector) as backtester:
+                backtester.set_parameters(self.matcher, 0.8, 1, False)
+                backtester.get_matches(self.comments)
+                close.assert_not_called()
+        close.assert_called_once_with()
+
+    def test_iterating_matches(self):
+        self.backtester.set_parameters(self.matcher, 0.8, 1, False)
+        batches = list(self.backtester.iter_matches(self.comments * 3, batch_size=2))
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+
+    def test_comments_from_file(self):
+        records = RecordKeeper()
+        records.log_comments(self.comments)
+        records.log_matched_quote(MatchedQuote(self.comments[0], self.quotes[0], 0.9))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "records.json")
+            with open(path, "w", encoding="utf-8") as handler:
+                RecordStorer.to_json(handler, records)
+            self.assertEqual([c.body for c in Backtester.get_comments(path)], ["123456789"])
+            self.assertEqual([c.body for c in Backtester.get_comments(path, "matches")], ["123456789"])
+
     def test_no_matches(self):
         self.backtester.set_parameters(self.matcher, 1, 1, False)
         matches = self.backtester.get_matches(self.comments)
@@ -116,3 +208,79 @@ class BasicBacktesting(unittest.TestCase):
         matches = self.backtester.get_matches(self.comments)
         self.assertEqual(len(matches), 1)
         self.assertEqual(len(matches[0]), 2)
+
+    def test_parameter_grid(self):
+        grid = Backtester.parameter_grid(threshold=[0.5, 0.8], store_count=[1])
+        self.assertEqual(grid, [{"threshold": 0.5, "store_count": 1}, {"threshold": 0.8, "store_count": 1}])
+
+    def test_sweep_requires_nlp(self):
+        self.backtester.set_parameters(self.matcher, 0.8, 1, False)
+        self.assertRaises(TypeError, self.backtester.sweep, self.comments, [{"threshold": 0.8}])
+
+
+class SweepingParameters(unittest.TestCase):
+
+    def setUp(self):
+        self.quotes = [
+            Quote("I has a long dream", "Jimmy", []),
+            Quote("Is this really the end. It looks like it.", "", []),
+            Quote("Nothing in life is to be feared, it is only to be understood.", "", []),
+        ]
+        self.comments = []
+        for body in ["I had a long dream. Jimmy", "I don't know", "It looks like it", "Is this the end? Nothing is to be feared."]:
+            comment = Comment()
+            comment.body = body
+            comment.uid = body
+            self.comments.append(comment)
+        self.backtester = Backtester(self.quotes, QuoteNLPDetector)
+        self.backtester.set_parameters(QuoteCommentNLPMatcher(0.5, 2), 0.8, 1, False)
+        self.grid = Backtester.parameter_grid(
+            quote_comment_delta=[0.2, 0.5], minimum_sentence_word_length=[1, 2], bonus_coeff=[0, 0.02],
+            match_sentence_coeff=[0, 0.5], threshold=[0.6, 0.9], store_count=[1, 2])
+
+    def assert_sweep_matches(self):
+        results = self.backtester.sweep(self.comments, self.grid)
+        best_matches = self.backtester.sweep_best_matches(self.comments, self.grid)
+        self.assertEqual(len(results), len(self.grid))
+        for parameters, result, best in zip(self.grid, results, best_matches):
+            threshold = parameters.pop("threshold")
+            store_count = parameters.pop("store_count")
+            self.backtester.set_parameters(QuoteCommentNLPMatcher(**parameters), threshold, store_count, self.backtester._filter_author)
+            matches = self.backtester.get_matches([Comment.from_dict(c.to_dict()) for c in self.comments])
+            scores = [m.score for comment_matches in matches for m in comment_matches]
+            self.assertEqual(result["comments"], len(matches))
+            self.assertEqual(result["matches"], len(scores))
+            # Only the order the scores are summed in differs.
+            self.assertAlmostEqual(result["mean_score"], sum(scores) / len(scores) if len(scores) else 0.0, places=12)
+            expected = {comment_matches[0].comment.uid: comment_matches[0] for comment_matches in matches if len(comment_matches)}
+            for comment, match in zip(self.comments, best):
+                if comment.uid in expected:
+                    self.assertIs(match.quote, expected[comment.uid].quote)
+                    self.assertEqual(match.score, expected[comment.uid].score)
+                else:
+                    self.assertIsNone(match)
+
+    def test_sweep_identical_to_matching(self):
+        self.assert_sweep_matches()
+
+    def test_sweep_with_author_filter(self):
+        self.backtester.set_parameters(QuoteCommentNLPMatcher(0.5, 2), 0.8, 1, True)
+        self.assert_sweep_matches()
+
+    def test_defaults_from_parameters(self):
+        results = self.backtester.sweep(self.comments, [{"threshold": 0.9}])
+        self.assertEqual(results[0]["quote_comment_delta"], 0.5)
+        self.assertEqual(results[0]["store_count"], 1)
+        self.assertEqual(results[0]["threshold"], 0.9)
+
+    def test_unreachable_quotes_dropped(self):
+        grid = [dict(parameters, threshold=0.99, bonus_start=6, bonus_end=10) for parameters in self.grid]
+        pairs = SentencePairs(self.backtester.detector, self.comments, grid)
+        self.assertLess(len(pairs), len(self.comments) * len(self.quotes))
+
+    def test_threshold_above_zero(self):
+        self.assertRaises(ValueError, self.backtester.sweep, self.comments, [{"threshold": 0}])
+
+    def test_sweep_in_parallel(self):
+        results = self.backtester.sweep(self.comments, self.grid, processes=2)
+        self.assertEqual(results, self.backtester.sweep(self.comments, self.grid))
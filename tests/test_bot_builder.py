@@ -1,9 +1,11 @@
 import unittest
+import tempfile
+import os
 from unittest.mock import patch
 from redditquotebot import BotBuilder
 from redditquotebot.nlp import QuoteCommentLengthMatcher, QuoteNLPDetector
 from redditquotebot.quotes import QuoteDB
-from redditquotebot.utilities import CredentialStore, Configuration
+from redditquotebot.utilities import CredentialStore, Configuration, RecordJournal, RecordKeeper, RecordLoader, RecordStorer, SQLiteRecordKeeper
 from redditquotebot.reddit import Reddit
 
 
@@ -98,6 +100,11 @@ class SettingQuoteDetector(unittest.TestCase):
         builder.quote_detector(QuoteNLPDetector)
         self.assertEqual(builder._quote_detector_instance, QuoteNLPDetector)
 
+    def test_detector_arguments(self):
+        builder = BotBuilder()
+        builder.quote_detector(QuoteNLPDetector, batch_size=8, n_process=2)
+        self.assertEqual(builder._quote_detector_arguments, {"batch_size": 8, "n_process": 2})
+
 
 class SettingRecoredKeeping(unittest.TestCase):
 
@@ -115,6 +122,92 @@ class SettingRecoredKeeping(unittest.TestCase):
         bot = builder._bot
         self.assertEqual(bot.ram_based_records, True)
 
+    def testJournalStorage(self):
+        configuration = Configuration()
+        configuration.records.storage = "journal"
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "records.json")
+            builder = BotBuilder()
+            builder.configuration(configuration)
+            builder.credentials(CredentialStore())
+            builder.scrape_state(None)
+            builder.recored_keeper(path)
+            bot = builder.bot()
+            records = bot._load_records()
+            records.add_banned_subreddit("test")
+            bot._save_records(records)
+            self.assertIs(bot._load_records(), records)
+            self.assertTrue(os.path.exists(RecordJournal.journal_path(path)))
+
+    def testSQLiteRecords(self):
+        configuration = Configuration()
+        configuration.records.storage = "sqlite"
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "records.sqlite")
+            builder = BotBuilder()
+            builder.configuration(configuration)
+            builder.credentials(CredentialStore())
+            builder.scrape_state(None)
+            builder.recored_keeper(path)
+            bot = builder.bot()
+            records = bot._load_records()
+            self.assertIsInstance(records, SQLiteRecordKeeper)
+            records.add_banned_subreddit("test")
+            bot._save_records(records)
+            self.assertEqual(bot._load_records().banned_subreddits(), ["test"])
+            self.assertFalse(os.path.exists(RecordJournal.journal_path(path)))
+
+    def testSQLiteRecordsMigrateJSON(self):
+        configuration = Configuration()
+        configuration.records.storage = "sqlite"
+        with tempfile.TemporaryDirectory() as directory:
+            existing = RecordKeeper()
+            existing.add_banned_subreddit("test")
+            with open(os.path.join(directory, "records.json"), "w") as handler:
+                RecordStorer.to_json(handler, (existing,))
+            path = os.path.join(directory, "records.sqlite")
+            builder = BotBuilder()
+            builder.configuration(configuration)
+            builder.credentials(CredentialStore())
+            builder.scrape_state(None)
+            builder.recored_keeper(path)
+            bot = builder.bot()
+            records = bot._load_records()
+            self.assertIsInstance(records, SQLiteRecordKeeper)
+            self.assertEqual(records.banned_subreddits(), ["test"])
+            records.close()
+
+    def testResidentState(self):
+        configuration = Configuration()
+        configuration.bot.resident_state = True
+        configuration.bot.flush_after_changes = 2
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "records.json")
+            builder = BotBuilder()
+            builder.configuration(configuration)
+            builder.credentials(CredentialStore())
+            builder.scrape_state(os.path.join(directory, "scrape_state.json"))
+            builder.recored_keeper(path)
+            bot = builder.bot()
+            records = bot._load_records()
+            self.assertIs(bot._load_records(), records)
+            self.assertIs(bot._load_scrape_state(), bot._load_scrape_state())
+            records.add_banned_subreddit("test")
+            bot._save_records(records)
+            with open(path, "r", encoding="utf-8") as handler:
+                self.assertEqual(RecordLoader.from_json(handler).banned_subreddits(), [])
+            bot._flush_state()
+            with open(path, "r", encoding="utf-8") as handler:
+                self.assertEqual(RecordLoader.from_json(handler).banned_subreddits(), ["test"])
+
+    def testUnknownStorage(self):
+        configuration = Configuration()
+        configuration.records.storage = "unknown"
+        builder = BotBuilder()
+        builder.configuration(configuration)
+        builder.credentials(CredentialStore())
+        self.assertRaises(ValueError, builder.bot)
+
 
 class SettingScrapeState(unittest.TestCase):
 
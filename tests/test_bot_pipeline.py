@@ -0,0 +1,191 @@
+import os
+import signal
+import threading
+import time
+import unittest
+from typing import Callable
+from unittest.mock import patch
+from redditquotebot import BotBuilder
+from redditquotebot.bot_pipeline import BotPipeline, _LockedRecords
+from redditquotebot.nlp import QuoteDetector, QuoteCommentLengthMatcher
+from redditquotebot.quotes import Quote, QuoteDB
+from redditquotebot.reddit import Comment
+from redditquotebot.utilities import Configuration, CredentialStore, RecordKeeper
+
+
+class FakeReddit():
+    # Returns one new comment per fetch, and checks a subreddit is never fetched twice at once.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fetches = {}
+        self.fetching = set()
+        self.overlapping = []
+
+    def worker(self) -> "FakeReddit":
+        return self
+
+    def connect(self):
+        pass
+
+    def fetch_count(self) -> int:
+        with self.lock:
+            return sum(self.fetches.values())
+
+    def get_comments(self, subreddit: str) -> list:
+        with self.lock:
+            if subreddit in self.fetching:
+                self.overlapping.append(subreddit)
+            self.fetching.add(subreddit)
+            count = self.fetches[subreddit] = self.fetches.get(subreddit, 0) + 1
+        time.sleep(0.001)
+        comment = Comment()
+        comment.uid = f"{subreddit}-{count}"
+        comment.utc = count
+        comment.subreddit = subreddit
+        comment.body = "comment"
+        comment.author = "author"
+        with self.lock:
+            self.fetching.discard(subreddit)
+        return [comment]
+
+    def get_user_comments(self, username: str) -> list:
+        return []
+
+
+class FakeDetector(QuoteDetector):
+    # Records the comments matched, in order, and can be held or made to fail.
+    def __init__(self, quotes: list):
+        super().__init__(quotes)
+        self.matched = []
+        self.release = threading.Event()
+        self.release.set()
+        self.failure = None
+
+    def apply(self, matcher, score_threshold: float, filter_author: bool, comments: list):
+        self.release.wait()
+        if self.failure is not None:
+            raise self.failure
+        self.matched += [comment.uid for comment in comments]
+        super().apply(matcher, score_threshold, filter_author, comments)
+
+
+class RunningPipeline(unittest.TestCase):
+    def setUp(self):
+        self.old_handler = signal.getsignal(signal.SIGTERM)
+        configuration = Configuration()
+        configuration.reddit.subreddits = ["a", "b", "c"]
+        configuration.reddit.minimum_comment_length = 0
+        configuration.records.maximum_comment_count = None
+        configuration.nlp.discard_comments_with_author = False
+        builder = BotBuilder()
+        builder.configuration(configuration)
+        builder.credentials(CredentialStore())
+        builder.quotes(QuoteDB([Quote("comment", "", [])]))
+        builder.scrape_state(None)
+        builder.recored_keeper(None)
+        builder.quote_matcher(QuoteCommentLengthMatcher(), 0.5)
+        builder.quote_detector(FakeDetector)
+        self.bot = builder.bot()
+        self.reddit = FakeReddit()
+        self.bot.reddit = self.reddit
+        self.saves = []
+        self.bot._save_records = lambda records: self.saves.append("records")
+        self.bot._save_scrape_state = lambda scrape_state: self.saves.append("scrape_state")
+        self.bot._flush_state = lambda: self.saves.append("flush")
+        self.bot.close = lambda: self.saves.append("close")
+
+    def tearDown(self):
+        self.bot.detector.release.set()
+        signal.signal(signal.SIGTERM, self.old_handler)
+
+    def interrupt_when(self, condition: Callable[[], bool], timeout: float = 5):
+        # Interrupts the main thread, running the pipeline, once the condition holds.
+        def wait():
+            end = time.time() + timeout
+            while not condition() and time.time() < end:
+                time.sleep(0.005)
+            os.kill(os.getpid(), signal.SIGINT)
+        thread = threading.Thread(target=wait, daemon=True)
+        thread.start()
+        return thread
+
+    def test_ordered_per_subreddit(self):
+        pipeline = BotPipeline(self.bot, fetch_workers=3, queue_size=2)
+        self.interrupt_when(lambda: self.reddit.fetch_count() >= 30)
+        self.assertRaises(SystemExit, pipeline.run)
+        self.assertEqual(self.reddit.overlapping, [])
+        for subreddit in self.bot.configuration.reddit.subreddits:
+            matched = [uid for uid in self.bot.detector.matched if uid.startswith(f"{subreddit}-")]
+            self.assertEqual(matched, [f"{subreddit}-{n}" for n in range(1, self.reddit.fetches[subreddit] + 1)])
+
+    def test_bounded_queues_hold_back_fetching(self):
+        self.bot.configuration.reddit.subreddits = [f"s{i}" for i in range(10)]
+        self.bot.detector.release.clear()
+        pipeline = BotPipeline(self.bot, fetch_workers=1, queue_size=1)
+
+        def check():
+            # One fetch is being matched, one waits in the fetched queue, and one is held by the fetch thread.
+            end = time.time() + 5
+            while self.reddit.fetch_count() < 3 and time.time() < end:
+                time.sleep(0.005)
+            time.sleep(0.2)
+            self.held_fetches = self.reddit.fetch_count()
+            self.held_queue = pipeline._to_fetch.qsize()
+            self.bot.detector.release.set()
+        threading.Thread(target=check, daemon=True).start()
+        self.interrupt_when(lambda: len(self.bot.detector.matched) >= 12)
+        self.assertRaises(SystemExit, pipeline.run)
+        self.assertEqual(self.held_fetches, 3)
+        self.assertEqual(self.held_queue, 1)
+
+    def test_work_in_progress_saved_on_interrupt(self):
+        pipeline = BotPipeline(self.bot, fetch_workers=2, queue_size=2)
+        self.interrupt_when(lambda: self.reddit.fetch_count() >= 6)
+        self.assertRaises(SystemExit, pipeline.run)
+        # Every fetch dispatched before the interrupt is matched and recorded.
+        self.assertEqual(len(pipeline.records.logged_comments()), self.reddit.fetch_count())
+        self.assertEqual(sorted(self.bot.detector.matched), sorted([c.uid for c in pipeline.records.logged_comments()]))
+        self.assertEqual(self.saves[-4:], ["records", "scrape_state", "flush", "close"])
+        self.assertEqual(self.saves.count("flush"), 1)
+
+    def test_cleaning_once_every_subreddit_polled(self):
+        cleaned = []
+        self.bot.clean_own_comments = lambda records: cleaned.append(sorted(self.bot.detector.matched))
+        pipeline = BotPipeline(self.bot, fetch_workers=1, queue_size=1)
+        self.interrupt_when(lambda: len(cleaned) >= 2)
+        self.assertRaises(SystemExit, pipeline.run)
+        self.assertGreaterEqual(len(cleaned), 2)
+        # Cleaning waits for every subreddit, while matching may have run ahead of it.
+        self.assertLessEqual({"a-1", "b-1", "c-1"}, set(cleaned[0]))
+
+    def test_failing_stage_reaches_shutdown(self):
+        self.bot.detector.failure = RuntimeError("failed")
+        pipeline = BotPipeline(self.bot, fetch_workers=2, queue_size=2)
+        with self.assertLogs("redditquotebot.bot_pipeline", level="ERROR"):
+            self.assertRaises(RuntimeError, pipeline.run)
+        self.assertEqual(self.saves[-4:], ["records", "scrape_state", "flush", "close"])
+
+    def test_failing_main_thread_saves(self):
+        pipeline = BotPipeline(self.bot, fetch_workers=1, queue_size=1)
+        with patch.object(pipeline, "_next_subreddits", side_effect=RuntimeError("failed")):
+            self.assertRaises(RuntimeError, pipeline.run)
+        self.assertEqual(self.saves[-4:], ["records", "scrape_state", "flush", "close"])
+
+
+class LockingRecords(unittest.TestCase):
+    def test_calls_hold_lock(self):
+        lock = threading.RLock()
+        records = RecordKeeper()
+        locked = _LockedRecords(records, lock)
+        held = []
+        records.banned_subreddits = lambda: held.append(lock._is_owned()) or []
+        locked.banned_subreddits()
+        self.assertEqual(held, [True])
+
+    def test_attributes_passed_through(self):
+        records = RecordKeeper()
+        records.marker = "value"
+        locked = _LockedRecords(records, threading.RLock())
+        self.assertEqual(locked.marker, "value")
+        locked.add_banned_subreddit("banned")
+        self.assertEqual(records.banned_subreddits(), ["banned"])
@@ -0,0 +1,142 @@
+import unittest
+import tempfile
+import os
+import json
+from io import StringIO
+import numpy as np
+from redditquotebot.evaluation import LabelLoader, LabelStorer, LabeledSet, Evaluator
+from redditquotebot.backtesting import Backtester
+from redditquotebot.utilities import RecordKeeper, RecordStorer
+from redditquotebot.reddit import Comment
+from redditquotebot.quotes import Quote
+from redditquotebot.nlp import MatchedQuote, QuoteDetector, QuoteCommentLengthMatcher, QuoteCommentNLPMatcher, QuoteNLPDetector
+
+
+def make_comment(uid: str, body: str) -> Comment:
+    comment = Comment()
+    comment.uid = uid
+    comment.body = body
+    return comment
+
+
+class StoringLabels(unittest.TestCase):
+
+    def test_labels_round_trip(self):
+        labels = {"a": "1234", "b": None}
+        outfile = StringIO()
+        LabelStorer.to_csv(outfile, labels, {"a": "a comment, with a comma"})
+        outfile.seek(0)
+        self.assertEqual(LabelLoader.from_csv(outfile), labels)
+
+    def test_bad_headings(self):
+        infile = StringIO("uid,quote\na,1234\n")
+        self.assertRaises(KeyError, LabelLoader.from_csv, infile)
+
+    def test_empty_file(self):
+        self.assertRaises(KeyError, LabelLoader.from_csv, StringIO(""))
+
+
+class BuildingLabeledSets(unittest.TestCase):
+
+    def setUp(self):
+        self.quote = Quote("1234567890", "", [])
+        self.comments = [make_comment("a", "123456789"), make_comment("b", "12"), make_comment("c", "1")]
+        records = RecordKeeper()
+        records.log_comments(self.comments)
+        records.log_matched_quote([MatchedQuote(self.comments[0], self.quote, 0.9), MatchedQuote(self.comments[0], Quote("1", "", []), 0.1)])
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "records.json")
+        with open(self.path, "w", encoding="utf-8") as handler:
+            RecordStorer.to_json(handler, records)
+
+    def test_from_records(self):
+        labeled = LabeledSet.from_records(self.path, {"b": None, "a": self.quote.content_id()})
+        self.assertEqual([c.uid for c in labeled.comments], ["b", "a"])
+        self.assertEqual(labeled.expected, [None, self.quote.content_id()])
+        self.assertEqual(labeled.positives(), 1)
+
+    def test_missing_comment(self):
+        self.assertRaises(KeyError, LabeledSet.from_records, self.path, {"d": None})
+
+    def test_label_count(self):
+        self.assertRaises(ValueError, LabeledSet, self.comments, [None])
+
+    def test_draft_labels(self):
+        labels, descriptions = LabeledSet.draft_labels(self.path)
+        self.assertEqual(labels, {"a": self.quote.content_id()})
+        self.assertIn("1234567890", descriptions["a"])
+
+
+class EvaluatingMatches(unittest.TestCase):
+
+    def setUp(self):
+        self.quotes = [Quote("1234567890", "", []), Quote("12345", "", [])]
+        self.comments = [
+            make_comment("a", "123456789"),
+            make_comment("b", "1234"),
+            make_comment("c", "12345678"),
+            make_comment("d", "1"),
+        ]
+        expected = [self.quotes[0].content_id(), self.quotes[0].content_id(), None, None]
+        self.evaluator = Evaluator(LabeledSet(self.comments, expected), thresholds=[0.5, 0.85, 0.95])
+
+    def test_metrics(self):
+        predicted = [self.quotes[0].content_id(), self.quotes[1].content_id(), self.quotes[0].content_id(), None]
+        metrics = self.evaluator.metrics(predicted, np.array([0.9, 0.8, 0.6, 0]), np.array([0.5, 0.7, 0.85, 0.95]))
+        self.assertEqual(list(metrics["true_positives"]), [1, 1, 1, 0])
+        self.assertEqual(list(metrics["false_positives"]), [2, 1, 0, 0])
+        self.assertEqual(list(metrics["false_negatives"]), [1, 1, 1, 2])
+        np.testing.assert_allclose(metrics["precision"], [1 / 3, 0.5, 1, 1])
+        np.testing.assert_allclose(metrics["recall"], [0.5, 0.5, 0.5, 0])
+        np.testing.assert_allclose(metrics["f1"], [0.4, 0.5, 2 / 3, 0])
+
+    def test_evaluate_backtester(self):
+        backtester = Backtester(self.quotes, QuoteDetector)
+        backtester.set_parameters(QuoteCommentLengthMatcher(), 0.5, 1, False)
+        report = self.evaluator.evaluate(backtester, "length")
+        self.assertEqual(report["name"], "length")
+        self.assertEqual(report["parameters"]["matcher"], "QuoteCommentLengthMatcher")
+        self.assertEqual(report["parameters"]["threshold"], 0.5)
+        # a and c match the long quote, b the short quote.
+        self.assertEqual((report["true_positives"], report["false_positives"], report["false_negatives"]), (1, 2, 1))
+        self.assertEqual(report["curve"]["thresholds"], [0.5, 0.85, 0.95])
+        self.assertEqual(report["curve"]["precision"], [0.3333, 1.0, 1.0])
+        self.assertEqual(report["curve"]["recall"], [0.5, 0.5, 0.0])
+        self.assertEqual(report["best_threshold"], 0.85)
+        self.assertEqual(report["best_f1"], 0.6667)
+        self.assertIn("comments_per_second", report)
+        self.assertEqual([c.body for c in self.comments], ["123456789", "1234", "12345678", "1"])
+
+    def test_reports_written_as_lines(self):
+        backtester = Backtester(self.quotes, QuoteDetector)
+        backtester.set_parameters(QuoteCommentLengthMatcher(), 0.9, 1, False)
+        outfile = StringIO()
+        Evaluator.to_jsonl(outfile, [self.evaluator.evaluate(backtester, "first"), self.evaluator.evaluate(backtester, "second")])
+        lines = outfile.getvalue().splitlines()
+        self.assertEqual([json.loads(line)["name"] for line in lines], ["first", "second"])
+        self.assertEqual(json.loads(lines[0])["curve"]["thresholds"], [0.95])
+
+
+class EvaluatingSweeps(unittest.TestCase):
+
+    def setUp(self):
+        self.quotes = [
+            Quote("I has a long dream", "Jimmy", []),
+            Quote("Is this really the end. It looks like it.", "", []),
+        ]
+        comments = [make_comment("a", "I had a long dream"), make_comment("b", "It looks like it"), make_comment("c", "I don't know")]
+        expected = [self.quotes[0].content_id(), self.quotes[1].content_id(), None]
+        self.evaluator = Evaluator(LabeledSet(comments, expected))
+        self.backtester = Backtester(self.quotes, QuoteNLPDetector)
+        self.backtester.set_parameters(QuoteCommentNLPMatcher(0.5, 2), 0.8, 1, False)
+
+    def test_sweep_reports_match_evaluate(self):
+        grid = Backtester.parameter_grid(quote_comment_delta=[0.2, 0.5], threshold=[0.5, 0.8])
+        reports = self.evaluator.evaluate_sweep(self.backtester, grid, "sweep")
+        self.assertEqual([report["name"] for report in reports], ["sweep0", "sweep1", "sweep2", "sweep3"])
+        for parameters, report in zip(grid, reports):
+            self.backtester.set_parameters(QuoteCommentNLPMatcher(parameters["quote_comment_delta"], 2), parameters["threshold"], 1, False)
+            expected = self.evaluator.evaluate(self.backtester)
+            for key in ["true_positives", "false_positives", "false_negatives", "curve"]:
+                self.assertEqual(report[key], expected[key])
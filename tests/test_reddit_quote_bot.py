@@ -1,4 +1,5 @@
 from distutils.cmd import Command
+import signal
 import unittest
 from unittest.mock import patch
 from redditquotebot import BotBuilder
@@ -6,7 +7,7 @@ from redditquotebot.nlp import MatchedQuote, QuoteDetector
 from redditquotebot.reddit import Reddit
 from redditquotebot.utilities import CredentialStore, Configuration, RecordKeeper, ScrapeState
 from redditquotebot import BotBuilder
-from redditquotebot.reddit import Reddit, Comment, Reply
+from redditquotebot.reddit import Reddit, Comment, Reply, SubredditFetcher
 from redditquotebot.quotes import QuoteLoader, Quote, QuoteDB
 from redditquotebot.nlp import QuoteCommentLengthMatcher
 
@@ -103,3 +104,113 @@ class ReplyingToComments(unittest.TestCase):
         replies = self.bot.reply_to_comments([], 0.85, self.records)
         self.assertEqual(len(replies), 0)
         self.assertEqual(len(self.records.logged_replies()), 0)
+
+
+class GettingLatestComments(unittest.TestCase):
+    def setUp(self):
+        self.records = RecordKeeper()
+        self.scrape_state = ScrapeState()
+        self.configuration = Configuration()
+        self.configuration.reddit.minimum_comment_length = 0
+        builder = BotBuilder()
+        builder.configuration(self.configuration)
+        builder.credentials(CredentialStore())
+        builder.scrape_state(None)
+        builder.recored_keeper(None)
+        self.bot = builder.bot()
+        self.comments = []
+        for uid, utc in [("c", 30), ("b", 20), ("a", 10)]:
+            comment = Comment()
+            comment.uid = uid
+            comment.utc = utc
+            comment.body = f"comment {uid}"
+            comment.author = "author"
+            self.comments.append(comment)
+
+    def test_comment_listing_updates_cursor(self):
+        self.configuration.reddit.ingestion_mode = "comments"
+        self.scrape_state.update_latest_subreddit_fullname("test", "t1_z")
+        with patch.object(Reddit, "get_new_comments", return_value=self.comments) as get_new_comments:
+            comments = self.bot.get_latest_comments("test", self.scrape_state, self.records)
+        get_new_comments.assert_called_once_with("test", "t1_z", 0)
+        self.assertEqual(len(comments), 3)
+        self.assertEqual(self.scrape_state.latest_subreddit_fullname("test"), "t1_c")
+        self.assertEqual(self.scrape_state.latest_subreddit_utc("test"), 30)
+
+    def test_submissions_used_by_default(self):
+        with patch.object(Reddit, "get_comments", return_value=self.comments) as get_comments:
+            comments = self.bot.get_latest_comments("test", self.scrape_state, self.records)
+        get_comments.assert_called_once_with("test")
+        self.assertEqual(len(comments), 3)
+        self.assertEqual(self.scrape_state.latest_subreddit_fullname("test"), None)
+
+    def test_incremental_submissions_ignore_subreddit_utc(self):
+        self.configuration.reddit.ingestion_mode = "incremental_submissions"
+        self.scrape_state.update_latest_subreddit_utc("test", 25)
+        with patch.object(Reddit, "get_incremental_comments", return_value=self.comments) as get_incremental_comments:
+            comments = self.bot.get_latest_comments("test", self.scrape_state, self.records)
+        get_incremental_comments.assert_called_once_with("test", self.scrape_state)
+        self.assertEqual(len(comments), 3)
+        self.assertEqual(self.scrape_state.latest_subreddit_utc("test"), 30)
+
+    def test_unknown_mode(self):
+        self.configuration.reddit.ingestion_mode = "unknown"
+        self.assertRaises(ValueError, self.bot.get_latest_comments, "test", self.scrape_state, self.records)
+
+
+class ClosingBot(unittest.TestCase):
+    def setUp(self):
+        builder = BotBuilder()
+        builder.configuration(Configuration())
+        builder.credentials(CredentialStore())
+        builder.scrape_state(None)
+        builder.recored_keeper(None)
+        builder.quote_detector(QuoteDetector)
+        self.bot = builder.bot()
+
+    def test_close_stops_detector_and_fetcher(self):
+        self.bot.fetcher = SubredditFetcher(self.bot.reddit, 2)
+        with patch.object(QuoteDetector, "close") as close_detector, patch.object(SubredditFetcher, "close") as close_fetcher:
+            self.bot.close()
+        close_detector.assert_called_once_with()
+        close_fetcher.assert_called_once_with()
+        self.assertIsNone(self.bot.fetcher)
+
+    def test_close_without_fetcher(self):
+        with patch.object(QuoteDetector, "close") as close_detector:
+            self.bot.close()
+        close_detector.assert_called_once_with()
+
+
+class StoppingBot(unittest.TestCase):
+    def setUp(self):
+        self.old_handler = signal.getsignal(signal.SIGTERM)
+        builder = BotBuilder()
+        builder.configuration(Configuration())
+        builder.credentials(CredentialStore())
+        builder.scrape_state(None)
+        builder.recored_keeper(None)
+        builder.quote_detector(QuoteDetector)
+        self.bot = builder.bot()
+
+    def tearDown(self):
+        signal.signal(signal.SIGTERM, self.old_handler)
+
+    def test_state_flushed_on_interrupt(self):
+        with patch.object(self.bot, "_load_scrape_state", side_effect=KeyboardInterrupt), \
+                patch.object(self.bot, "_flush_state") as flush, patch.object(self.bot, "close") as close:
+            self.assertRaises(SystemExit, self.bot.start)
+        flush.assert_called_once_with()
+        close.assert_called_once_with()
+
+    def test_state_flushed_on_unexpected_exception(self):
+        with patch.object(self.bot, "_load_scrape_state", side_effect=RuntimeError("failed")), \
+                patch.object(self.bot, "_flush_state") as flush, patch.object(self.bot, "close") as close:
+            self.assertRaises(RuntimeError, self.bot.start)
+        flush.assert_called_once_with()
+        close.assert_called_once_with()
+
+    def test_termination_handled_as_interrupt(self):
+        with patch.object(self.bot, "_load_scrape_state", side_effect=KeyboardInterrupt), patch.object(self.bot, "close"):
+            self.assertRaises(SystemExit, self.bot.start)
+        self.assertIs(signal.getsignal(signal.SIGTERM), signal.default_int_handler)
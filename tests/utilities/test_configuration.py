@@ -30,6 +30,49 @@ class LoadingCredentialsFromJson(unittest.TestCase):
         infile.seek(0)
         self.assertRaises(KeyError, ConfigurationLoader.from_json, infile)
 
+    def test_optional_keys_missing(self):
+        config = Configuration().to_dict()
+        del config["reddit"]["ingestion_mode"]
+        del config["reddit"]["more_comments_budget"]
+        del config["reddit"]["fetch_workers"]
+        del config["bot"]["adaptive_schedule"]
+        del config["bot"]["pipeline"]
+        del config["bot"]["resident_state"]
+        del config["records"]["storage"]
+        del config["nlp"]["pipe_batch_size"]
+        del config["nlp"]["pipe_processes"]
+        del config["nlp"]["reparse_cleaned_sentences"]
+        del config["nlp"]["index_lists"]
+        del config["nlp"]["prune_below_threshold"]
+        del config["nlp"]["detector_workers"]
+        del config["nlp"]["comment_memo_size"]
+
+        infile = StringIO()
+        json.dump(config, infile, indent=2)
+        infile.seek(0)
+
+        store = ConfigurationLoader.from_json(infile)
+        self.assertEqual(store.reddit.ingestion_mode, "submissions")
+        self.assertEqual(store.reddit.more_comments_budget, None)
+        self.assertEqual(store.reddit.fetch_workers, 1)
+        self.assertEqual(store.reddit.requests_per_minute, 100)
+        self.assertEqual(store.bot.adaptive_schedule, False)
+        self.assertEqual(store.bot.minimum_poll_interval, 60)
+        self.assertEqual(store.bot.pipeline, False)
+        self.assertEqual(store.bot.pipeline_queue_size, 4)
+        self.assertEqual(store.bot.resident_state, False)
+        self.assertEqual(store.bot.flush_interval, 60)
+        self.assertEqual(store.bot.flush_after_changes, 20)
+        self.assertEqual(store.records.storage, "json")
+        self.assertEqual(store.records.compact_after, 1000)
+        self.assertEqual(store.nlp.pipe_batch_size, 64)
+        self.assertEqual(store.nlp.pipe_processes, 1)
+        self.assertEqual(store.nlp.reparse_cleaned_sentences, True)
+        self.assertEqual(store.nlp.index_lists, None)
+        self.assertEqual(store.nlp.prune_below_threshold, True)
+        self.assertEqual(store.nlp.detector_workers, 1)
+        self.assertEqual(store.nlp.comment_memo_size, 0)
+
     def test_json_decode_error(self):
         infile = StringIO()
         infile.write('I"m not it json format')
@@ -69,11 +112,24 @@ class CheckAllCredential(unittest.TestCase):
         config.reddit.new_submissions_per_request = 5
         config.reddit.max_comments_per_request = 100
         config.reddit.minimum_comment_length = 200
+        config.reddit.ingestion_mode = "comments"
+        config.reddit.more_comments_budget = 20
+        config.reddit.fetch_workers = 8
+        config.reddit.requests_per_minute = None
         config.bot.reply_to_comments = True
         config.bot.matched_quotes_to_log = 1
         config.bot.reply_threshold = 0.1
         config.bot.remove_own_comments = False
         config.bot.remove_comment_threshold = -10
+        config.bot.adaptive_schedule = True
+        config.bot.minimum_poll_interval = 5
+        config.bot.maximum_poll_interval = 50
+        config.bot.target_comments_per_poll = 20
+        config.bot.pipeline = True
+        config.bot.pipeline_queue_size = 2
+        config.bot.resident_state = True
+        config.bot.flush_interval = 5
+        config.bot.flush_after_changes = 3
         config.nlp.match_store_threshold = 0.2
         config.nlp.quote_comment_length_delta = 0.1
         config.nlp.minimum_comment_sentence_word_length = 2
@@ -82,10 +138,22 @@ class CheckAllCredential(unittest.TestCase):
         config.nlp.quote_length_bonus_end = 20
         config.nlp.matched_sentence_coefficient = 1
         config.nlp.discard_comments_with_author = False
+        config.nlp.pipe_batch_size = 16
+        config.nlp.pipe_processes = 2
+        config.nlp.reparse_cleaned_sentences = False
+        config.nlp.index_lists = 16
+        config.nlp.index_probes = 4
+        config.nlp.index_candidates = 10
+        config.nlp.prune_below_threshold = False
+        config.nlp.detector_workers = 4
+        config.nlp.comment_memo_size = 100
+        config.nlp.comment_memo_ttl = 60
         config.records.maximum_comment_count = 0
         config.records.maximum_match_count = None
         config.records.maximum_reply_count = 100
         config.records.maximum_removed_comment_count = 8
+        config.records.storage = "journal"
+        config.records.compact_after = 10
 
         outfile = StringIO()
         ConfigurationGenerator.to_json(outfile, config)
@@ -95,12 +163,25 @@ class CheckAllCredential(unittest.TestCase):
         self.assertEqual(loaded.reddit.subreddits, ["test"])
         self.assertEqual(loaded.reddit.new_submissions_per_request, 5)
         self.assertEqual(loaded.reddit.max_comments_per_request, 100)
+        self.assertEqual(loaded.reddit.ingestion_mode, "comments")
+        self.assertEqual(loaded.reddit.more_comments_budget, 20)
+        self.assertEqual(loaded.reddit.fetch_workers, 8)
+        self.assertEqual(loaded.reddit.requests_per_minute, None)
         self.assertEqual(loaded.reddit.minimum_comment_length, 200)
         self.assertEqual(loaded.bot.reply_to_comments, True)
         self.assertEqual(loaded.bot.reply_threshold, 0.1)
         self.assertEqual(loaded.bot.matched_quotes_to_log, 1)
         self.assertEqual(loaded.bot.remove_own_comments, False)
         self.assertEqual(loaded.bot.remove_comment_threshold, -10)
+        self.assertEqual(loaded.bot.adaptive_schedule, True)
+        self.assertEqual(loaded.bot.minimum_poll_interval, 5)
+        self.assertEqual(loaded.bot.maximum_poll_interval, 50)
+        self.assertEqual(loaded.bot.target_comments_per_poll, 20)
+        self.assertEqual(loaded.bot.pipeline, True)
+        self.assertEqual(loaded.bot.pipeline_queue_size, 2)
+        self.assertEqual(loaded.bot.resident_state, True)
+        self.assertEqual(loaded.bot.flush_interval, 5)
+        self.assertEqual(loaded.bot.flush_after_changes, 3)
         self.assertEqual(loaded.nlp.match_store_threshold, 0.2)
         self.assertEqual(loaded.nlp.quote_comment_length_delta, 0.1)
         self.assertEqual(loaded.nlp.minimum_comment_sentence_word_length, 2)
@@ -109,7 +190,19 @@ class CheckAllCredential(unittest.TestCase):
         self.assertEqual(loaded.nlp.quote_length_bonus_end, 20)
         self.assertEqual(loaded.nlp.matched_sentence_coefficient, 1)
         self.assertEqual(loaded.nlp.discard_comments_with_author, False)
+        self.assertEqual(loaded.nlp.pipe_batch_size, 16)
+        self.assertEqual(loaded.nlp.pipe_processes, 2)
+        self.assertEqual(loaded.nlp.reparse_cleaned_sentences, False)
+        self.assertEqual(loaded.nlp.index_lists, 16)
+        self.assertEqual(loaded.nlp.index_probes, 4)
+        self.assertEqual(loaded.nlp.index_candidates, 10)
+        self.assertEqual(loaded.nlp.prune_below_threshold, False)
+        self.assertEqual(loaded.nlp.detector_workers, 4)
+        self.assertEqual(loaded.nlp.comment_memo_size, 100)
+        self.assertEqual(loaded.nlp.comment_memo_ttl, 60)
         self.assertEqual(loaded.records.maximum_comment_count, 0)
         self.assertEqual(loaded.records.maximum_match_count, None)
         self.assertEqual(loaded.records.maximum_reply_count, 100)
         self.assertEqual(loaded.records.maximum_removed_comment_count, 8)
+        self.assertEqual(loaded.records.storage, "journal")
+        self.assertEqual(loaded.records.compact_after, 10)
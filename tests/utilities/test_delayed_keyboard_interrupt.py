@@ -0,0 +1,32 @@
+from redditquotebot.utilities import DelayedKeyboardInterrupt
+import os
+import signal
+import unittest
+
+
+class DelayingInterrupts(unittest.TestCase):
+    def setUp(self):
+        self.old_handler = signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    def tearDown(self):
+        signal.signal(signal.SIGTERM, self.old_handler)
+
+    def assert_delayed(self, sig: int):
+        finished = False
+        with self.assertRaises(KeyboardInterrupt):
+            with DelayedKeyboardInterrupt():
+                os.kill(os.getpid(), sig)
+                finished = True
+        self.assertTrue(finished)
+
+    def test_keyboard_interrupt_delayed(self):
+        self.assert_delayed(signal.SIGINT)
+
+    def test_termination_delayed(self):
+        self.assert_delayed(signal.SIGTERM)
+
+    def test_handlers_restored(self):
+        with DelayedKeyboardInterrupt():
+            pass
+        self.assertIs(signal.getsignal(signal.SIGINT), signal.default_int_handler)
+        self.assertIs(signal.getsignal(signal.SIGTERM), signal.default_int_handler)
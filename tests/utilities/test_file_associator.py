@@ -19,6 +19,10 @@ class GettingFileAssociations(unittest.TestCase):
         file_type = self.fa.resolve_file_type("test.csv")
         self.assertEqual(file_type, FileTypes.CSV)
 
+    def testSQLiteFiletype(self):
+        file_type = self.fa.resolve_file_type("test.sqlite")
+        self.assertEqual(file_type, FileTypes.SQLITE)
+
     def testUnknownFiletype(self):
         self.assertRaises(LookupError, self.fa.resolve_file_type, "test.unknownextension")
 
@@ -57,3 +61,21 @@ class OpenFileHandler(unittest.TestCase):
 
         open_mock.assert_called_with("test.json", "w", encoding="utf-8")
         self.assertEqual(self.open_count, 1)
+
+    def testPathFileTypeRead(self):
+        fa = FileAssociator({
+            FileTypes.SQLITE: lambda path: path
+        })
+        open_mock = mock_open()
+        with patch("builtins.open", open_mock, create=False):
+            self.assertEqual(fa.read("test.sqlite"), "test.sqlite")
+        open_mock.assert_not_called()
+
+    def testPathFileTypeWrite(self):
+        fa = FileAssociator({
+            FileTypes.SQLITE: lambda path, args: (path, args)
+        })
+        open_mock = mock_open()
+        with patch("builtins.open", open_mock, create=True):
+            self.assertEqual(fa.write("test.sqlite", 1), ("test.sqlite", (1,)))
+        open_mock.assert_not_called()
@@ -0,0 +1,84 @@
+from redditquotebot.utilities import PollScheduler, ScrapeState
+import unittest
+
+
+class FakeClock():
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+class SchedulingPolls(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scrape_state = ScrapeState()
+        self.scheduler = PollScheduler(["busy", "quiet"], 10, 1000, 50, clock=self.clock)
+        self.scheduler.load(self.scrape_state)
+
+    def test_unpolled_subreddits_due(self):
+        self.assertEqual(sorted(self.scheduler.due()), ["busy", "quiet"])
+        self.assertEqual(self.scheduler.due(), [])
+
+    def test_first_poll_uses_minimum_interval(self):
+        self.scheduler.due()
+        self.scheduler.record_poll(self.scrape_state, "busy", 100, 0)
+        self.assertEqual(self.scrape_state.subreddit_schedule("busy")["next_poll"], 1010)
+
+    def test_interval(self):
+        self.assertEqual(self.scheduler.interval(1, 0), 50)
+        self.assertEqual(self.scheduler.interval(1, 1), 25)
+        self.assertEqual(self.scheduler.interval(100, 0), 10)
+        self.assertEqual(self.scheduler.interval(0, 0), 1000)
+        self.assertEqual(self.scheduler.interval(0.001, 0), 1000)
+
+    def test_busy_polled_more_often(self):
+        self.scheduler.due()
+        self.scheduler.record_poll(self.scrape_state, "busy", 0, 0)
+        self.scheduler.record_poll(self.scrape_state, "quiet", 0, 0)
+        for _ in range(20):
+            due = self.scheduler.wait(self.clock.sleep)
+            for subreddit in due:
+                comments = 10 if subreddit == "busy" else 0
+                last_poll = self.scrape_state.subreddit_schedule(subreddit)["last_poll"]
+                self.scheduler.record_poll(self.scrape_state, subreddit, comments * (self.clock.now - last_poll), 0)
+        busy = self.scrape_state.subreddit_schedule("busy")
+        quiet = self.scrape_state.subreddit_schedule("quiet")
+        self.assertAlmostEqual(busy["comment_rate"], 10, delta=0.5)
+        self.assertEqual(quiet["comment_rate"], 0)
+        self.assertLess(busy["next_poll"] - busy["last_poll"], quiet["next_poll"] - quiet["last_poll"])
+
+    def test_wait_sleeps_until_due(self):
+        self.scheduler.due()
+        self.scheduler.record_poll(self.scrape_state, "busy", 0, 0)
+        self.assertEqual(self.scheduler.wait(self.clock.sleep), ["busy"])
+        self.assertEqual(self.clock.now, 1010)
+
+    def test_postpone_keeps_rates(self):
+        self.scheduler.due()
+        self.scheduler.record_poll(self.scrape_state, "busy", 0, 2)
+        self.scheduler.postpone(self.scrape_state, "busy", 500)
+        schedule = self.scrape_state.subreddit_schedule("busy")
+        self.assertEqual(schedule["next_poll"], 1500)
+        self.assertEqual(schedule["last_poll"], 1000)
+        self.assertEqual(schedule["match_yield"], 2)
+
+    def test_schedule_restored(self):
+        self.scheduler.due()
+        self.scheduler.record_poll(self.scrape_state, "busy", 0, 0)
+        self.scheduler.postpone(self.scrape_state, "quiet", 5)
+        scheduler = PollScheduler(["busy", "quiet"], 10, 1000, 50, clock=self.clock)
+        scheduler.load(self.scrape_state)
+        self.assertEqual(scheduler.next_poll(), 1005)
+
+    def test_report(self):
+        self.scheduler.due()
+        self.scheduler.record_poll(self.scrape_state, "busy", 0, 0)
+        report = self.scheduler.report(self.scrape_state)
+        self.assertEqual([entry["subreddit"] for entry in report], ["quiet", "busy"])
+        self.assertEqual(report[1]["next_poll_in"], 10)
+        self.assertEqual(report[1]["interval"], 1000)
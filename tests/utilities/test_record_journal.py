@@ -0,0 +1,151 @@
+from redditquotebot.reddit import Comment, Reply
+from redditquotebot.utilities import RecordJournal, RecordKeeper, RecordLoader, RecordStorer
+from redditquotebot.quotes import Quote
+from unittest.mock import patch
+import tempfile
+import unittest
+import json
+import os
+
+
+def make_comment(uid: str) -> Comment:
+    comment = Comment()
+    comment.uid = uid
+    comment.body = f"comment {uid}"
+    return comment
+
+
+class JournalingRecords(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "records.json")
+        self.journal_path = RecordJournal.journal_path(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def journal_lines(self):
+        with open(self.journal_path, "r", encoding="utf-8") as handler:
+            return handler.readlines()
+
+    def test_journal_path(self):
+        self.assertEqual(self.journal_path, os.path.join(self.directory.name, "records.journal.jsonl"))
+
+    def test_missing_files_give_empty_records(self):
+        records = RecordJournal().read(self.path)
+        self.assertEqual(len(records.logged_comments()), 0)
+        self.assertTrue(records.journaling)
+
+    def test_only_changes_appended(self):
+        journal = RecordJournal()
+        records = journal.read(self.path)
+        records.log_comments([make_comment("a"), make_comment("b")])
+        journal.write(self.path, records)
+        records.log_comments(make_comment("c"))
+        records.add_banned_subreddit("test")
+        journal.write(self.path, records)
+        journal.write(self.path, records)
+        self.assertEqual(len(self.journal_lines()), 3)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_read_returns_same_records(self):
+        journal = RecordJournal()
+        self.assertIs(journal.read(self.path), journal.read(self.path))
+
+    def test_replay(self):
+        journal = RecordJournal()
+        records = journal.read(self.path)
+        records.log_comments([make_comment("a"), make_comment("b")])
+        records.log_reply(Reply(make_comment("a"), Quote("quote", "author", [])))
+        records.add_banned_subreddit("test")
+        journal.write(self.path, records)
+
+        loaded = RecordJournal().read(self.path)
+        self.assertEqual([c.uid for c in loaded.logged_comments()], ["a", "b"])
+        self.assertEqual(len(loaded.logged_replies()), 1)
+        self.assertEqual(loaded.banned_subreddits(), ["test"])
+
+    def test_compaction(self):
+        journal = RecordJournal(compact_after=2)
+        records = journal.read(self.path)
+        records.log_comments(make_comment("a"))
+        journal.write(self.path, records)
+        records.log_comments(make_comment("b"))
+        journal.write(self.path, records)
+        self.assertEqual(len(self.journal_lines()), 0)
+        with open(self.path, "r", encoding="utf-8") as handler:
+            self.assertEqual([c.uid for c in RecordLoader.from_json(handler).logged_comments()], ["a", "b"])
+        records.log_comments(make_comment("c"))
+        journal.write(self.path, records)
+
+        loaded = RecordJournal().read(self.path)
+        self.assertEqual([c.uid for c in loaded.logged_comments()], ["a", "b", "c"])
+
+    def test_crash_before_journal_emptied(self):
+        journal = RecordJournal(compact_after=100)
+        records = journal.read(self.path)
+        records.log_comments([make_comment("a"), make_comment("b")])
+        journal.write(self.path, records)
+        lines = self.journal_lines()
+        journal.compact(self.path)
+        # The journal is restored, as if the crash happened between the snapshot and emptying the journal.
+        with open(self.journal_path, "w", encoding="utf-8") as handler:
+            handler.writelines(lines)
+
+        loaded = RecordJournal().read(self.path)
+        self.assertEqual([c.uid for c in loaded.logged_comments()], ["a", "b"])
+
+    def test_partial_line_discarded(self):
+        journal = RecordJournal()
+        records = journal.read(self.path)
+        records.log_comments(make_comment("a"))
+        journal.write(self.path, records)
+        with open(self.journal_path, "a", encoding="utf-8") as handler:
+            handler.write('{"sequence": 2, "type": "comm')
+
+        journal = RecordJournal()
+        loaded = journal.read(self.path)
+        self.assertEqual([c.uid for c in loaded.logged_comments()], ["a"])
+        self.assertEqual(len(self.journal_lines()), 1)
+        loaded.log_comments(make_comment("b"))
+        journal.write(self.path, loaded)
+        self.assertEqual([c.uid for c in RecordJournal().read(self.path).logged_comments()], ["a", "b"])
+
+    def test_existing_records_file_used_as_snapshot(self):
+        records = RecordKeeper()
+        records.log_comments(make_comment("a"))
+        with open(self.path, "w", encoding="utf-8") as handler:
+            RecordStorer.to_json(handler, records)
+
+        journal = RecordJournal()
+        loaded = journal.read(self.path)
+        loaded.log_comments(make_comment("b"))
+        journal.write(self.path, loaded)
+        self.assertEqual([c.uid for c in RecordJournal().read(self.path).logged_comments()], ["a", "b"])
+
+    def test_snapshot_parsed_once(self):
+        journal = RecordJournal()
+        records = journal.read(self.path)
+        records.log_comments(make_comment("a"))
+        journal.write(self.path, records)
+        journal.compact(self.path)
+        with patch("json.load", wraps=json.load) as load:
+            self.assertEqual([c.uid for c in RecordJournal().read(self.path).logged_comments()], ["a"])
+        self.assertEqual(load.call_count, 1)
+
+    def test_discarded_records_not_journaled(self):
+        journal = RecordJournal()
+        records = journal.read(self.path)
+        records.maximum_comments(0)
+        records.log_comments(make_comment("a"))
+        journal.write(self.path, records)
+        self.assertFalse(os.path.exists(self.journal_path))
+
+    def test_writing_other_records_replaces_snapshot(self):
+        journal = RecordJournal()
+        records = RecordKeeper()
+        records.log_comments(make_comment("a"))
+        journal.write(self.path, records)
+        with open(self.path, "r", encoding="utf-8") as handler:
+            self.assertEqual(json.load(handler)["journal_sequence"], 0)
+        self.assertIs(journal.read(self.path), records)
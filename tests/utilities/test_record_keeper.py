@@ -357,6 +357,95 @@ class LoadingRecordsFromJSON(unittest.TestCase):
         self.assertRaises(json.JSONDecodeError, RecordLoader.from_json, infile)
 
 
+class CompactRecords(unittest.TestCase):
+    def setUp(self):
+        self.comments = []
+        for uid in ["a", "b"]:
+            comment = Comment()
+            comment.uid = uid
+            comment.author = "author"
+            self.comments.append(comment)
+        self.quote = Quote("body", "a", ["category"])
+
+    def test_quotes_and_comments_stored_once(self):
+        records = RecordKeeper()
+        records.log_matched_quote([MatchedQuote(c, self.quote, 0.5) for c in self.comments])
+        records.log_reply(Reply(self.comments[0], self.quote))
+        d = records.to_dict()
+        self.assertEqual(d["version"], RecordKeeper.VERSION)
+        self.assertEqual(d["records"]["quotes"], {self.quote.content_id(): self.quote.to_dict()})
+        self.assertEqual(set(d["records"]["matched_comments"]), {"a", "b"})
+        self.assertEqual(d["records"]["matches"][0], {"comment_uid": "a", "quote_id": self.quote.content_id(), "score": 0.5})
+        self.assertEqual(d["records"]["replies"][0], {"comment_uid": "a", "quote_id": self.quote.content_id()})
+
+    def test_reply_body_rendered(self):
+        records = RecordKeeper()
+        records.log_reply(Reply(self.comments[0], self.quote))
+        self.assertEqual(records.logged_replies()[0].body(), Reply(self.comments[0], self.quote).body())
+
+    def test_unreferenced_entries_dropped(self):
+        records = RecordKeeper()
+        records.maximum_matches(1)
+        records.log_matched_quote([MatchedQuote(self.comments[0], Quote("other", "a", []), 0.5), MatchedQuote(self.comments[1], self.quote, 0.5)])
+        # Dropped as soon as the match is evicted, rather than when saved.
+        self.assertEqual(list(records.records["matched_comments"]), ["b"])
+        self.assertEqual(list(records.records["quotes"]), [self.quote.content_id()])
+
+    def test_entries_kept_while_referenced(self):
+        records = RecordKeeper()
+        records.maximum_matches(1)
+        records.log_reply(Reply(self.comments[0], self.quote))
+        records.log_matched_quote([MatchedQuote(self.comments[0], self.quote, 0.5), MatchedQuote(self.comments[1], self.quote, 0.5)])
+        self.assertEqual(set(records.records["matched_comments"]), {"a", "b"})
+        records.maximum_replies(0)
+        self.assertEqual(list(records.records["matched_comments"]), ["b"])
+        self.assertEqual(list(records.records["quotes"]), [self.quote.content_id()])
+        self.assertEqual(records.logged_matches()[0].comment.uid, "b")
+
+    def test_to_dict_leaves_records_unchanged(self):
+        records = RecordKeeper()
+        records.log_matched_quote(MatchedQuote(self.comments[0], self.quote, 0.5))
+        records.records["matched_comments"]["unreferenced"] = {}
+        records.to_dict()
+        self.assertIn("unreferenced", records.records["matched_comments"])
+
+    def test_loading_drops_unreferenced_entries(self):
+        records = RecordKeeper()
+        records.log_matched_quote(MatchedQuote(self.comments[0], self.quote, 0.5))
+        d = records.to_dict()
+        d["records"]["matched_comments"]["unreferenced"] = {}
+        loaded = RecordLoader.from_dict(d)
+        self.assertEqual(list(loaded.records["matched_comments"]), ["a"])
+        loaded.maximum_matches(0)
+        self.assertEqual(loaded.records["matched_comments"], {})
+        self.assertEqual(loaded.records["quotes"], {})
+
+    def test_entries_expanded(self):
+        records = RecordKeeper()
+        records.log_matched_quote(MatchedQuote(self.comments[0], self.quote, 0.5))
+        self.assertEqual(records.entries("matches"), [MatchedQuote(self.comments[0], self.quote, 0.5).to_dict()])
+
+    def test_loading_version_one_file(self):
+        infile = StringIO()
+        json.dump({
+            "records": {
+                "comments": [self.comments[0].to_dict()],
+                "matches": [MatchedQuote(self.comments[0], self.quote, 0.5).to_dict()],
+                "replies": [Reply(self.comments[1], self.quote).to_dict()],
+                "removed": [],
+                "banned_subreddits": ["test"]
+            }
+        }, infile)
+        infile.seek(0)
+
+        loaded = RecordLoader.from_json(infile)
+        self.assertEqual(loaded.logged_comments()[0].uid, "a")
+        self.assertEqual(loaded.logged_matches()[0].quote.to_dict(), self.quote.to_dict())
+        self.assertEqual(loaded.logged_replies()[0].comment.uid, "b")
+        self.assertEqual(loaded.banned_subreddits(), ["test"])
+        self.assertEqual(loaded.to_dict()["records"]["replies"], [{"comment_uid": "b", "quote_id": self.quote.content_id()}])
+
+
 class SavingRecordsToJSON(unittest.TestCase):
 
     def test_records_not_provided(self):
@@ -372,3 +461,34 @@ class SavingRecordsToJSON(unittest.TestCase):
         RecordStorer.to_json(outfile, records)
         outfile.seek(0)
         self.assertEqual(outfile.read(), json.dumps(records.to_dict(), indent=2))
+
+
+class JournalingChanges(unittest.TestCase):
+    def test_not_journaled_by_default(self):
+        records = RecordKeeper()
+        records.log_comments(Comment())
+        self.assertEqual(records.take_journal(), [])
+
+    def test_taking_journal(self):
+        records = RecordKeeper()
+        records.journaling = True
+        records.log_comments([Comment(), Comment()])
+        records.add_banned_subreddit("test")
+        records.add_banned_subreddit("test")
+        journal = records.take_journal()
+        self.assertEqual([entry["type"] for entry in journal], ["comments", "banned_subreddits"])
+        self.assertEqual(len(journal[0]["data"]), 2)
+        self.assertEqual(records.take_journal(), [])
+
+    def test_applying_journal(self):
+        records = RecordKeeper()
+        records.journaling = True
+        records.log_comments(Comment())
+        records.add_banned_subreddit("test")
+        replayed = RecordKeeper()
+        replayed.journaling = True
+        for entry in records.take_journal():
+            replayed.apply_journal(entry)
+        self.assertEqual(len(replayed.logged_comments()), 1)
+        self.assertEqual(replayed.banned_subreddits(), ["test"])
+        self.assertEqual(replayed.take_journal(), [])
@@ -0,0 +1,104 @@
+from redditquotebot.reddit import Comment, Reply
+from redditquotebot.nlp import MatchedQuote
+from redditquotebot.utilities import RecordKeeper, RecordLoader, RecordReader, RecordStorer
+from redditquotebot.quotes import Quote
+from io import StringIO
+import tempfile
+import unittest
+import json
+import os
+
+
+def make_comment(uid: str) -> Comment:
+    comment = Comment()
+    comment.uid = uid
+    comment.body = f"comment {uid} " * 20
+    return comment
+
+
+class ReadingRecords(unittest.TestCase):
+    def setUp(self):
+        self.quote = Quote("body", "author", ["category"])
+        # Enough records to span several read chunks.
+        self.comments = [make_comment(str(i)) for i in range(400)]
+        self.records = RecordKeeper()
+        self.records.log_comments(self.comments)
+        self.records.log_matched_quote([MatchedQuote(c, self.quote, 0.5) for c in self.comments[0:3]])
+        self.records.log_reply(Reply(self.comments[1], self.quote))
+        self.records.log_removed_comment(self.comments[2])
+        self.records.add_banned_subreddit("test")
+
+    def json_file(self, data: dict) -> StringIO:
+        infile = StringIO()
+        json.dump(data, infile, indent=2)
+        infile.seek(0)
+        return infile
+
+    def test_all_sections(self):
+        read = list(RecordReader.from_json(self.json_file(self.records.to_dict())))
+        expected = [(section, entry) for section in ("comments", "matches", "replies", "removed") for entry in self.records.entries(section)]
+        self.assertEqual(read, expected + [("banned_subreddits", "test")])
+
+    def test_section_filtering(self):
+        read = list(RecordReader.from_json(self.json_file(self.records.to_dict()), ["matches"]))
+        self.assertEqual([section for section, _ in read], ["matches"] * 3)
+        self.assertEqual(MatchedQuote.from_dict(read[0][1]).quote, self.quote)
+
+    def test_tables_after_references(self):
+        data = self.records.to_dict()
+        records = data["records"]
+        records["quotes"] = records.pop("quotes")
+        records["matched_comments"] = records.pop("matched_comments")
+        read = list(RecordReader.from_json(self.json_file(data), ["replies"]))
+        self.assertEqual(read, [("replies", self.records.entries("replies")[0])])
+
+    def test_version_one_file(self):
+        data = {"records": {
+            "comments": [],
+            "matches": [MatchedQuote(self.comments[0], self.quote, 0.5).to_dict()],
+            "replies": [Reply(self.comments[1], self.quote).to_dict()]
+        }}
+        read = list(RecordReader.from_json(self.json_file(data)))
+        self.assertEqual(read[0], ("matches", MatchedQuote(self.comments[0], self.quote, 0.5).to_dict()))
+        self.assertEqual(read[1][1]["comment"]["uid"], "1")
+
+    def test_truncated_file(self):
+        text = json.dumps(self.records.to_dict())
+        self.assertRaises(ValueError, list, RecordReader.from_json(StringIO(text[0:len(text) // 2])))
+
+    def test_jsonl_round_trip(self):
+        outfile = StringIO()
+        RecordStorer.to_jsonl(outfile, self.records)
+        outfile.seek(0)
+        self.assertEqual(list(RecordReader.from_jsonl(outfile)), list(RecordReader.from_json(self.json_file(self.records.to_dict()))))
+        outfile.seek(0)
+        loaded = RecordLoader.from_jsonl(outfile)
+        self.assertEqual(loaded.to_dict(), self.records.to_dict())
+
+    def test_jsonl_from_reader(self):
+        outfile = StringIO()
+        RecordStorer.to_jsonl(outfile, RecordReader.from_json(self.json_file(self.records.to_dict()), ["removed"]))
+        outfile.seek(0)
+        self.assertEqual([json.loads(line)["type"] for line in outfile], ["removed"])
+
+    def test_json_from_reader(self):
+        outfile = StringIO()
+        RecordStorer.to_json(outfile, RecordReader.from_json(self.json_file(self.records.to_dict())))
+        outfile.seek(0)
+        self.assertEqual(json.load(outfile), self.records.to_dict())
+        outfile.seek(0)
+        self.assertEqual(list(RecordReader.from_json(outfile)), list(RecordReader.from_json(self.json_file(self.records.to_dict()))))
+
+    def test_json_from_reader_sections_out_of_order(self):
+        pairs = [("removed", self.records.entries("removed")[0]), ("comments", self.records.entries("comments")[0])]
+        self.assertRaises(ValueError, RecordStorer.to_json, StringIO(), pairs)
+
+    def test_read_by_extension(self):
+        with tempfile.TemporaryDirectory() as directory:
+            json_path = os.path.join(directory, "records.json")
+            jsonl_path = os.path.join(directory, "records.jsonl")
+            with open(json_path, "w", encoding="utf-8") as handler:
+                RecordStorer.to_json(handler, self.records)
+            with open(jsonl_path, "w", encoding="utf-8") as handler:
+                RecordStorer.to_jsonl(handler, self.records)
+            self.assertEqual(list(RecordReader.read(json_path, ["removed"])), list(RecordReader.read(jsonl_path, ["removed"])))
@@ -37,6 +37,110 @@ class UpdatingLatestSubredditUTC(unittest.TestCase):
         self.assertEqual(scrape_state.latest_subreddit_utc("test"), 0)
 
 
+class UpdatingLatestSubredditFullname(unittest.TestCase):
+    def test_updating_latest_fullname(self):
+        scrape_state = ScrapeState()
+        scrape_state.update_latest_subreddit_fullname("test", "t1_abc")
+        scrape_state.update_latest_subreddit_fullname("test", "t1_abd")
+        self.assertEqual(scrape_state.latest_subreddit_fullname("test"), "t1_abd")
+
+    def test_query_subreddit_not_stored(self):
+        scrape_state = ScrapeState()
+        self.assertEqual(scrape_state.latest_subreddit_fullname("test"), None)
+
+
+class UpdatingSubmissionState(unittest.TestCase):
+    def setUp(self):
+        self.more = {"children": ["x", "y"], "count": 2, "parent_id": "t3_a"}
+
+    def test_query_submission_not_stored(self):
+        scrape_state = ScrapeState()
+        self.assertEqual(scrape_state.submission_state("test", "a"), None)
+
+    def test_watermark_moves_when_complete(self):
+        scrape_state = ScrapeState()
+        scrape_state.update_submission_state("test", "a", 5, 100, [])
+        state = scrape_state.submission_state("test", "a")
+        self.assertEqual(state["num_comments"], 5)
+        self.assertEqual(state["watermark"], 100)
+        self.assertEqual(state["latest_utc"], 100)
+
+    def test_watermark_held_while_pending(self):
+        scrape_state = ScrapeState()
+        scrape_state.update_submission_state("test", "a", 5, 100, [])
+        scrape_state.update_submission_state("test", "a", 9, 200, [self.more])
+        self.assertEqual(scrape_state.submission_state("test", "a")["watermark"], 100)
+        self.assertEqual(scrape_state.pending_submissions("test"), ["a"])
+
+        scrape_state.update_submission_state("test", "a", 9, 150, [])
+        state = scrape_state.submission_state("test", "a")
+        self.assertEqual(state["watermark"], 200)
+        self.assertEqual(state["latest_utc"], 200)
+        self.assertEqual(scrape_state.pending_submissions("test"), [])
+
+    def test_retaining_submissions(self):
+        scrape_state = ScrapeState()
+        scrape_state.update_submission_state("test", "a", 5, 100, [])
+        scrape_state.update_submission_state("test", "b", 5, 100, [self.more])
+        scrape_state.update_submission_state("test", "c", 5, 100, [])
+        scrape_state.retain_submissions("test", ["c"])
+        self.assertEqual(scrape_state.submission_state("test", "a"), None)
+        self.assertNotEqual(scrape_state.submission_state("test", "b"), None)
+        self.assertNotEqual(scrape_state.submission_state("test", "c"), None)
+
+
+class CopyingFetchCursors(unittest.TestCase):
+    def setUp(self):
+        self.scrape_state = ScrapeState()
+        self.scrape_state.update_latest_subreddit_utc("test", 10)
+        self.scrape_state.update_latest_subreddit_fullname("test", "t1_a")
+        self.scrape_state.update_submission_state("test", "s", 1, 10, [])
+        self.scrape_state.update_latest_subreddit_fullname("other", "t1_b")
+
+    def test_copy_holds_only_subreddit(self):
+        cursors = self.scrape_state.fetch_cursors("test")
+        self.assertEqual(cursors.latest_subreddit_utc("test"), 10)
+        self.assertEqual(cursors.latest_subreddit_fullname("test"), "t1_a")
+        self.assertEqual(cursors.submission_state("test", "s"), self.scrape_state.submission_state("test", "s"))
+        self.assertEqual(cursors.latest_subreddit_fullname("other"), None)
+
+    def test_copy_is_independent(self):
+        cursors = self.scrape_state.fetch_cursors("test")
+        cursors.update_latest_subreddit_fullname("test", "t1_c")
+        cursors.update_submission_state("test", "s", 2, 20, [])
+        self.assertEqual(self.scrape_state.latest_subreddit_fullname("test"), "t1_a")
+        self.assertEqual(self.scrape_state.submission_state("test", "s")["num_comments"], 1)
+
+    def test_updating_from_copy(self):
+        cursors = self.scrape_state.fetch_cursors("test")
+        cursors.update_latest_subreddit_fullname("test", "t1_c")
+        cursors.update_submission_state("test", "s", 2, 20, [])
+        cursors.update_latest_subreddit_utc("test", 20)
+        self.scrape_state.update_fetch_cursors(cursors, "test")
+        self.assertEqual(self.scrape_state.latest_subreddit_fullname("test"), "t1_c")
+        self.assertEqual(self.scrape_state.submission_state("test", "s")["num_comments"], 2)
+        # The latest comment time is only updated once comments are filtered
+        self.assertEqual(self.scrape_state.latest_subreddit_utc("test"), 10)
+        self.assertEqual(self.scrape_state.latest_subreddit_fullname("other"), "t1_b")
+
+
+class UpdatingSubredditSchedule(unittest.TestCase):
+    def test_query_subreddit_not_stored(self):
+        schedule = ScrapeState().subreddit_schedule("test")
+        self.assertEqual(schedule["last_poll"], None)
+        self.assertEqual(schedule["next_poll"], 0)
+
+    def test_updating_schedule(self):
+        scrape_state = ScrapeState()
+        scrape_state.update_subreddit_schedule("test", 0.5, 1.5, 100, 200)
+        self.assertEqual(scrape_state.subreddit_schedule("test"), {
+            "comment_rate": 0.5,
+            "match_yield": 1.5,
+            "last_poll": 100,
+            "next_poll": 200
+        })
+
+
 class LoadingStateFromJson(unittest.TestCase):
 
     def test_good_credentials(self):
@@ -54,6 +158,26 @@ class LoadingStateFromJson(unittest.TestCase):
             "test": 12345
         })
 
+    def test_fullnames_missing(self):
+        infile = StringIO()
+        infile.write('{"latest_comments": {"test": 12345}}')
+        infile.seek(0)
+        store = ScrapeStateLoader.from_json(infile)
+        self.assertEqual(store.latest_fullnames, {})
+        self.assertEqual(store.submissions, {})
+        self.assertEqual(store.schedules, {})
+
+    def test_submissions_loaded(self):
+        scrape_state = ScrapeState()
+        scrape_state.update_submission_state("test", "a", 5, 100, [{"children": ["x"], "count": 1, "parent_id": "t3_a"}])
+
+        infile = StringIO()
+        json.dump(scrape_state.to_dict(), infile, indent=2)
+        infile.seek(0)
+
+        store = ScrapeStateLoader.from_json(infile)
+        self.assertEqual(store.submission_state("test", "a"), scrape_state.submission_state("test", "a"))
+
     def test_bad_keys(self):
         infile = StringIO()
         infile.write('{"badkey": "badvalue"}')
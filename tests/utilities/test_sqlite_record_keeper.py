@@ -0,0 +1,165 @@
+from redditquotebot.reddit import Comment, Reply
+from redditquotebot.nlp import MatchedQuote
+from redditquotebot.utilities import RecordKeeper, RecordJournal, RecordStorer, SQLiteRecordKeeper, SQLiteRecordLoader, SQLiteRecordStorer, FileAssociator, FileTypes
+from redditquotebot.quotes import Quote
+import sqlite3
+import tempfile
+import unittest
+import os
+
+
+def make_comment(uid: str, subreddit: str = "test", utc: float = 0, score: int = 1) -> Comment:
+    comment = Comment()
+    comment.uid = uid
+    comment.body = f"comment {uid}"
+    comment.subreddit = subreddit
+    comment.utc = utc
+    comment.score = score
+    return comment
+
+
+class SQLiteRecords(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "records.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_wal_mode(self):
+        records = SQLiteRecordKeeper(self.path)
+        self.assertEqual(records.query("PRAGMA journal_mode").fetchone()[0], "wal")
+        records.close()
+
+    def test_records_persist_after_commit(self):
+        records = SQLiteRecordKeeper(self.path)
+        records.log_comments([make_comment("a"), make_comment("b")])
+        records.log_matched_quote(MatchedQuote(make_comment("a"), Quote("quote", "author", []), 0.5))
+        records.log_reply(Reply(make_comment("a"), Quote("quote", "author", [])))
+        records.log_removed_comment(make_comment("b"))
+        records.add_banned_subreddit("banned")
+        records.add_banned_subreddit("banned")
+        records.commit()
+
+        loaded = SQLiteRecordKeeper(self.path)
+        self.assertEqual([c.uid for c in loaded.logged_comments()], ["a", "b"])
+        self.assertEqual(loaded.logged_matches()[0].score, 0.5)
+        self.assertEqual(loaded.logged_replies()[0].comment.uid, "a")
+        self.assertEqual([c.uid for c in loaded.logged_removed_comments()], ["b"])
+        self.assertEqual(loaded.banned_subreddits(), ["banned"])
+        records.close()
+        loaded.close()
+
+    def test_no_records_in_memory(self):
+        records = SQLiteRecordKeeper(self.path)
+        self.assertFalse(hasattr(records, "records"))
+        records.apply_journal({"type": "comments", "data": [make_comment("a").to_dict()]})
+        records.apply_journal({"type": "banned_subreddits", "data": ["banned"]})
+        records.commit()
+        self.assertEqual([c.uid for c in records.logged_comments()], ["a"])
+        self.assertEqual(records.banned_subreddits(), ["banned"])
+        self.assertEqual(records.take_journal(), [])
+        records.close()
+
+    def test_uncommitted_records_discarded(self):
+        records = SQLiteRecordKeeper(self.path)
+        records.log_comments(make_comment("a"))
+        self.assertEqual(len(records.logged_comments()), 1)
+        self.assertEqual(len(SQLiteRecordKeeper(self.path).logged_comments()), 0)
+
+    def test_maximum_counts(self):
+        records = SQLiteRecordKeeper(self.path)
+        records.maximum_comments(2)
+        records.maximum_removed_comments(0)
+        records.log_comments([make_comment("a"), make_comment("b"), make_comment("c")])
+        records.log_removed_comment(make_comment("a"))
+        records.commit()
+        self.assertEqual([c.uid for c in records.logged_comments()], ["b", "c"])
+        self.assertEqual(len(records.logged_removed_comments()), 0)
+
+    def test_query_indexed_columns(self):
+        records = SQLiteRecordKeeper(self.path)
+        records.log_matched_quote([
+            MatchedQuote(make_comment("a", "one", 10), Quote("quote", "author", []), 0.5),
+            MatchedQuote(make_comment("b", "two", 20), Quote("quote", "author", []), 0.9),
+            MatchedQuote(make_comment("c", "two", 30), Quote("quote", "author", []), 0.7)
+        ])
+        rows = records.query("SELECT comment_uid FROM matches WHERE subreddit = ? AND score > ? ORDER BY utc", ("two", 0.6))
+        self.assertEqual([row[0] for row in rows], ["b", "c"])
+        plan = " ".join(str(row) for row in records.query("EXPLAIN QUERY PLAN SELECT * FROM comments WHERE uid = ?", ("a",)))
+        self.assertIn("comments_uid", plan)
+
+    def test_to_dict_matches_record_keeper(self):
+        records = SQLiteRecordKeeper(self.path)
+        keeper = RecordKeeper()
+        for r in (records, keeper):
+            r.log_comments(make_comment("a"))
+            r.log_reply(Reply(make_comment("a"), Quote("quote", "author", [])))
+            r.add_banned_subreddit("banned")
+        self.assertEqual(records.to_dict(), keeper.to_dict())
+
+    def test_storer_imports_other_records(self):
+        keeper = RecordKeeper()
+        keeper.log_comments([make_comment("a"), make_comment("b")])
+        keeper.log_matched_quote(MatchedQuote(make_comment("a"), Quote("quote", "author", []), 0.5))
+        keeper.log_reply(Reply(make_comment("a"), Quote("quote", "author", [])))
+        keeper.add_banned_subreddit("banned")
+        SQLiteRecordStorer.to_sqlite(self.path, (keeper,))
+
+        loaded = SQLiteRecordLoader.from_sqlite(self.path)
+        self.assertEqual([c.uid for c in loaded.logged_comments()], ["a", "b"])
+        self.assertEqual(loaded.logged_matches()[0].score, 0.5)
+        self.assertEqual(loaded.logged_replies()[0].body(), keeper.logged_replies()[0].body())
+        self.assertEqual(loaded.banned_subreddits(), ["banned"])
+
+    def test_storer_commits_opened_records(self):
+        records = SQLiteRecordLoader.from_sqlite(self.path)
+        records.log_comments(make_comment("a"))
+        SQLiteRecordStorer.to_sqlite(self.path, (records,))
+        self.assertEqual(len(SQLiteRecordLoader.from_sqlite(self.path).logged_comments()), 1)
+
+    def test_loads_reuse_connection(self):
+        records = SQLiteRecordLoader.from_sqlite(self.path)
+        self.assertIs(SQLiteRecordLoader.from_sqlite(self.path), records)
+        records.close()
+        reopened = SQLiteRecordLoader.from_sqlite(self.path)
+        self.assertIsNot(reopened, records)
+        self.assertFalse(reopened.closed)
+        reopened.close()
+
+    def test_loader_migrates_json_records(self):
+        keeper = RecordKeeper()
+        keeper.log_comments(make_comment("a"))
+        keeper.log_reply(Reply(make_comment("a"), Quote("quote", "author", [])))
+        keeper.add_banned_subreddit("banned")
+        json_path = SQLiteRecordLoader.json_path(self.path)
+        with open(json_path, "w") as handler:
+            RecordStorer.to_json(handler, (keeper,))
+        # Changes journaled since the snapshot are migrated too.
+        journal = RecordJournal()
+        journaled = journal.read(json_path)
+        journaled.log_comments(make_comment("b"))
+        journal.write(json_path, journaled)
+
+        records = SQLiteRecordLoader.from_sqlite(self.path)
+        self.assertEqual([c.uid for c in records.logged_comments()], ["a", "b"])
+        self.assertEqual(records.logged_replies()[0].comment.uid, "a")
+        self.assertEqual(records.banned_subreddits(), ["banned"])
+        records.close()
+        # Only a new database is migrated into.
+        records = SQLiteRecordLoader.from_sqlite(self.path)
+        self.assertEqual(len(records.logged_comments()), 2)
+        records.close()
+
+    def test_loader_keeps_unreadable_json_records(self):
+        with open(SQLiteRecordLoader.json_path(self.path), "w") as handler:
+            handler.write("{}")
+        self.assertRaises(KeyError, SQLiteRecordLoader.from_sqlite, self.path)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_file_associator(self):
+        fa = FileAssociator({FileTypes.SQLITE: SQLiteRecordLoader.from_sqlite})
+        self.assertIsInstance(fa.read(self.path), SQLiteRecordKeeper)
+        with sqlite3.connect(self.path) as connection:
+            tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertEqual(tables, {"comments", "matches", "replies", "removed", "banned_subreddits"})
@@ -0,0 +1,47 @@
+from redditquotebot.utilities import TokenBucket
+import unittest
+
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TakingTokens(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(2, 3, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_burst_up_to_capacity(self):
+        for _ in range(3):
+            self.assertEqual(self.bucket.try_acquire(), 0)
+        self.assertAlmostEqual(self.bucket.try_acquire(), 0.5)
+
+    def test_refill(self):
+        for _ in range(3):
+            self.bucket.try_acquire()
+        self.clock.now = 1.0
+        self.assertEqual(self.bucket.try_acquire(), 0)
+        self.assertEqual(self.bucket.try_acquire(), 0)
+        self.assertAlmostEqual(self.bucket.try_acquire(), 0.5)
+
+    def test_refill_capped_at_capacity(self):
+        self.clock.now = 100.0
+        for _ in range(3):
+            self.assertEqual(self.bucket.try_acquire(), 0)
+        self.assertGreater(self.bucket.try_acquire(), 0)
+
+    def test_acquire_waits(self):
+        for _ in range(4):
+            self.bucket.acquire()
+        self.assertEqual(len(self.clock.sleeps), 1)
+        self.assertAlmostEqual(self.clock.sleeps[0], 0.5)
+        self.assertAlmostEqual(self.clock.now, 0.5)
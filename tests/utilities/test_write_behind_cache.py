@@ -0,0 +1,82 @@
+from redditquotebot.utilities import WriteBehindCache, FileAssociator, FileTypes, ScrapeState, ScrapeStateLoader, ScrapeStateStorer
+import tempfile
+import unittest
+import os
+
+
+class FakeClock():
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class WritingBehind(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "scrape_state.json")
+        self.clock = FakeClock()
+        self.cache = WriteBehindCache(flush_interval=60, flush_after_changes=3, clock=self.clock)
+        self.loads = 0
+        fa = FileAssociator({FileTypes.JSON: ScrapeStateLoader.from_json})
+
+        def load(path):
+            self.loads += 1
+            return fa.read(path)
+        self.read = self.cache.reader(load)
+        self.write = self.cache.writer(FileAssociator({FileTypes.JSON: ScrapeStateStorer.to_json}).write)
+        self.write(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def stored_utc(self) -> float:
+        return FileAssociator({FileTypes.JSON: ScrapeStateLoader.from_json}).read(self.path).latest_subreddit_utc("test")
+
+    def test_temporary_path(self):
+        self.assertEqual(WriteBehindCache.temporary_path("dir/state.json"), "dir/state.tmp.json")
+
+    def test_read_once(self):
+        state = self.read(self.path)
+        self.assertIs(self.read(self.path), state)
+        self.assertEqual(self.loads, 1)
+
+    def test_flush_after_changes(self):
+        state = self.read(self.path)
+        for utc in range(1, 3):
+            state.update_latest_subreddit_utc("test", utc)
+            self.write(self.path, state)
+        self.assertEqual(self.stored_utc(), 0)
+        self.assertTrue(self.cache.dirty())
+        state.update_latest_subreddit_utc("test", 3)
+        self.write(self.path, state)
+        self.assertEqual(self.stored_utc(), 3)
+        self.assertFalse(self.cache.dirty())
+        self.assertFalse(os.path.exists(WriteBehindCache.temporary_path(self.path)))
+
+    def test_flush_after_interval(self):
+        state = self.read(self.path)
+        state.update_latest_subreddit_utc("test", 1)
+        self.write(self.path, state)
+        self.assertEqual(self.stored_utc(), 0)
+        self.clock.now = 60
+        state.update_latest_subreddit_utc("test", 2)
+        self.write(self.path, state)
+        self.assertEqual(self.stored_utc(), 2)
+
+    def test_flush(self):
+        state = self.read(self.path)
+        state.update_latest_subreddit_utc("test", 1)
+        self.write(self.path, state)
+        self.cache.flush()
+        self.assertEqual(self.stored_utc(), 1)
+        self.assertFalse(self.cache.dirty())
+
+    def test_other_object_written_immediately(self):
+        self.read(self.path)
+        state = ScrapeState()
+        state.update_latest_subreddit_utc("test", 5)
+        self.write(self.path, state)
+        self.assertEqual(self.stored_utc(), 5)
+        self.assertIs(self.read(self.path), state)